@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import json
+import logging
+from pathlib import Path
+
+import asyncclick as click
+
+from benchmarks.harness import PERCENTILES, BenchmarkResult, run_save
+from benchmarks.server import ServerConfig
+
+logger = logging.getLogger(__name__)
+
+
+def _format_result(run: int, result: BenchmarkResult) -> str:
+    peak_rss = "n/a" if result.peak_rss is None else f"{result.peak_rss / 2**20:,.1f} MiB"
+    lines = [
+        f"run {run}: {result.rows} rows in {result.elapsed:.2f}s ({result.rows_per_second:,.0f} rows/sec), peak RSS {peak_rss}",
+    ]
+    lines.extend(
+        f"    {latency.path:<45} {latency.requests:>6} requests  "
+        + "  ".join(f"p{p}={value * 1000:,.1f}ms" for p, value in zip(PERCENTILES, latency.percentiles))
+        for latency in result.latencies
+    )
+    return "\n".join(lines)
+
+
+@click.command()
+@click.option("--rows", type=int, default=10000, help="Number of rows of the fake USPS file.")
+@click.option("--latency", type=float, default=0.0, help="Seconds every fake response is delayed by.")
+@click.option("--error-rate", type=float, default=0.0, help="Probability of a fake request failing with a 503.")
+@click.option("--no-match-rate", type=float, default=0.05, help="Probability of a fake address not being matched.")
+@click.option("--repeat", type=int, default=1, help="Number of times the pipeline is run.")
+@click.option("--output", type=click.Path(dir_okay=False, writable=True), default=None, help="JSON file the results are written to.")
+@click.argument("save_args", nargs=-1, type=click.UNPROCESSED)
+def main(  # noqa: PLR0913
+    rows: int,
+    latency: float,
+    error_rate: float,
+    no_match_rate: float,
+    repeat: int,
+    output: str | None,
+    save_args: tuple[str, ...],
+) -> None:
+    """
+    Benchmarks the save pipeline against a local stand-in for the Census and USPS endpoints.
+
+    Any SAVE_ARGS are passed to the save command (defaults to --coordinates --timezones).
+    """
+    config = ServerConfig(latency=latency, error_rate=error_rate, no_match_rate=no_match_rate, rows=rows)
+    results = []
+    for run in range(1, repeat + 1):
+        result = run_save(config, save_args or ("--coordinates", "--timezones"))
+        click.echo(_format_result(run, result))
+        results.append(result)
+
+    if output is not None:
+        payload = {
+            "config": config._asdict(),
+            "runs": [
+                {
+                    **result._asdict(),
+                    "rows_per_second": result.rows_per_second,
+                    "latencies": [{**latency._asdict(), "percentiles": dict(zip(PERCENTILES, latency.percentiles))} for latency in result.latencies],
+                }
+                for result in results
+            ],
+        }
+        Path(output).write_text(json.dumps(payload, indent=2))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(name)-12s: %(levelname)-8s\t%(message)s",
+    )
+
+    main(_anyio_backend="asyncio")
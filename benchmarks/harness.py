@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Final, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.server import FakeServer, ServerConfig
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+logger = logging.getLogger(__name__)
+
+
+PERCENTILES: Final[list[int]] = [50, 90, 99]
+PEAK_RSS_POLL_INTERVAL: Final[float] = 0.05  # Seconds
+
+
+class LatencySummary(NamedTuple):
+    """Summarizes the time the fake server spent answering the requests to one path.
+
+    Attributes:
+        path: The request path.
+        requests: The number of requests.
+        percentiles: The latency in seconds at each of PERCENTILES.
+    """
+
+    path: str
+    requests: int
+    percentiles: tuple[float, ...]
+
+
+class BenchmarkResult(NamedTuple):
+    """The measurements of one run of the save pipeline.
+
+    Attributes:
+        rows: The number of rows saved.
+        elapsed: The wall clock seconds of the run.
+        peak_rss: The peak resident set size of the save process in bytes, None where it cannot be measured (ie: macOS, Windows).
+        latencies: The request latencies per path.
+    """
+
+    rows: int
+    elapsed: float
+    peak_rss: int | None
+    latencies: list[LatencySummary]
+
+    @property
+    def rows_per_second(self) -> float:
+        """The throughput of the run."""
+        return self.rows / self.elapsed if self.elapsed > 0 else float("nan")
+
+
+def _read_peak_rss(pid: int) -> int | None:
+    """Returns the peak resident set size (VmHWM) of the process in bytes, or None if it cannot be read (ie: not Linux)."""
+    try:
+        status = Path(f"/proc/{pid}/status").read_text()
+    except OSError:
+        return None
+    # A process that has exited but was not waited for yet has no VmHWM
+    return next((int(line.split()[1]) * 1024 for line in status.splitlines() if line.startswith("VmHWM:")), None)
+
+
+def _run_and_measure(cmd: Sequence[str], env: dict[str, str]) -> int | None:
+    """
+    Runs the command, raising a CalledProcessError if it fails.
+
+    The peak resident set size is polled from /proc while the process runs. It is the high-water mark of that process
+    alone, unlike the ru_maxrss of RUSAGE_CHILDREN that keeps the largest of every child so far and counts the memory
+    of this process at the fork.
+
+    Args:
+        cmd (Sequence[str]): The command and its arguments.
+        env (dict[str, str]): The environment of the process.
+
+    Returns:
+        The peak resident set size of the process in bytes, or None where /proc is not available (ie: macOS, Windows).
+    """
+    process = subprocess.Popen(cmd, env=env)  # noqa: S603
+    peak_rss = None
+    while process.poll() is None:
+        # Any growth during the last interval before the process exits is missed
+        peak_rss = _read_peak_rss(process.pid) or peak_rss
+        time.sleep(PEAK_RSS_POLL_INTERVAL)
+
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, cmd)
+    return peak_rss
+
+
+def summarize_latencies(latencies: dict[str, list[float]]) -> list[LatencySummary]:
+    """
+    Computes the latency percentiles of each path.
+
+    Args:
+        latencies (dict[str, list[float]]): The seconds spent answering each request, per path.
+
+    Returns:
+        A LatencySummary per path, sorted by path.
+
+    >>> summarize_latencies({"/a": [1.0, 2.0, 3.0]})[0].percentiles[0]
+    2.0
+    """
+    return [
+        LatencySummary(path, len(values), tuple(float(p) for p in np.percentile(values, PERCENTILES)))
+        for path, values in sorted(latencies.items())
+        if values
+    ]
+
+
+def run_save(config: ServerConfig, save_args: Sequence[str] = ("--coordinates", "--timezones")) -> BenchmarkResult:
+    """
+    Runs the save command in a separate process against a FakeServer.
+
+    The process gets an empty cache directory, so nothing is reused between runs.
+
+    Args:
+        config (ServerConfig): The configuration of the FakeServer.
+        save_args (Sequence[str]): The options passed to the save command.
+
+    Returns:
+        The BenchmarkResult.
+    """
+    with FakeServer(config) as server, tempfile.TemporaryDirectory(prefix="zipcode-coordinates-tz-benchmark") as tmp_dir:
+        output = Path(tmp_dir) / "output.csv"
+        env = {
+            **os.environ,
+            "ZIPCODE_COORDINATES_TZ_CENSUS_URL": server.census_url,
+            "ZIPCODE_COORDINATES_TZ_USPS_URL": server.usps_url,
+            "ZIPCODE_COORDINATES_TZ_CACHE_DIR": str(Path(tmp_dir) / "cache"),
+        }
+        cmd = [sys.executable, "-m", "zipcode_coordinates_tz", "--log-level", "WARNING", "save", str(output), *save_args]
+        logger.info("Running %s", " ".join(cmd))
+        started = time.perf_counter()
+        peak_rss = _run_and_measure(cmd, env)
+        elapsed = time.perf_counter() - started
+        rows = len(pd.read_csv(output, usecols=[0]))
+        return BenchmarkResult(rows, elapsed, peak_rss, summarize_latencies(server.latencies))
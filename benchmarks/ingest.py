@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import logging
+import tempfile
+import time
+from functools import partial
+from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple
+
+import asyncclick as click
+import pandas as pd
+
+from benchmarks.server import make_zip_locale_detail
+from zipcode_coordinates_tz import postal
+from zipcode_coordinates_tz.models import ExcelEngine
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class IngestResult(NamedTuple):
+    """The measurements of one reader of the USPS spreadsheet.
+
+    Attributes:
+        reader: The name of the reader.
+        rows: The number of rows read.
+        elapsed: The best wall clock seconds out of the runs.
+        matches: Whether the DataFrame is the one of the full sheet reader.
+    """
+
+    reader: str
+    rows: int
+    elapsed: float
+    matches: bool
+
+    @property
+    def rows_per_second(self) -> float:
+        """The throughput of the reader."""
+        return self.rows / self.elapsed if self.elapsed > 0 else float("nan")
+
+
+def read_full_sheet(file: Path) -> pd.DataFrame:
+    """Reads the whole sheet and only then selects the columns, as postal.get_locales did before read_locales."""
+    df = pd.read_excel(file, sheet_name=postal._SHEET_NAME, dtype=postal._DTYPES)  # noqa: SLF001
+    return df.rename(columns=postal._RENAME_COLUMNS)[postal._TAKE_COLUMNS]  # noqa: SLF001
+
+
+def get_readers() -> dict[str, Callable[[Path], pd.DataFrame]]:
+    """Returns the readers to compare, the full sheet reader first."""
+    readers: dict[str, Callable[[Path], pd.DataFrame]] = {"full sheet": read_full_sheet}
+    for engine in (ExcelEngine.PANDAS, ExcelEngine.CALAMINE):
+        readers[f"pruned {engine}"] = partial(postal.read_locales, engine=engine)
+    return readers
+
+
+def time_readers(file: Path, repeat: int = 1) -> list[IngestResult]:
+    """
+    Times every reader of get_readers over the file, skipping the readers whose engine is not installed.
+
+    Args:
+        file (Path): The USPS ZIP_Locale_Detail spreadsheet.
+        repeat (int): The number of times each reader is run, the best time is kept.
+
+    Returns:
+        The result of each installed reader.
+    """
+    results = []
+    df_expected = None
+    for name, reader in get_readers().items():
+        elapsed = float("inf")
+        try:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                df = reader(file)
+                elapsed = min(elapsed, time.perf_counter() - start)
+        except ImportError as e:
+            logger.warning("Skipping the %s reader: %s", name, e)
+            continue
+
+        if df_expected is None:
+            df_expected = df
+        results.append(IngestResult(name, len(df), elapsed, df.reset_index(drop=True).equals(df_expected.reset_index(drop=True))))
+    return results
+
+
+@click.command()
+@click.argument("file", type=click.Path(exists=True, dir_okay=False), required=False)
+@click.option("--rows", type=int, default=40000, help="Number of rows of the generated file, when no FILE is given.")
+@click.option("--repeat", type=int, default=1, help="Number of times each reader is run.")
+def main(file: str | None, rows: int, repeat: int) -> None:
+    """
+    Benchmarks the readers of the USPS spreadsheet.
+
+    FILE is a ZIP_Locale_Detail.xls published by the USPS, when it is not given a workbook of ROWS rows with the same
+    columns is generated (as xlsx).
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if file is None:
+            path = Path(tmp_dir) / "ZIP_Locale_Detail.xlsx"
+            path.write_bytes(make_zip_locale_detail(rows))
+        else:
+            path = Path(file)
+
+        for result in time_readers(path, repeat):
+            click.echo(
+                f"{result.reader:<16} {result.rows} rows in {result.elapsed:.2f}s ({result.rows_per_second:,.0f} rows/sec)"
+                + ("" if result.matches else ", differs from the full sheet"),
+            )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(name)-12s: %(levelname)-8s\t%(message)s",
+    )
+
+    main(_anyio_backend="asyncio")
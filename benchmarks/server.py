@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+import csv
+import hashlib
+import io
+import json
+import logging
+import random
+import threading
+import time
+from email import policy
+from email.parser import BytesParser
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING, Any, Final, NamedTuple
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+if TYPE_CHECKING:
+    import socket
+    from types import TracebackType
+
+    from typing_extensions import Self
+
+logger = logging.getLogger(__name__)
+
+
+# The bounding box of the contiguous United States, fake coordinates are spread over it.
+_MIN_LATITUDE: Final[float] = 24.5
+_MAX_LATITUDE: Final[float] = 49.4
+_MIN_LONGITUDE: Final[float] = -124.8
+_MAX_LONGITUDE: Final[float] = -66.9
+
+_STATES: Final[list[str]] = ["NY", "NJ", "PA", "OH", "IL", "TX", "CO", "AZ", "CA", "WA", "FL", "GA"]
+_SHEET_NAME: Final[str] = "ZIP_DETAIL"
+_LAST_MODIFIED: Final[str] = "Mon, 01 Jan 2024 00:00:00 GMT"
+_BENCHMARKS: Final[dict[str, Any]] = {
+    "benchmarks": [
+        {"id": "4", "benchmarkName": "Public_AR_Current", "benchmarkDescription": "Public Address Ranges - Current Benchmark", "isDefault": True},
+        {"id": "8", "benchmarkName": "Public_AR_ACS2024", "benchmarkDescription": "Public Address Ranges - ACS2024 Benchmark", "isDefault": False},
+    ]
+}
+_VINTAGES: Final[dict[str, Any]] = {
+    "vintages": [
+        {"id": "4", "vintageName": "Current_Current", "vintageDescription": "Current Vintage - Current Benchmark", "isDefault": True},
+    ]
+}
+
+
+class ServerConfig(NamedTuple):
+    """Controls how the fake server responds.
+
+    Attributes:
+        latency: The number of seconds every response is delayed by.
+        error_rate: The probability of answering a request with a 503 Service Unavailable.
+        no_match_rate: The probability of an address not being matched.
+        rows: The number of rows of the USPS ZIP_Locale_Detail file.
+        seed: The seed of the random errors and of the generated USPS file.
+    """
+
+    latency: float = 0.0
+    error_rate: float = 0.0
+    no_match_rate: float = 0.0
+    rows: int = 1000
+    seed: int = 0
+
+
+def fake_coordinates(address: str) -> tuple[float, float]:
+    """
+    Derives a stable latitude and longitude within the contiguous United States from the address.
+
+    Args:
+        address (str): The address.
+
+    Returns:
+        The latitude and longitude.
+
+    >>> fake_coordinates("1 MAIN ST") == fake_coordinates("1 MAIN ST")
+    True
+    """
+    digest = hashlib.sha256(address.encode()).digest()
+    lat_fraction = int.from_bytes(digest[:4], "big") / 0xFFFFFFFF
+    lng_fraction = int.from_bytes(digest[4:8], "big") / 0xFFFFFFFF
+    latitude = _MIN_LATITUDE + lat_fraction * (_MAX_LATITUDE - _MIN_LATITUDE)
+    longitude = _MIN_LONGITUDE + lng_fraction * (_MAX_LONGITUDE - _MIN_LONGITUDE)
+    return round(latitude, 6), round(longitude, 6)
+
+
+def _is_no_match(address: str, no_match_rate: float) -> bool:
+    # Use a hash rather than the random generator so the same address is always (un)matched
+    return int.from_bytes(hashlib.sha256(address.encode()).digest()[8:12], "big") / 0xFFFFFFFF < no_match_rate
+
+
+def make_zip_locale_detail(rows: int, seed: int = 0) -> bytes:
+    """
+    Generates a ZIP_Locale_Detail workbook in the shape published by the USPS.
+
+    Args:
+        rows (int): The number of rows.
+        seed (int): The seed of the generated cities and states.
+
+    Returns:
+        The workbook as xlsx bytes, which pandas reads regardless of the .xls extension it is served under.
+    """
+    rng = np.random.default_rng(seed)
+    ids = np.arange(rows)
+    zip_codes = np.char.zfill((10000 + ids * 7 % 89999).astype(str), 5)
+    df = pd.DataFrame(
+        {
+            "AREA NAME": "FAKE",
+            "AREA CODE": "4F",
+            "DISTRICT NAME": "FAKE",
+            "DISTRICT NO": "001",
+            "DELIVERY ZIPCODE": zip_codes,
+            "LOCALE NAME": "FAKE",
+            "PHYSICAL DELV ADDR": [f"{i} MAIN ST" for i in ids],
+            "PHYSICAL CITY": [f"CITY {i}" for i in rng.integers(0, max(1, rows // 10), rows)],
+            "PHYSICAL STATE": np.asarray(_STATES)[rng.integers(0, len(_STATES), rows)],
+            "PHYSICAL ZIP": zip_codes,
+            "PHYSICAL ZIP 4": "0001",
+        }
+    )
+    buffer = io.BytesIO()
+    df.to_excel(buffer, sheet_name=_SHEET_NAME, index=False)
+    return buffer.getvalue()
+
+
+def _geocode_batch(upload: bytes, no_match_rate: float) -> bytes:
+    """Answers a Census batch upload in the format of the addressbatch endpoint."""
+    output = io.StringIO()
+    writer = csv.writer(output, lineterminator="\n")
+    for row in csv.reader(io.StringIO(upload.decode())):
+        row_id, street, city, state, zip_code = (row + [""] * 5)[:5]
+        address = f"{street}, {city}, {state}, {zip_code}"
+        if _is_no_match(address, no_match_rate):
+            writer.writerow([row_id, address, "No_Match"])
+            continue
+
+        latitude, longitude = fake_coordinates(address)
+        writer.writerow([row_id, address, "Match", "Exact", address.upper(), f"{longitude},{latitude}", "0", "L", "00", "000", "000000", "0000"])
+    return output.getvalue().encode()
+
+
+def _parse_multipart(content_type: str, body: bytes) -> dict[str, bytes]:
+    """Parses a multipart/form-data body into the content of each named part."""
+    message = BytesParser(policy=policy.HTTP).parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+    parts: dict[str, bytes] = {}
+    for part in message.iter_parts():  # type: ignore[attr-defined]
+        name = part.get_param("name", header="content-disposition")
+        if name is not None:
+            payload = part.get_payload(decode=True)
+            parts[str(name)] = payload if isinstance(payload, bytes) else b""
+    return parts
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: FakeServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        logger.debug(format, *args)
+
+    def do_GET(self) -> None:
+        self._handle("GET")
+
+    def do_POST(self) -> None:
+        self._handle("POST")
+
+    def _handle(self, method: str) -> None:
+        started = time.perf_counter()
+        url = urlsplit(self.path)
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0) or 0))
+        try:
+            time.sleep(self.server.config.latency)
+            if self.server.should_fail():
+                self._send(HTTPStatus.SERVICE_UNAVAILABLE, b"Service Unavailable", "text/plain")
+                return
+
+            self._route(method, url.path, parse_qs(url.query), body)
+        finally:
+            self.server.record(url.path, time.perf_counter() - started)
+
+    def _route(self, method: str, path: str, query: dict[str, list[str]], body: bytes) -> None:
+        config = self.server.config
+        if method == "GET" and path.endswith("/geocoder/benchmarks"):
+            self._send_json(_BENCHMARKS)
+        elif method == "GET" and path.endswith("/geocoder/vintages"):
+            self._send_json(_VINTAGES)
+        elif method == "GET" and path.endswith("/geocoder/locations/address"):
+            address = ", ".join(query.get(key, [""])[0] for key in ("street", "city", "state", "zip"))
+            matches = []
+            if not _is_no_match(address, config.no_match_rate):
+                latitude, longitude = fake_coordinates(address)
+                matches.append({"matchedAddress": address.upper(), "coordinates": {"x": longitude, "y": latitude}})
+            self._send_json({"result": {"addressMatches": matches}})
+        elif method == "POST" and path.endswith("/geocoder/geographies/addressbatch"):
+            parts = _parse_multipart(self.headers.get("Content-Type", ""), body)
+            self._send(HTTPStatus.OK, _geocode_batch(parts.get("addressFile", b""), config.no_match_rate), "text/csv")
+        elif method == "GET" and path.endswith("/ZIP_Locale_Detail.xls"):
+            self._send_file(self.server.zip_locale_detail, "application/vnd.ms-excel")
+        else:
+            self._send(HTTPStatus.NOT_FOUND, b"Not Found", "text/plain")
+
+    def _send_json(self, payload: dict[str, Any]) -> None:
+        self._send(HTTPStatus.OK, json.dumps(payload).encode(), "application/json")
+
+    def _send_file(self, body: bytes, content_type: str) -> None:
+        # Like the USPS server, answer a conditional GET with 304 Not Modified when the file did not change
+        etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+        if self.headers.get("If-None-Match") == etag:
+            self._send(HTTPStatus.NOT_MODIFIED, b"", content_type, {"ETag": etag, "Last-Modified": _LAST_MODIFIED})
+        else:
+            self._send(HTTPStatus.OK, body, content_type, {"ETag": etag, "Last-Modified": _LAST_MODIFIED})
+
+    def _send(self, status: HTTPStatus, body: bytes, content_type: str, headers: dict[str, str] | None = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if status != HTTPStatus.NOT_MODIFIED:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeServer(ThreadingHTTPServer):
+    """
+    A local stand-in for the Census geocoder and the USPS ZIP_Locale_Detail download.
+
+    The server answers the benchmarks, vintages, locations/address and geographies/addressbatch endpoints of the Census
+    geocoder under /geocoder, and the USPS file under /mnt/glusterfs/{YEAR}-{MONTH}/ZIP_Locale_Detail.xls, so pointing
+    ZIPCODE_COORDINATES_TZ_CENSUS_URL at census_url and ZIPCODE_COORDINATES_TZ_USPS_URL at usps_url runs the whole
+    pipeline locally. The time spent answering every request is recorded per path, and the connections accepted are counted.
+
+    Args:
+        config (ServerConfig): Controls the latency, errors and payload sizes (defaults to ServerConfig()).
+        host (str): The interface to listen on (defaults to the loopback interface).
+        port (int): The port to listen on (defaults to any free port).
+    """
+
+    daemon_threads = True
+
+    def __init__(self, config: ServerConfig | None = None, host: str = "127.0.0.1", port: int = 0) -> None:
+        super().__init__((host, port), _Handler)
+        self.config = config if config is not None else ServerConfig()
+        self.zip_locale_detail = make_zip_locale_detail(self.config.rows, self.config.seed)
+        self.latencies: dict[str, list[float]] = {}
+        self.connections = 0
+        self._random = random.Random(self.config.seed)  # noqa: S311
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        """The base URL of the server."""
+        host, port = self.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+    @property
+    def census_url(self) -> str:
+        """The base URL of the fake Census geocoder."""
+        return f"{self.url}/geocoder"
+
+    @property
+    def usps_url(self) -> str:
+        """The base URL of the fake USPS download."""
+        return self.url
+
+    def should_fail(self) -> bool:
+        """Draws whether the next request fails according to the error rate."""
+        with self._lock:
+            return self._random.random() < self.config.error_rate
+
+    def process_request(self, request: socket.socket | tuple[bytes, socket.socket], client_address: Any) -> None:  # noqa: ANN401
+        """Counts the connection before handing it to a thread."""
+        with self._lock:
+            self.connections += 1
+        super().process_request(request, client_address)
+
+    def record(self, path: str, elapsed: float) -> None:
+        """Records the time spent answering a request to the path."""
+        with self._lock:
+            self.latencies.setdefault(path, []).append(elapsed)
+
+    def start(self) -> Self:
+        """Serves requests on a background thread."""
+        self._thread = threading.Thread(target=self.serve_forever, name="FakeServer", daemon=True)
+        self._thread.start()
+        logger.info("Serving fake Census and USPS endpoints on %s", self.url)
+        return self
+
+    def stop(self) -> None:
+        """Stops serving requests and closes the socket."""
+        if self._thread is not None:
+            self.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.server_close()
+
+    def __enter__(self) -> Self:
+        return self.start()
+
+    def __exit__(self, exc_type: type[BaseException] | None, exc_value: BaseException | None, traceback: TracebackType | None) -> None:
+        self.stop()
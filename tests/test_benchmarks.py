@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import datetime
+import io
+import os
+import subprocess
+import sys
+from typing import TYPE_CHECKING
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+from tenacity import wait_none
+
+from benchmarks import harness
+from benchmarks.harness import run_save, summarize_latencies
+from benchmarks.ingest import time_readers
+from benchmarks.server import FakeServer, ServerConfig, fake_coordinates, make_zip_locale_detail
+from zipcode_coordinates_tz import cache, census, constants, http, postal
+from zipcode_coordinates_tz.models import Coordinate
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+
+@pytest.fixture
+def server() -> Iterator[FakeServer]:
+    with (
+        FakeServer(ServerConfig(rows=50, no_match_rate=0.2)) as fake_server,
+        patch.object(census, "_CENSUS_URL", f"{fake_server.census_url}/locations/address"),
+        patch.object(census, "_CENSUS_BATCH_URL", f"{fake_server.census_url}/geographies/addressbatch"),
+        patch.object(census, "_BENCHMARKS_URL", f"{fake_server.census_url}/benchmarks"),
+        patch.object(census, "_VINTAGES_URL", f"{fake_server.census_url}/vintages"),
+        patch.object(postal, "_URL_FMT", fake_server.usps_url + "/mnt/glusterfs/{YEAR:04}-{MONTH:02}/ZIP_Locale_Detail.xls"),
+    ):
+        yield fake_server
+
+
+class TestFakeCoordinates:
+    def test_within_contiguous_united_states(self) -> None:
+        latitude, longitude = fake_coordinates("1 MAIN ST, NEW YORK, NY, 10001")
+        assert 24.5 <= latitude <= 49.4
+        assert -124.8 <= longitude <= -66.9
+
+
+@pytest.mark.asyncio
+class TestFakeServer:
+    async def test_serves_benchmarks_and_vintages(self, server: FakeServer) -> None:
+        df_benchmarks = await census.get_benchmarks()
+        df_vintages = await census.get_vintages()
+        assert df_benchmarks["Name"].tolist() == ["Public_AR_Current", "Public_AR_ACS2024"]
+        assert df_vintages["Name"].tolist() == ["Current_Current"]
+
+    async def test_serves_address_lookups(self, server: FakeServer) -> None:
+        result = await census.get_address_coordinates("1 Main St", "New York", "NY", "10001")
+        if result is not None:
+            assert result == Coordinate(*fake_coordinates("1 Main St, New York, NY, 10001"))
+
+    async def test_session_pool_reuses_connections(self, server: FakeServer) -> None:
+        async with http.SessionPool():
+            await census.get_benchmarks()
+            await census.get_vintages()
+            await census.get_addresses_coordinates([("1 Main St", "New York", "NY", "10001")] * 4, max_concurrency=1)
+        assert server.connections == 1
+
+        await census.get_benchmarks()
+        await census.get_vintages()
+        assert server.connections == 3
+
+    async def test_download_cache_revalidates_the_usps_file(self, server: FakeServer, tmp_path: Path) -> None:
+        download_cache = cache.DownloadCache(tmp_path)
+        with patch.object(download_cache, "put", wraps=download_cache.put) as put:
+            first = await postal.get_locales(datetime.date(2024, 1, 1), download_cache=download_cache)
+            second = await postal.get_locales(datetime.date(2024, 1, 1), download_cache=download_cache)
+
+        # The second download is answered with 304 Not Modified and served from the cache
+        put.assert_called_once()
+        pd.testing.assert_frame_equal(first, second)
+        assert len(server.latencies["/mnt/glusterfs/2024-01/ZIP_Locale_Detail.xls"]) == 2
+
+    async def test_locales_cache_skips_the_download(self, server: FakeServer, tmp_path: Path) -> None:
+        locales_cache = cache.LocalesCache(tmp_path)
+        first = await postal.get_locales(datetime.date(2024, 1, 1), locales_cache=locales_cache)
+        second = await postal.get_locales(datetime.date(2024, 1, 1), locales_cache=locales_cache)
+
+        assert len(server.latencies["/mnt/glusterfs/2024-01/ZIP_Locale_Detail.xls"]) == 1
+        assert second.astype(object).equals(first.astype(object))
+
+    async def test_serves_the_save_pipeline(self, server: FakeServer) -> None:
+        df_locales = await postal.get_locales(datetime.date(2024, 1, 1))
+        df_coordinates = await census.get_coordinates(df_locales, batch_size=20)
+
+        assert len(df_locales) == 50
+        assert list(df_locales.columns) == [constants.Columns.STREET, constants.Columns.CITY, constants.Columns.STATE, constants.Columns.ZIPCODE]
+        assert 0 < df_coordinates[constants.Columns.LATITUDE].notna().sum() < 50
+        assert len(server.latencies["/geocoder/geographies/addressbatch"]) == 3
+
+    async def test_errors_are_retried(self) -> None:
+        with FakeServer(ServerConfig(error_rate=1.0)) as fake_server, patch.object(census, "_BENCHMARKS_URL", f"{fake_server.census_url}/benchmarks"):
+            with (
+                patch.object(http._get_json.retry, "wait", wait_none()),  # type: ignore[attr-defined]
+                pytest.raises(Exception, match="503"),
+            ):
+                await census.get_benchmarks()
+
+            assert len(fake_server.latencies["/geocoder/benchmarks"]) == constants.MAX_RETRIES
+
+    async def test_generated_file_has_usps_columns(self, server: FakeServer) -> None:
+        df = pd.read_excel(io.BytesIO(server.zip_locale_detail), sheet_name="ZIP_DETAIL", dtype=str)
+        assert {"PHYSICAL DELV ADDR", "PHYSICAL CITY", "PHYSICAL STATE", "DELIVERY ZIPCODE"} <= set(df.columns)
+
+
+class TestSummarizeLatencies:
+    def test_percentiles_per_path(self) -> None:
+        result = summarize_latencies({"/b": [0.1] * 10, "/a": [float(i) for i in range(101)], "/empty": []})
+        assert [summary.path for summary in result] == ["/a", "/b"]
+        assert result[0].requests == 101
+        assert result[0].percentiles == pytest.approx((50.0, 90.0, 99.0))
+
+
+class TestRunAndMeasure:
+    @pytest.mark.skipif(sys.platform != "linux", reason="The peak RSS is read from /proc")
+    def test_peak_rss_is_measured_per_process(self) -> None:
+        large = harness._run_and_measure([sys.executable, "-c", "import time; b = b'x' * 256 * 2**20; time.sleep(0.5)"], dict(os.environ))
+        small = harness._run_and_measure([sys.executable, "-c", "import time; time.sleep(0.5)"], dict(os.environ))
+        assert large is not None
+        assert small is not None
+        assert small < large - 128 * 2**20
+
+    def test_failed_process_raises(self) -> None:
+        with pytest.raises(subprocess.CalledProcessError):
+            harness._run_and_measure([sys.executable, "-c", "raise SystemExit(3)"], dict(os.environ))
+
+
+class TestRunSave:
+    def test_reports_rows_and_latencies(self) -> None:
+        result = run_save(ServerConfig(rows=20), ("--coordinates",))
+        assert result.rows == 20
+        assert result.rows_per_second > 0
+        assert result.peak_rss is not None
+        assert result.peak_rss > 0
+        paths = [summary.path for summary in result.latencies]
+        assert paths[0] == "/geocoder/geographies/addressbatch"
+        assert paths[1].endswith("/ZIP_Locale_Detail.xls")
+
+    def test_timezone_shortcuts_are_only_derived_from_unfiltered_runs(self, tmp_path: Path) -> None:
+        shortcuts_file = tmp_path / "shortcuts.json"
+        run_save(ServerConfig(rows=20), ("--state", "NY", "--timezones", "--timezone-shortcuts", str(shortcuts_file)))
+        assert not shortcuts_file.exists()
+
+        run_save(ServerConfig(rows=20), ("--timezones", "--timezone-shortcuts", str(shortcuts_file)))
+        assert shortcuts_file.exists()
+
+
+class TestTimeReaders:
+    def test_pruned_readers_match_the_full_sheet(self, tmp_path: Path) -> None:
+        file = tmp_path / "ZIP_Locale_Detail.xlsx"
+        file.write_bytes(make_zip_locale_detail(20))
+
+        results = time_readers(file)
+
+        assert [result.reader for result in results[:2]] == ["full sheet", "pruned pandas"]
+        assert all(result.rows == 20 and result.matches for result in results)
@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import datetime
+import os
+from typing import TYPE_CHECKING
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from zipcode_coordinates_tz import constants
+from zipcode_coordinates_tz.cache import DownloadCache, LocalesCache, SQLiteGeocodeCache, normalize_addresses
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+
+def _make_results_df(rows: list[dict]) -> pd.DataFrame:  # type: ignore[type-arg]
+    return pd.DataFrame(
+        rows,
+        columns=[
+            constants.Columns.STREET,
+            constants.Columns.CITY,
+            constants.Columns.STATE,
+            constants.Columns.ZIPCODE,
+            constants.Columns.MATCH,
+            constants.Columns.LATITUDE,
+            constants.Columns.LONGITUDE,
+        ],
+    )
+
+
+_MATCH_ROW = {"Street": "1 Main St", "City": "New York", "State": "NY", "ZipCode": "10001", "Match": "Match", "Latitude": 40.7, "Longitude": -74.0}
+_NO_MATCH_ROW = {
+    "Street": "1 Nowhere St",
+    "City": "Nowhere",
+    "State": "NY",
+    "ZipCode": "10002",
+    "Match": "No_Match",
+    "Latitude": None,
+    "Longitude": None,
+}
+
+
+@pytest.fixture
+def geocode_cache(tmp_path: Path) -> Iterator[SQLiteGeocodeCache]:
+    with SQLiteGeocodeCache(tmp_path / "geocode.sqlite3") as c:
+        yield c
+
+
+class TestNormalizeAddresses:
+    def test_collapses_whitespace_and_case(self) -> None:
+        df = pd.DataFrame({"Street": ["  1   Main  St "], "City": ["new york"], "State": ["ny"], "ZipCode": ["10001"]})
+        result = normalize_addresses(df)
+        assert result.iloc[0].tolist() == ["1 MAIN ST", "NEW YORK", "NY", "10001"]
+
+    def test_missing_values_become_empty(self) -> None:
+        df = pd.DataFrame({"Street": [None], "City": ["New York"], "State": ["NY"], "ZipCode": ["10001"]})
+        result = normalize_addresses(df)
+        assert result[constants.Columns.STREET].iloc[0] == ""
+
+    def test_preserves_index(self) -> None:
+        df = pd.DataFrame({"Street": ["a", "b"], "City": ["c", "d"], "State": ["e", "f"], "ZipCode": ["g", "h"]}, index=[10, 20])
+        assert list(normalize_addresses(df).index) == [10, 20]
+
+
+class TestSQLiteGeocodeCache:
+    def test_miss_returns_empty(self, geocode_cache: SQLiteGeocodeCache) -> None:
+        result = geocode_cache.get(_make_results_df([_MATCH_ROW]), "4", "Current_Current")
+        assert result.empty
+        assert list(result.columns) == [constants.Columns.MATCH, constants.Columns.LATITUDE, constants.Columns.LONGITUDE]
+
+    def test_roundtrip_uses_lookup_index(self, geocode_cache: SQLiteGeocodeCache) -> None:
+        geocode_cache.put(_make_results_df([_MATCH_ROW]), "4", "Current_Current")
+        lookup = _make_results_df([_NO_MATCH_ROW, _MATCH_ROW]).set_axis([7, 9])
+
+        result = geocode_cache.get(lookup, "4", "Current_Current")
+
+        assert list(result.index) == [9]
+        assert result[constants.Columns.LATITUDE].iloc[0] == pytest.approx(40.7)
+        assert result[constants.Columns.LONGITUDE].iloc[0] == pytest.approx(-74.0)
+
+    def test_lookup_is_normalized(self, geocode_cache: SQLiteGeocodeCache) -> None:
+        geocode_cache.put(_make_results_df([_MATCH_ROW]), "4", "Current_Current")
+        lookup = _make_results_df([{**_MATCH_ROW, "Street": "1 MAIN  ST", "City": "new york"}])
+        assert len(geocode_cache.get(lookup, "4", "Current_Current")) == 1
+
+    def test_keyed_by_benchmark_and_vintage(self, geocode_cache: SQLiteGeocodeCache) -> None:
+        geocode_cache.put(_make_results_df([_MATCH_ROW]), "4", "Current_Current")
+        assert geocode_cache.get(_make_results_df([_MATCH_ROW]), "8", "Current_Current").empty
+        assert geocode_cache.get(_make_results_df([_MATCH_ROW]), "4", "Census2020_Current").empty
+
+    def test_no_match_is_cached(self, geocode_cache: SQLiteGeocodeCache) -> None:
+        geocode_cache.put(_make_results_df([_NO_MATCH_ROW]), "4", "Current_Current")
+        result = geocode_cache.get(_make_results_df([_NO_MATCH_ROW]), "4", "Current_Current")
+        assert result[constants.Columns.MATCH].iloc[0] == "No_Match"
+        assert pd.isna(result[constants.Columns.LATITUDE].iloc[0])
+
+    def test_no_match_expires_after_negative_ttl(self, tmp_path: Path) -> None:
+        with SQLiteGeocodeCache(tmp_path / "geocode.sqlite3", negative_ttl=datetime.timedelta(days=1)) as c:
+            with patch("zipcode_coordinates_tz.cache.time.time", return_value=0.0):
+                c.put(_make_results_df([_MATCH_ROW, _NO_MATCH_ROW]), "4", "Current_Current")
+
+            with patch("zipcode_coordinates_tz.cache.time.time", return_value=datetime.timedelta(days=2).total_seconds()):
+                result = c.get(_make_results_df([_MATCH_ROW, _NO_MATCH_ROW]), "4", "Current_Current")
+
+        assert result[constants.Columns.MATCH].tolist() == ["Match"]
+
+    def test_match_expires_after_ttl(self, tmp_path: Path) -> None:
+        with SQLiteGeocodeCache(tmp_path / "geocode.sqlite3", ttl=datetime.timedelta(days=1)) as c:
+            with patch("zipcode_coordinates_tz.cache.time.time", return_value=0.0):
+                c.put(_make_results_df([_MATCH_ROW]), "4", "Current_Current")
+
+            with patch("zipcode_coordinates_tz.cache.time.time", return_value=datetime.timedelta(days=2).total_seconds()):
+                assert c.get(_make_results_df([_MATCH_ROW]), "4", "Current_Current").empty
+
+    def test_persists_across_instances(self, tmp_path: Path) -> None:
+        with SQLiteGeocodeCache(tmp_path / "geocode.sqlite3") as c:
+            c.put(_make_results_df([_MATCH_ROW]), "4", "Current_Current")
+
+        with SQLiteGeocodeCache(tmp_path / "geocode.sqlite3") as c:
+            assert len(c.get(_make_results_df([_MATCH_ROW]), "4", "Current_Current")) == 1
+
+
+def _download(tmp_path: Path, name: str, content: bytes) -> Path:
+    path = tmp_path / name
+    path.write_bytes(content)
+    return path
+
+
+class TestDownloadCache:
+    _URL = "https://example.com/2024-01/ZIP_Locale_Detail.xls"
+
+    def test_stores_and_gets_a_download(self, tmp_path: Path) -> None:
+        download_cache = DownloadCache(tmp_path / "downloads")
+        stored = download_cache.put(self._URL, _download(tmp_path, "a.xls", b"content"), '"etag"', "Mon, 01 Jan 2024 00:00:00 GMT")
+        entry = download_cache.get(self._URL)
+
+        assert entry == stored
+        assert entry is not None
+        assert entry.path.read_bytes() == b"content"
+        assert entry.path.suffix == ".xls"
+        assert (entry.etag, entry.last_modified) == ('"etag"', "Mon, 01 Jan 2024 00:00:00 GMT")
+        assert download_cache.get("https://example.com/2024-02/ZIP_Locale_Detail.xls") is None
+
+    def test_identical_content_is_stored_once(self, tmp_path: Path) -> None:
+        download_cache = DownloadCache(tmp_path / "downloads")
+        first = download_cache.put(self._URL, _download(tmp_path, "a.xls", b"content"))
+        second = download_cache.put(self._URL.replace("2024-01", "2024-02"), _download(tmp_path, "b.xls", b"content"))
+        assert first.path == second.path
+
+    def test_entries_expire_by_month(self, tmp_path: Path) -> None:
+        download_cache = DownloadCache(tmp_path / "downloads", retention_months=2)
+        with patch("zipcode_coordinates_tz.cache.constants.get_date_in_ny", return_value=datetime.date(2024, 1, 31)):
+            download_cache.put(self._URL, _download(tmp_path, "a.xls", b"content"))
+
+        with patch("zipcode_coordinates_tz.cache.constants.get_date_in_ny", return_value=datetime.date(2024, 2, 29)):
+            assert download_cache.get(self._URL) is not None
+        with patch("zipcode_coordinates_tz.cache.constants.get_date_in_ny", return_value=datetime.date(2024, 3, 1)):
+            assert download_cache.get(self._URL) is None
+
+    def test_prune_removes_expired_entries_and_their_files(self, tmp_path: Path) -> None:
+        download_cache = DownloadCache(tmp_path / "downloads")
+        with patch("zipcode_coordinates_tz.cache.constants.get_date_in_ny", return_value=datetime.date(2024, 1, 1)):
+            entry = download_cache.put(self._URL, _download(tmp_path, "a.xls", b"content"))
+        os.utime(entry.path, (0, 0))
+
+        download_cache.prune()
+        assert not entry.path.exists()
+        assert not list((tmp_path / "downloads").rglob("*.json"))
+
+    def test_retention_months_must_be_positive(self, tmp_path: Path) -> None:
+        with pytest.raises(ValueError, match="retention_months"):
+            DownloadCache(tmp_path, retention_months=0)
+
+
+class TestLocalesCache:
+    _URL = "https://example.com/2024-01/ZIP_Locale_Detail.xls"
+    _DF = pd.DataFrame({"Street": ["1 MAIN ST"], "City": ["NEW YORK"], "State": ["NY"], "ZipCode": ["10001"]})
+
+    def test_stores_and_gets_a_frame(self, tmp_path: Path) -> None:
+        locales_cache = LocalesCache(tmp_path)
+        assert locales_cache.get(self._URL) is None
+
+        locales_cache.put(self._URL, self._DF)
+        result = locales_cache.get(self._URL)
+
+        assert result is not None
+        assert result.astype(object).equals(self._DF.astype(object))
+        assert locales_cache.get(self._URL.replace("2024-01", "2024-02")) is None
+
+    def test_frames_expire_by_month(self, tmp_path: Path) -> None:
+        locales_cache = LocalesCache(tmp_path)
+        with patch("zipcode_coordinates_tz.cache.constants.get_date_in_ny", return_value=datetime.date(2024, 1, 31)):
+            locales_cache.put(self._URL, self._DF)
+            assert locales_cache.get(self._URL) is not None
+
+        with patch("zipcode_coordinates_tz.cache.constants.get_date_in_ny", return_value=datetime.date(2024, 2, 1)):
+            assert locales_cache.get(self._URL) is None
+            locales_cache.put(self._URL.replace("2024-01", "2024-02"), self._DF)
+
+        assert [file.name[:7] for file in tmp_path.iterdir()] == ["2024-02"]
+
+    def test_pickles_without_pyarrow(self, tmp_path: Path) -> None:
+        with patch("zipcode_coordinates_tz.cache.importlib.util.find_spec", return_value=None):
+            locales_cache = LocalesCache(tmp_path)
+        locales_cache.put(self._URL, self._DF)
+
+        assert [file.suffix for file in tmp_path.iterdir()] == [".pkl"]
+        assert locales_cache.get(self._URL) is not None
+
+    @pytest.mark.parametrize("parquet", [True, False])
+    def test_keeps_the_index(self, tmp_path: Path, parquet: bool) -> None:
+        if parquet:
+            pytest.importorskip("pyarrow")
+        locales_cache = LocalesCache(tmp_path)
+        locales_cache.parquet = parquet
+        locales_cache.put(self._URL, self._DF.set_axis([5]))
+
+        result = locales_cache.get(self._URL)
+
+        assert result is not None
+        assert result.index.tolist() == [5]
+
+    def test_reads_only_the_states_of_a_parquet_frame(self, tmp_path: Path) -> None:
+        pytest.importorskip("pyarrow")
+        df = pd.DataFrame(
+            {
+                "Street": ["1 MAIN ST", "2 MAIN ST", "3 MAIN ST"],
+                "City": ["NEW YORK", "AVENEL", "NEWARK"],
+                "State": ["NY", "NJ", "NJ"],
+                "ZipCode": ["10001", "07001", "07101"],
+            }
+        )
+        locales_cache = LocalesCache(tmp_path)
+        locales_cache.put(self._URL, df)
+
+        result = locales_cache.get(self._URL, ["NJ"])
+
+        assert result is not None
+        assert result.index.tolist() == [1, 2]
+        assert result.astype(object).equals(df.iloc[1:].astype(object))
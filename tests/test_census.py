@@ -1,22 +1,30 @@
 from __future__ import annotations
 
-import tempfile
+import asyncio
+import csv
+import io
 from contextlib import asynccontextmanager
-from pathlib import Path
-from typing import Any
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Any
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pandas as pd
 import pytest
+from curl_cffi import requests
 
 from zipcode_coordinates_tz import census, constants
-from zipcode_coordinates_tz.models import Benchmark, Coordinate
+from zipcode_coordinates_tz.cache import SQLiteGeocodeCache
+from zipcode_coordinates_tz.models import Address, BatchFailure, BatchSizing, Benchmark, Coordinate
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Callable, Iterator
+    from pathlib import Path
 
 
 def _make_json_response(payload: dict[str, Any]) -> AsyncMock:
     response = AsyncMock()
     response.raise_for_status = MagicMock()
-    response.json = AsyncMock(return_value=payload)
+    response.json = MagicMock(return_value=payload)
     return response
 
 
@@ -43,86 +51,251 @@ def _make_locales_df(rows: list[dict]) -> pd.DataFrame:  # type: ignore[type-arg
     )
 
 
+def _list_dir(path: Path) -> list[Path]:
+    return list(path.iterdir())
+
+
+def _make_batch_response(upload: bytes) -> io.BytesIO:
+    """Builds a Census batch response that matches every uploaded row, using the row ID as the latitude and its negation as the longitude."""
+    lines = [
+        f'{row_id},"{street}, {city}, {state}, {zip_code}",Match,Exact,"{street}","{-int(row_id)},{int(row_id)}",,,,,,'
+        for row_id, street, city, state, zip_code in csv.reader(io.StringIO(upload.decode()))
+    ]
+    return io.BytesIO(("\n".join(lines) + "\n").encode())
+
+
+def _make_http_error(status: HTTPStatus) -> requests.exceptions.HTTPError:
+    """Builds the error raised for a response with the status, its phrase as the message."""
+    return requests.exceptions.HTTPError(status.phrase, response=MagicMock(status_code=status.value))
+
+
+class TestIterBatches:
+    def test_respects_record_limit(self) -> None:
+        df = _make_locales_df([{"Street": f"{i} Main St", "City": "New York", "State": "NY", "ZipCode": "10001"} for i in range(7)])
+        sizer = census._BatchSizer(3, BatchSizing.FIXED, census.DEFAULT_TARGET_BATCH_LATENCY)
+        batches = list(census._iter_batches(df, sizer))
+        assert [idx for idx, _, _ in batches] == [0, 3, 6]
+        assert [len(chunk) for _, chunk, _ in batches] == [3, 3, 1]
+        assert [len(payload.splitlines()) for _, _, payload in batches] == [3, 3, 1]
+
+    def test_respects_byte_limit(self) -> None:
+        df = _make_locales_df([{"Street": "1 Main St" * (i + 1), "City": "New York", "State": "NY", "ZipCode": "10001"} for i in range(5)])
+        sizer = census._BatchSizer(census.MAX_BATCH_RECORDS, BatchSizing.FIXED, census.DEFAULT_TARGET_BATCH_LATENCY)
+        with patch.object(census, "MAX_BATCH_BUFFER_SIZE", 100):
+            batches = list(census._iter_batches(df, sizer))
+
+        assert all(len(payload) <= 100 for _, _, payload in batches)
+        assert sum(len(chunk) for _, chunk, _ in batches) == 5
+        assert b"".join(payload for _, _, payload in batches) == df.to_csv(header=False, lineterminator="\n").encode()
+
+    def test_skips_rows_larger_than_byte_limit(self) -> None:
+        df = _make_locales_df(
+            [
+                {"Street": "1 Main St", "City": "New York", "State": "NY", "ZipCode": "10001"},
+                {"Street": "2 Main St" * 20, "City": "New York", "State": "NY", "ZipCode": "10001"},
+                {"Street": "3 Main St", "City": "New York", "State": "NY", "ZipCode": "10001"},
+            ]
+        )
+        sizer = census._BatchSizer(census.MAX_BATCH_RECORDS, BatchSizing.FIXED, census.DEFAULT_TARGET_BATCH_LATENCY)
+        skipped: list[tuple[pd.DataFrame, str]] = []
+        with patch.object(census, "MAX_BATCH_BUFFER_SIZE", 100):
+            batches = list(census._iter_batches(df, sizer, lambda chunk, error: skipped.append((chunk, error))))
+
+        assert [list(chunk.index) for _, chunk, _ in batches] == [[0], [2]]
+        assert [list(chunk.index) for chunk, _ in skipped] == [[1]]
+        assert "exceed the 100 byte batch limit" in skipped[0][1]
+
+    def test_line_breaks_are_replaced(self) -> None:
+        df = _make_locales_df([{"Street": "1 Main St\nApt 2", "City": "New York", "State": "NY", "ZipCode": "10001"}])
+        sizer = census._BatchSizer(census.MAX_BATCH_RECORDS, BatchSizing.FIXED, census.DEFAULT_TARGET_BATCH_LATENCY)
+        [(_, _, payload)] = census._iter_batches(df, sizer)
+        assert payload == b"0,1 Main St Apt 2,New York,NY,10001\n"
+
+    def test_uses_current_size_for_each_batch(self) -> None:
+        df = _make_locales_df([{"Street": f"{i} Main St", "City": "New York", "State": "NY", "ZipCode": "10001"} for i in range(10)])
+        sizer = census._BatchSizer(2, BatchSizing.FIXED, census.DEFAULT_TARGET_BATCH_LATENCY)
+        batches = census._iter_batches(df, sizer)
+        assert len(next(batches)[1]) == 2
+        sizer.size = 5
+        assert len(next(batches)[1]) == 5
+
+
+class TestBatchSizer:
+    def test_fixed_never_changes(self) -> None:
+        sizer = census._BatchSizer(1000, BatchSizing.FIXED, 10.0)
+        sizer.on_success(1000, 1.0)
+        sizer.on_failure()
+        assert sizer.size == 1000
+
+    def test_size_is_capped_at_max_records(self) -> None:
+        assert census._BatchSizer(census.MAX_BATCH_RECORDS + 1, BatchSizing.FIXED, 10.0).size == census.MAX_BATCH_RECORDS
+
+    def test_adaptive_grows_when_fast(self) -> None:
+        sizer = census._BatchSizer(1000, BatchSizing.ADAPTIVE, 10.0)
+        sizer.on_success(1000, 1.0)
+        assert sizer.size == 1500
+
+    def test_adaptive_ignores_partial_batches(self) -> None:
+        sizer = census._BatchSizer(1000, BatchSizing.ADAPTIVE, 10.0)
+        sizer.on_success(10, 1.0)
+        assert sizer.size == 1000
+
+    def test_adaptive_shrinks_towards_target_when_slow(self) -> None:
+        sizer = census._BatchSizer(1000, BatchSizing.ADAPTIVE, 10.0)
+        sizer.on_success(1000, 40.0)
+        assert sizer.size == 250
+
+    def test_adaptive_halves_on_failure(self) -> None:
+        sizer = census._BatchSizer(1000, BatchSizing.ADAPTIVE, 10.0)
+        sizer.on_failure()
+        assert sizer.size == 500
+
+    def test_adaptive_stays_within_bounds(self) -> None:
+        sizer = census._BatchSizer(census.MAX_BATCH_RECORDS, BatchSizing.ADAPTIVE, 10.0)
+        sizer.on_success(census.MAX_BATCH_RECORDS, 1.0)
+        assert sizer.size == census.MAX_BATCH_RECORDS
+        for _ in range(20):
+            sizer.on_failure()
+        assert sizer.size == census.MIN_ADAPTIVE_BATCH_SIZE
+
+
+class TestParseBatchResponse:
+    def test_splits_coordinates(self) -> None:
+        content = b'0,"1 Main St, New York, NY, 10001",Match,Exact,"1 MAIN ST, NEW YORK, NY, 10001","-74.006,40.7128",1,2,3,4,5,6\n'
+        result = census._parse_batch_response(io.BytesIO(content))
+        assert list(result.columns) == [constants.Columns.MATCH, constants.Columns.LATITUDE, constants.Columns.LONGITUDE]
+        assert result.loc[0, constants.Columns.LATITUDE] == pytest.approx(40.7128)
+        assert result.loc[0, constants.Columns.LONGITUDE] == pytest.approx(-74.006)
+
+    def test_non_matches_have_no_coordinates(self) -> None:
+        content = b'0,"1 Main St, New York, NY, 10001",No_Match\n1,"2 Main St, New York, NY, 10001",Tie\n'
+        result = census._parse_batch_response(io.BytesIO(content))
+        assert result[constants.Columns.MATCH].tolist() == ["No_Match", "Tie"]
+        assert result[constants.Columns.LATITUDE].isna().all()
+        assert result[constants.Columns.LATITUDE].dtype == "float64"
+        assert result[constants.Columns.LONGITUDE].dtype == "float64"
+
+
+def _make_session() -> AsyncMock:
+    """Builds a mock Session that is its own async context manager."""
+    session = AsyncMock()
+    session.__aenter__ = AsyncMock(return_value=session)
+    session.__aexit__ = AsyncMock(return_value=False)
+    return session
+
+
+@pytest.fixture
+def mock_session() -> Iterator[AsyncMock]:
+    """Replaces the Session opened when no session is given with a mock, whose get answers nothing until it is set."""
+    session = _make_session()
+    with patch("zipcode_coordinates_tz.census.requests.AsyncSession", return_value=session):
+        yield session
+
+
+class _FakeBatchEndpoint:
+    """
+    Stands in for http.post_and_spool on the Census batch endpoint, recording every upload.
+
+    Each upload fails with the error that fail returns for it, if any, else it is answered by respond.
+
+    Attributes:
+        uploads: The CSV payload of every upload, in the order they were sent.
+        max_in_flight: The largest number of uploads in flight at once.
+        delay: The seconds every upload takes.
+        fail: Returns the error the upload fails with, or None.
+        respond: Returns the response to the upload (defaults to _make_batch_response).
+    """
+
+    def __init__(self) -> None:
+        self.uploads: list[bytes] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.delay = 0.0
+        self.fail: Callable[[bytes], Exception | None] = lambda upload: None
+        self.respond: Callable[[bytes], io.BytesIO] = _make_batch_response
+
+    @asynccontextmanager
+    async def post(self, session: object, url: str, params: dict[str, str], mp: MagicMock) -> AsyncIterator[io.BytesIO]:
+        upload = mp.addpart.call_args.kwargs["data"]
+        self.uploads.append(upload)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        error = self.fail(upload)
+        if error is not None:
+            raise error
+        yield self.respond(upload)
+
+
+def _fail_uploads_with(error: Exception, marker: bytes = b"") -> Callable[[bytes], Exception | None]:
+    """Fails the uploads that contain the marker (defaults to every upload) with the error."""
+    return lambda upload: error if marker in upload else None
+
+
+@pytest.fixture
+def batch_endpoint(mock_session: AsyncMock) -> Iterator[_FakeBatchEndpoint]:
+    """Answers the batch uploads of census with a _FakeBatchEndpoint."""
+    endpoint = _FakeBatchEndpoint()
+    with (
+        patch("zipcode_coordinates_tz.census.curl_cffi.CurlMime", side_effect=MagicMock),
+        patch("zipcode_coordinates_tz.census.http.post_and_spool", side_effect=endpoint.post),
+    ):
+        yield endpoint
+
+
 @pytest.mark.asyncio
 class TestGetBenchmarks:
-    async def test_returns_dataframe_with_correct_columns(self) -> None:
+    async def test_returns_dataframe_with_correct_columns(self, mock_session: AsyncMock) -> None:
         payload = {
             "benchmarks": [
                 {"benchmarkName": "Public_AR_Current", "benchmarkDescription": "Current", "isDefault": True},
             ]
         }
-        mock_response = _make_json_response(payload)
-
-        with patch("zipcode_coordinates_tz.census.requests.AsyncSession") as mock_session_cls:
-            mock_session = AsyncMock()
-            mock_session.__aenter__ = AsyncMock(return_value=mock_session)
-            mock_session.__aexit__ = AsyncMock(return_value=False)
-            mock_session.get = AsyncMock(return_value=mock_response)
-            mock_session_cls.return_value = mock_session
+        mock_session.get = AsyncMock(return_value=_make_json_response(payload))
 
-            result = await census.get_benchmarks()
+        result = await census.get_benchmarks()
 
         assert list(result.columns) == ["Name", "Description", "Default"]
         assert len(result) == 1
         assert result["Name"].iloc[0] == "Public_AR_Current"
 
-    async def test_returns_empty_dataframe_when_no_benchmarks(self) -> None:
+    async def test_returns_empty_dataframe_when_no_benchmarks(self, mock_session: AsyncMock) -> None:
         payload: dict[str, Any] = {"benchmarks": []}
-        mock_response = _make_json_response(payload)
+        mock_session.get = AsyncMock(return_value=_make_json_response(payload))
 
-        with patch("zipcode_coordinates_tz.census.requests.AsyncSession") as mock_session_cls:
-            mock_session = AsyncMock()
-            mock_session.__aenter__ = AsyncMock(return_value=mock_session)
-            mock_session.__aexit__ = AsyncMock(return_value=False)
-            mock_session.get = AsyncMock(return_value=mock_response)
-            mock_session_cls.return_value = mock_session
-
-            result = await census.get_benchmarks()
+        result = await census.get_benchmarks()
 
         assert len(result) == 0
 
 
 @pytest.mark.asyncio
 class TestGetVintages:
-    async def test_returns_dataframe_with_correct_columns(self) -> None:
+    async def test_returns_dataframe_with_correct_columns(self, mock_session: AsyncMock) -> None:
         payload = {
             "vintages": [
                 {"vintageName": "Current_Current", "vintageDescription": "Current Vintage", "isDefault": True},
             ]
         }
-        mock_response = _make_json_response(payload)
-
-        with patch("zipcode_coordinates_tz.census.requests.AsyncSession") as mock_session_cls:
-            mock_session = AsyncMock()
-            mock_session.__aenter__ = AsyncMock(return_value=mock_session)
-            mock_session.__aexit__ = AsyncMock(return_value=False)
-            mock_session.get = AsyncMock(return_value=mock_response)
-            mock_session_cls.return_value = mock_session
+        mock_session.get = AsyncMock(return_value=_make_json_response(payload))
 
-            result = await census.get_vintages()
+        result = await census.get_vintages()
 
         assert list(result.columns) == ["Name", "Description", "Default"]
         assert len(result) == 1
 
-    async def test_accepts_benchmark_enum(self) -> None:
+    async def test_accepts_benchmark_enum(self, mock_session: AsyncMock) -> None:
         payload: dict[str, Any] = {"vintages": []}
-        mock_response = _make_json_response(payload)
-
-        with patch("zipcode_coordinates_tz.census.requests.AsyncSession") as mock_session_cls:
-            mock_session = AsyncMock()
-            mock_session.__aenter__ = AsyncMock(return_value=mock_session)
-            mock_session.__aexit__ = AsyncMock(return_value=False)
-            mock_session.get = AsyncMock(return_value=mock_response)
-            mock_session_cls.return_value = mock_session
+        mock_session.get = AsyncMock(return_value=_make_json_response(payload))
 
-            result = await census.get_vintages(Benchmark.Public_AR_ACS2024)
+        result = await census.get_vintages(Benchmark.Public_AR_ACS2024)
 
         assert isinstance(result, pd.DataFrame)
 
 
 @pytest.mark.asyncio
 class TestGetAddressCoordinates:
-    async def test_returns_coordinate_when_match_found(self) -> None:
+    async def test_returns_coordinate_when_match_found(self, mock_session: AsyncMock) -> None:
         payload = {
             "result": {
                 "addressMatches": [
@@ -130,37 +303,23 @@ class TestGetAddressCoordinates:
                 ]
             }
         }
-        mock_response = _make_json_response(payload)
+        mock_session.get = AsyncMock(return_value=_make_json_response(payload))
 
-        with patch("zipcode_coordinates_tz.census.requests.AsyncSession") as mock_session_cls:
-            mock_session = AsyncMock()
-            mock_session.__aenter__ = AsyncMock(return_value=mock_session)
-            mock_session.__aexit__ = AsyncMock(return_value=False)
-            mock_session.get = AsyncMock(return_value=mock_response)
-            mock_session_cls.return_value = mock_session
-
-            result = await census.get_address_coordinates("1 Main St", "New York", "NY", "10001")
+        result = await census.get_address_coordinates("1 Main St", "New York", "NY", "10001")
 
         assert isinstance(result, Coordinate)
         assert result.latitude == pytest.approx(40.7128)
         assert result.longitude == pytest.approx(-74.0060)
 
-    async def test_returns_none_when_no_match(self) -> None:
+    async def test_returns_none_when_no_match(self, mock_session: AsyncMock) -> None:
         payload: dict[str, Any] = {"result": {"addressMatches": []}}
-        mock_response = _make_json_response(payload)
-
-        with patch("zipcode_coordinates_tz.census.requests.AsyncSession") as mock_session_cls:
-            mock_session = AsyncMock()
-            mock_session.__aenter__ = AsyncMock(return_value=mock_session)
-            mock_session.__aexit__ = AsyncMock(return_value=False)
-            mock_session.get = AsyncMock(return_value=mock_response)
-            mock_session_cls.return_value = mock_session
+        mock_session.get = AsyncMock(return_value=_make_json_response(payload))
 
-            result = await census.get_address_coordinates("1 Nowhere St", "NoCity", "XX", "00000")
+        result = await census.get_address_coordinates("1 Nowhere St", "NoCity", "XX", "00000")
 
         assert result is None
 
-    async def test_returns_first_match_when_multiple(self) -> None:
+    async def test_returns_first_match_when_multiple(self, mock_session: AsyncMock) -> None:
         payload = {
             "result": {
                 "addressMatches": [
@@ -169,20 +328,88 @@ class TestGetAddressCoordinates:
                 ]
             }
         }
-        mock_response = _make_json_response(payload)
+        mock_session.get = AsyncMock(return_value=_make_json_response(payload))
 
-        with patch("zipcode_coordinates_tz.census.requests.AsyncSession") as mock_session_cls:
-            mock_session = AsyncMock()
-            mock_session.__aenter__ = AsyncMock(return_value=mock_session)
-            mock_session.__aexit__ = AsyncMock(return_value=False)
-            mock_session.get = AsyncMock(return_value=mock_response)
-            mock_session_cls.return_value = mock_session
-
-            result = await census.get_address_coordinates("1 Main St", "New York", "NY", "10001")
+        result = await census.get_address_coordinates("1 Main St", "New York", "NY", "10001")
 
         assert result is not None
         assert result.latitude == pytest.approx(40.7128)
 
+    async def test_uses_supplied_session(self, mock_session: AsyncMock) -> None:
+        payload = {"result": {"addressMatches": [{"coordinates": {"x": -74.0060, "y": 40.7128}}]}}
+        session = AsyncMock()
+        session.get = AsyncMock(return_value=_make_json_response(payload))
+
+        result = await census.get_address_coordinates("1 Main St", "New York", "NY", "10001", session=session)
+
+        mock_session.__aenter__.assert_not_awaited()
+        session.__aexit__.assert_not_called()
+        assert session.get.call_args.kwargs["params"]["street"] == "1 Main St"
+        assert result == Coordinate(40.7128, -74.0060)
+
+
+def _answer_addresses(session: AsyncMock, in_flight: list[int]) -> AsyncMock:
+    """Makes the session answer each address lookup with the house number as the latitude, slower for lower numbers."""
+
+    async def fake_get(url: str, params: dict[str, str]) -> AsyncMock:
+        number = int(params["street"].split()[0])
+        in_flight[0] += 1
+        in_flight[1] = max(in_flight[1], in_flight[0])
+        await asyncio.sleep(0.001 * (10 - number))
+        in_flight[0] -= 1
+        matches = [{"coordinates": {"x": -number, "y": number}}] if number % 2 == 0 else []
+        return _make_json_response({"result": {"addressMatches": matches}})
+
+    session.get = AsyncMock(side_effect=fake_get)
+    return session
+
+
+@pytest.mark.asyncio
+class TestGetAddressesCoordinates:
+    async def test_returns_results_in_input_order(self, mock_session: AsyncMock) -> None:
+        in_flight = [0, 0]
+        addresses = [Address(f"{i} Main St", "New York", "NY", "10001") for i in range(6)]
+        _answer_addresses(mock_session, in_flight)
+
+        result = await census.get_addresses_coordinates(addresses, max_concurrency=3)
+
+        mock_session.__aenter__.assert_awaited_once()
+        assert in_flight[1] == 3
+        assert result == [Coordinate(0.0, 0.0), None, Coordinate(2.0, -2.0), None, Coordinate(4.0, -4.0), None]
+
+    async def test_accepts_tuples_and_supplied_session(self, mock_session: AsyncMock) -> None:
+        session = _answer_addresses(_make_session(), [0, 0])
+
+        result = await census.get_addresses_coordinates(iter([("2 Main St", "New York", "NY", "10001")]), session=session)
+
+        mock_session.__aenter__.assert_not_awaited()
+        assert result == [Coordinate(2.0, -2.0)]
+
+    async def test_empty_returns_empty(self, mock_session: AsyncMock) -> None:
+        _answer_addresses(mock_session, [0, 0])
+        assert await census.get_addresses_coordinates([]) == []
+
+    async def test_failed_address_returns_none_and_keeps_the_others(self) -> None:
+        session = _answer_addresses(_make_session(), [0, 0])
+        get_address_coordinates = census.get_address_coordinates
+
+        async def fake_get_address_coordinates(street: str, *args: Any) -> Coordinate | None:
+            if street.startswith("2 "):
+                msg = "Service Unavailable"
+                raise requests.exceptions.RequestException(msg)
+            return await get_address_coordinates(street, *args)
+
+        addresses = [Address(f"{i} Main St", "New York", "NY", "10001") for i in range(6)]
+        with patch.object(census, "get_address_coordinates", side_effect=fake_get_address_coordinates):
+            result = await census.get_addresses_coordinates(addresses, max_concurrency=3, session=session)
+
+        assert result == [Coordinate(0.0, 0.0), None, None, None, Coordinate(4.0, -4.0), None]
+        assert all(task.done() for task in asyncio.all_tasks() if task is not asyncio.current_task())
+
+    async def test_invalid_max_concurrency_raises(self) -> None:
+        with pytest.raises(ValueError, match="max_concurrency"):
+            await census.get_addresses_coordinates([], max_concurrency=0)
+
 
 @pytest.mark.asyncio
 class TestGetCoordinates:
@@ -193,34 +420,284 @@ class TestGetCoordinates:
         assert constants.Columns.LONGITUDE in result.columns
         assert len(result) == 0
 
-    async def test_joins_coordinates_to_input(self) -> None:
+    async def test_joins_coordinates_to_input(self, batch_endpoint: _FakeBatchEndpoint) -> None:
         df = _make_locales_df(
             [
                 {"Street": "1 Main St", "City": "New York", "State": "NY", "ZipCode": "10001"},
             ]
         )
-
         # CSV that mimics the Census batch response format (index 0 = first row)
         csv_content = b'0,"1 Main St, New York, NY, 10001",Match,Exact,"1 MAIN ST, NEW YORK, NY, 10001","-74.006,40.7128",,,,,,\n'
+        batch_endpoint.respond = lambda upload: io.BytesIO(csv_content)
 
-        with tempfile.NamedTemporaryFile(suffix=".csv", delete=False, mode="wb") as f:
-            f.write(csv_content)
-            temp_path = Path(f.name)
+        result = await census.get_coordinates(df)
 
-        @asynccontextmanager
-        async def fake_post(*args, **kwargs):  # type: ignore[no-untyped-def]
-            yield temp_path
+        assert constants.Columns.LATITUDE in result.columns
+        assert constants.Columns.LONGITUDE in result.columns
+        assert result[constants.Columns.LATITUDE].iloc[0] == pytest.approx(40.7128)
+        assert result[constants.Columns.LONGITUDE].iloc[0] == pytest.approx(-74.006)
+        assert census.get_failures(result) == []
+        assert not df.attrs
+
+    @pytest.mark.usefixtures("batch_endpoint")
+    async def test_failures_of_an_input_result_are_not_carried_over(self) -> None:
+        df = _make_locales_df([{"Street": "1 Main St", "City": "New York", "State": "NY", "ZipCode": "10001"}])
+        df.attrs[census.FAILURES_ATTR] = [BatchFailure((0,), "Bad Request")]
+
+        results = [df_batch async for df_batch in census.iter_coordinates(df)]
+
+        assert [census.get_failures(df_batch) for df_batch in results] == [[]]
+        assert census.get_failures(df) == [BatchFailure((0,), "Bad Request")]
+
+    async def test_concurrent_batches_join_all_rows(self, batch_endpoint: _FakeBatchEndpoint) -> None:
+        rows = [{"Street": f"{i} Main St", "City": "New York", "State": "NY", "ZipCode": "10001"} for i in range(10)]
+        df = _make_locales_df(rows)
+        batch_endpoint.delay = 0.01
+
+        result = await census.get_coordinates(df, batch_size=3, max_concurrency=2)
+
+        assert batch_endpoint.max_in_flight == 2
+        assert list(result.index) == list(df.index)
+        assert result[constants.Columns.LATITUDE].tolist() == [float(i) for i in range(10)]
+        assert result[constants.Columns.LONGITUDE].tolist() == [float(-i) for i in range(10)]
+
+    async def test_invalid_max_concurrency_raises(self) -> None:
+        with pytest.raises(ValueError, match="max_concurrency"):
+            await census.get_coordinates(_make_empty_df(), max_concurrency=0)
+
+    async def test_cache_hits_are_not_sent(self, batch_endpoint: _FakeBatchEndpoint, tmp_path: Path) -> None:
+        rows = [{"Street": f"{i} Main St", "City": "New York", "State": "NY", "ZipCode": "10001"} for i in range(4)]
+        df = _make_locales_df(rows)
+
+        with SQLiteGeocodeCache(tmp_path / "geocode.sqlite3") as geocode_cache:
+            first = await census.get_coordinates(df.iloc[:2], geocode_cache=geocode_cache)
+            second = await census.get_coordinates(df, geocode_cache=geocode_cache)
+
+        assert len(batch_endpoint.uploads) == 2
+        assert batch_endpoint.uploads[1].decode().splitlines() == ["2,2 Main St,New York,NY,10001", "3,3 Main St,New York,NY,10001"]
+        assert first[constants.Columns.LATITUDE].tolist() == [0.0, 1.0]
+        assert second[constants.Columns.LATITUDE].tolist() == [0.0, 1.0, 2.0, 3.0]
+
+    async def test_duplicate_addresses_are_sent_once(self, batch_endpoint: _FakeBatchEndpoint) -> None:
+        rows: list[dict[str, str | None]] = [
+            {"Street": "1 Main St", "City": "New York", "State": "NY", "ZipCode": "10001"},
+            {"Street": "2 Main St", "City": "New York", "State": "NY", "ZipCode": "10001"},
+            {"Street": "1 Main St", "City": "New York", "State": "NY", "ZipCode": "10001"},
+            {"Street": None, "City": "New York", "State": "NY", "ZipCode": "10001"},
+            {"Street": None, "City": "New York", "State": "NY", "ZipCode": "10001"},
+        ]
+        df = _make_locales_df(rows).set_axis(["a", "b", "c", "d", "e"])
+
+        result = await census.get_coordinates(df)
 
-        with (
-            patch("zipcode_coordinates_tz.census.requests.AsyncSession") as mock_session_cls,
-            patch("zipcode_coordinates_tz.census.http.post_and_download_file", return_value=fake_post()),
-        ):
-            mock_session = AsyncMock()
-            mock_session.__aenter__ = AsyncMock(return_value=mock_session)
-            mock_session.__aexit__ = AsyncMock(return_value=False)
-            mock_session_cls.return_value = mock_session
+        assert len(batch_endpoint.uploads) == 1
+        assert len(batch_endpoint.uploads[0].decode().splitlines()) == 3
+        assert list(result.index) == ["a", "b", "c", "d", "e"]
+        assert result[constants.Columns.STREET].tolist()[:3] == ["1 Main St", "2 Main St", "1 Main St"]
+        assert result[constants.Columns.LATITUDE].tolist() == [0.0, 1.0, 0.0, 2.0, 2.0]
 
+    @pytest.mark.usefixtures("batch_endpoint")
+    async def test_repeated_index_labels_are_kept(self) -> None:
+        pull = _make_locales_df(
+            [
+                {"Street": "1 Main St", "City": "New York", "State": "NY", "ZipCode": "10001"},
+                {"Street": "2 Main St", "City": "New York", "State": "NY", "ZipCode": "10001"},
+            ]
+        )
+        df = pd.concat([pull, pull])
+
+        result = await census.get_coordinates(df)
+
+        assert list(result.index) == [0, 1, 0, 1]
+        assert result[constants.Columns.LATITUDE].tolist() == [0.0, 1.0, 0.0, 1.0]
+
+    async def test_resumes_from_checkpoint(self, batch_endpoint: _FakeBatchEndpoint, tmp_path: Path) -> None:
+        rows = [{"Street": f"{i} Main St", "City": "New York", "State": "NY", "ZipCode": "10001"} for i in range(4)]
+        df = _make_locales_df(rows)
+        # The batch with the poison address fails, so the job is left incomplete
+        batch_endpoint.fail = _fail_uploads_with(_make_http_error(HTTPStatus.BAD_REQUEST), b"2 Main St")
+
+        first = await census.get_coordinates(df, batch_size=2, checkpoint_dir=tmp_path)
+        assert len(_list_dir(tmp_path)) == 1
+
+        batch_endpoint.fail = lambda upload: None
+        batch_endpoint.uploads.clear()
+        second = await census.get_coordinates(df, batch_size=2, checkpoint_dir=tmp_path)
+
+        assert first[constants.Columns.LATITUDE].isna().tolist() == [False, False, True, False]
+        assert batch_endpoint.uploads == [b"2,2 Main St,New York,NY,10001\n"]
+        assert second[constants.Columns.LATITUDE].tolist() == [0.0, 1.0, 2.0, 3.0]
+        assert not _list_dir(tmp_path)
+
+    async def test_failed_batches_are_bisected_and_reported(self, batch_endpoint: _FakeBatchEndpoint) -> None:
+        rows = [{"Street": f"{i} Main St", "City": "New York", "State": "NY", "ZipCode": "10001"} for i in range(8)]
+        df = _make_locales_df(rows).set_axis([f"row{i}" for i in range(8)])
+        batch_endpoint.fail = _fail_uploads_with(_make_http_error(HTTPStatus.BAD_REQUEST), b"5 Main St")
+
+        result = await census.get_coordinates(df)
+
+        # 8 rows fail -> [0-3] ok, [4-7] fails -> [4-5] fails -> [4] ok, [5] fails -> [6-7] ok
+        assert [len(upload.splitlines()) for upload in batch_endpoint.uploads] == [8, 4, 4, 2, 1, 1, 2]
+        assert result[constants.Columns.LATITUDE].isna().tolist() == [False] * 5 + [True] + [False] * 2
+        assert census.get_failures(result) == [BatchFailure(("row5",), "Bad Request")]
+
+    @pytest.mark.usefixtures("batch_endpoint")
+    async def test_rows_larger_than_byte_limit_are_reported(self) -> None:
+        rows = [
+            {"Street": "1 Main St", "City": "New York", "State": "NY", "ZipCode": "10001"},
+            {"Street": "2 Main St" * 20, "City": "New York", "State": "NY", "ZipCode": "10001"},
+        ]
+        df = _make_locales_df(rows).set_axis(["a", "b"])
+
+        with patch.object(census, "MAX_BATCH_BUFFER_SIZE", 100):
             result = await census.get_coordinates(df)
 
-        assert constants.Columns.LATITUDE in result.columns
-        assert constants.Columns.LONGITUDE in result.columns
+        assert result[constants.Columns.LATITUDE].isna().tolist() == [False, True]
+        assert [failure.rows for failure in census.get_failures(result)] == [("b",)]
+
+    async def test_bisecting_stops_when_budget_is_exhausted(self, batch_endpoint: _FakeBatchEndpoint) -> None:
+        rows = [{"Street": f"{i} Main St", "City": "New York", "State": "NY", "ZipCode": "10001"} for i in range(8)]
+        df = _make_locales_df(rows)
+        batch_endpoint.fail = _fail_uploads_with(_make_http_error(HTTPStatus.BAD_REQUEST))
+
+        with patch.object(census, "BISECT_FAILURE_BUDGET", 2):
+            result = await census.get_coordinates(df)
+
+        # 8 rows fail -> [0-3] fails -> [0-1] fails (budget exhausted) -> [2-3] fails -> [4-7] fails
+        assert [len(upload.splitlines()) for upload in batch_endpoint.uploads] == [8, 4, 2, 2, 4]
+        assert result[constants.Columns.LATITUDE].isna().all()
+        assert sorted(len(failure.rows) for failure in census.get_failures(result)) == [2, 2, 4]
+
+    @pytest.mark.parametrize(
+        "error",
+        [
+            _make_http_error(HTTPStatus.SERVICE_UNAVAILABLE),
+            requests.exceptions.Timeout("Operation timed out"),
+        ],
+    )
+    async def test_transport_failures_are_reported_without_bisecting(self, batch_endpoint: _FakeBatchEndpoint, error: Exception) -> None:
+        rows = [{"Street": f"{i} Main St", "City": "New York", "State": "NY", "ZipCode": "10001"} for i in range(8)]
+        df = _make_locales_df(rows)
+        batch_endpoint.fail = _fail_uploads_with(error)
+
+        result = await census.get_coordinates(df)
+
+        # Splitting the batch would only send the same failing requests again
+        assert len(batch_endpoint.uploads) == 1
+        assert result[constants.Columns.LATITUDE].isna().all()
+        assert census.get_failures(result) == [BatchFailure(tuple(range(8)), str(error))]
+
+    async def test_unparsable_responses_are_bisected(self, batch_endpoint: _FakeBatchEndpoint) -> None:
+        rows = [{"Street": f"{i} Main St", "City": "New York", "State": "NY", "ZipCode": "10001"} for i in range(2)]
+        df = _make_locales_df(rows)
+        batch_endpoint.respond = lambda upload: io.BytesIO(b'"unterminated\n') if b"1 Main St" in upload else _make_batch_response(upload)
+
+        result = await census.get_coordinates(df)
+
+        assert result[constants.Columns.LATITUDE].isna().tolist() == [False, True]
+        assert [failure.rows for failure in census.get_failures(result)] == [(1,)]
+
+
+@pytest.mark.asyncio
+class TestIterCoordinates:
+    @pytest.mark.usefixtures("batch_endpoint")
+    async def test_streams_every_row_of_every_frame(self) -> None:
+        rows = [{"Street": f"{i} Main St", "City": "New York", "State": "NY", "ZipCode": "10001"} for i in range(6)]
+        df = _make_locales_df(rows)
+        consumed: list[int] = []
+
+        async def frames() -> AsyncIterator[pd.DataFrame]:
+            for start in (0, 3):
+                consumed.append(start)
+                yield df.iloc[start : start + 3]
+
+        results: list[pd.DataFrame] = []
+        async for df_batch in census.iter_coordinates(frames(), batch_size=2):
+            if not results:
+                # The first batch is handed over before the rest of the input is read
+                assert consumed == [0]
+            results.append(df_batch)
+
+        result = pd.concat(results).sort_index()
+        assert [len(df_batch) for df_batch in results] == [2, 1, 2, 1]
+        assert list(result.index) == list(df.index)
+        # The addresses are numbered within each frame
+        assert result[constants.Columns.LATITUDE].tolist() == [0.0, 1.0, 2.0, 0.0, 1.0, 2.0]
+
+    async def test_accepts_a_dataframe(self, batch_endpoint: _FakeBatchEndpoint) -> None:
+        df = _make_locales_df([{"Street": "1 Main St", "City": "New York", "State": "NY", "ZipCode": "10001"}] * 3).set_axis(["a", "b", "c"])
+
+        results = [df_batch async for df_batch in census.iter_coordinates(df)]
+
+        assert len(batch_endpoint.uploads) == 1
+        assert len(results) == 1
+        assert list(results[0].index) == ["a", "b", "c"]
+        assert results[0][constants.Columns.LATITUDE].tolist() == [0.0, 0.0, 0.0]
+
+    @pytest.mark.usefixtures("batch_endpoint")
+    async def test_repeated_index_labels_are_kept(self) -> None:
+        pull = _make_locales_df(
+            [
+                {"Street": "1 Main St", "City": "New York", "State": "NY", "ZipCode": "10001"},
+                {"Street": "2 Main St", "City": "New York", "State": "NY", "ZipCode": "10001"},
+            ]
+        )
+        df = pd.concat([pull, pull])
+
+        result = pd.concat([df_batch async for df_batch in census.iter_coordinates(df)])
+
+        assert list(result.index) == [0, 1, 0, 1]
+        assert result[constants.Columns.STREET].tolist() == ["1 Main St", "2 Main St", "1 Main St", "2 Main St"]
+        assert result[constants.Columns.LATITUDE].tolist() == [0.0, 1.0, 0.0, 1.0]
+
+    async def test_bounds_batches_in_flight(self, batch_endpoint: _FakeBatchEndpoint) -> None:
+        rows = [{"Street": f"{i} Main St", "City": "New York", "State": "NY", "ZipCode": "10001"} for i in range(10)]
+        df = _make_locales_df(rows)
+        batch_endpoint.delay = 0.01
+
+        results = [df_batch async for df_batch in census.iter_coordinates(df, batch_size=3, max_concurrency=2)]
+
+        assert batch_endpoint.max_in_flight == 2
+        assert pd.concat(results).sort_index()[constants.Columns.LATITUDE].tolist() == [float(i) for i in range(10)]
+
+    async def test_cache_hits_are_yielded_first(self, batch_endpoint: _FakeBatchEndpoint, tmp_path: Path) -> None:
+        rows = [{"Street": f"{i} Main St", "City": "New York", "State": "NY", "ZipCode": "10001"} for i in range(4)]
+        df = _make_locales_df(rows)
+
+        with SQLiteGeocodeCache(tmp_path / "geocode.sqlite3") as geocode_cache:
+            [_ async for _ in census.iter_coordinates(df.iloc[:2], geocode_cache=geocode_cache)]
+            results = [df_batch async for df_batch in census.iter_coordinates(df, geocode_cache=geocode_cache)]
+
+        assert len(batch_endpoint.uploads) == 2
+        assert [list(df_batch.index) for df_batch in results] == [[0, 1], [2, 3]]
+
+    async def test_failed_batches_are_yielded_without_coordinates(self, batch_endpoint: _FakeBatchEndpoint) -> None:
+        rows = [{"Street": f"{i} Main St", "City": "New York", "State": "NY", "ZipCode": "10001"} for i in range(2)]
+        df = _make_locales_df(rows)
+        batch_endpoint.fail = _fail_uploads_with(_make_http_error(HTTPStatus.BAD_REQUEST), b"1 Main St")
+
+        results = [df_batch async for df_batch in census.iter_coordinates(df)]
+
+        result = pd.concat(results).sort_index()
+        assert result[constants.Columns.LATITUDE].isna().tolist() == [False, True]
+        # Only the DataFrame of the failed batch lists a failure
+        assert [census.get_failures(df_batch) for df_batch in results] == [[], [BatchFailure((1,), "Bad Request")]]
+
+    @pytest.mark.usefixtures("batch_endpoint")
+    async def test_rows_larger_than_byte_limit_are_reported(self) -> None:
+        rows = [
+            {"Street": "1 Main St", "City": "New York", "State": "NY", "ZipCode": "10001"},
+            {"Street": "2 Main St" * 20, "City": "New York", "State": "NY", "ZipCode": "10001"},
+        ]
+        df = _make_locales_df(rows).set_axis(["a", "b"])
+
+        with patch.object(census, "MAX_BATCH_BUFFER_SIZE", 100):
+            results = [df_batch async for df_batch in census.iter_coordinates(df)]
+
+        result = pd.concat(results).sort_index()
+        assert result[constants.Columns.LATITUDE].isna().tolist() == [False, True]
+        assert [failure.rows for df_batch in results for failure in census.get_failures(df_batch)] == [("b",)]
+
+    async def test_invalid_max_concurrency_raises(self) -> None:
+        with pytest.raises(ValueError, match="max_concurrency"):
+            [_ async for _ in census.iter_coordinates(_make_empty_df(), max_concurrency=0)]
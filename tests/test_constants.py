@@ -27,6 +27,9 @@ class TestColumns:
     def test_timezone(self) -> None:
         assert constants.Columns.TIMEZONE == "TZ"
 
+    def test_match(self) -> None:
+        assert constants.Columns.MATCH == "Match"
+
     def test_all_are_strings(self) -> None:
         cols = [
             constants.Columns.STREET,
@@ -36,6 +39,7 @@ class TestColumns:
             constants.Columns.LATITUDE,
             constants.Columns.LONGITUDE,
             constants.Columns.TIMEZONE,
+            constants.Columns.MATCH,
         ]
         assert all(isinstance(c, str) for c in cols)
 
@@ -48,6 +52,7 @@ class TestColumns:
             constants.Columns.LATITUDE,
             constants.Columns.LONGITUDE,
             constants.Columns.TIMEZONE,
+            constants.Columns.MATCH,
         ]
         assert len(cols) == len(set(cols))
 
@@ -67,3 +72,9 @@ class TestGetDateInNY:
         delta = abs((result - today_utc).days)
         # Should be within 1 day of UTC (accounting for timezone offset)
         assert delta <= 1
+
+
+class TestEndpointUrls:
+    def test_have_no_trailing_slash(self) -> None:
+        assert not constants.CENSUS_GEOCODER_URL.endswith("/")
+        assert not constants.USPS_URL.endswith("/")
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pytest
+from timezonefinder import TimezoneFinder
+
+from zipcode_coordinates_tz import grid
+from zipcode_coordinates_tz.grid import BOUNDARY, Bounds, TimezoneGrid
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+# Straddles the Eastern and Central timezones across Indiana and Illinois
+_BOUNDS = Bounds(39.0, -89.0, 41.0, -85.0)
+
+
+@pytest.fixture(scope="module")
+def timezone_finder() -> TimezoneFinder:
+    return TimezoneFinder()
+
+
+@pytest.fixture(scope="module")
+def timezone_grid(timezone_finder: TimezoneFinder) -> TimezoneGrid:
+    return TimezoneGrid.build(timezone_finder, _BOUNDS, resolution=0.1)
+
+
+class TestTimezoneGrid:
+    def test_shape(self, timezone_grid: TimezoneGrid) -> None:
+        assert timezone_grid.codes.shape == (20, 40)
+        assert timezone_grid.codes.dtype == np.int16
+
+    def test_has_uniform_and_boundary_cells(self, timezone_grid: TimezoneGrid) -> None:
+        assert (timezone_grid.codes == BOUNDARY).any()
+        assert (timezone_grid.codes != BOUNDARY).any()
+        assert {"America/Chicago", "America/Indiana/Indianapolis"} <= set(timezone_grid.names)
+
+    def test_edge_cells_are_boundary(self, timezone_grid: TimezoneGrid) -> None:
+        assert (timezone_grid.codes[[0, -1], :] == BOUNDARY).all()
+        assert (timezone_grid.codes[:, [0, -1]] == BOUNDARY).all()
+
+    def test_lookup_agrees_with_exact(self, timezone_grid: TimezoneGrid, timezone_finder: TimezoneFinder) -> None:
+        rng = np.random.default_rng(0)
+        latitudes = rng.uniform(_BOUNDS.south, _BOUNDS.north, 2000)
+        longitudes = rng.uniform(_BOUNDS.west, _BOUNDS.east, 2000)
+        codes = timezone_grid.lookup(latitudes, longitudes)
+        gridded = codes != BOUNDARY
+
+        assert gridded.mean() > 0.5
+        exact = [timezone_finder.timezone_at(lat=lat, lng=lng) for lat, lng in zip(latitudes[gridded], longitudes[gridded])]
+        assert [timezone_grid.names[code] for code in codes[gridded]] == exact
+
+    def test_lookup_outside_and_unknown(self, timezone_grid: TimezoneGrid) -> None:
+        codes = timezone_grid.lookup(np.array([np.nan, 45.0, 40.0, 40.0]), np.array([-87.0, -87.0, np.nan, -100.0]))
+        assert codes.tolist() == [BOUNDARY] * 4
+
+    def test_invalid_samples_raises(self, timezone_finder: TimezoneFinder) -> None:
+        with pytest.raises(ValueError, match="samples"):
+            TimezoneGrid.build(timezone_finder, _BOUNDS, samples=1)
+
+    def test_save_and_load_memory_maps(self, timezone_grid: TimezoneGrid, tmp_path: Path) -> None:
+        timezone_grid.save(tmp_path)
+        loaded = TimezoneGrid.load(tmp_path)
+
+        assert isinstance(loaded.codes, np.memmap)
+        np.testing.assert_array_equal(loaded.codes, timezone_grid.codes)
+        assert loaded.names == timezone_grid.names
+        assert loaded.bounds == timezone_grid.bounds
+        assert loaded.resolution == timezone_grid.resolution
+
+    def test_load_or_build_builds_once(self, timezone_finder: TimezoneFinder, tmp_path: Path) -> None:
+        first = TimezoneGrid.load_or_build(timezone_finder, tmp_path, _BOUNDS, resolution=0.5)
+        second = TimezoneGrid.load_or_build(timezone_finder, tmp_path, _BOUNDS, resolution=0.5)
+
+        assert len(list(tmp_path.iterdir())) == 1
+        assert isinstance(second.codes, np.memmap)
+        np.testing.assert_array_equal(first.codes, second.codes)
+
+    def test_load_or_build_is_keyed_by_parameters(self, timezone_finder: TimezoneFinder, tmp_path: Path) -> None:
+        TimezoneGrid.load_or_build(timezone_finder, tmp_path, _BOUNDS, resolution=0.5)
+        TimezoneGrid.load_or_build(timezone_finder, tmp_path, _BOUNDS, resolution=1.0)
+        assert len(list(tmp_path.iterdir())) == 2
+
+    def test_default_bounds_cover_contiguous_us(self) -> None:
+        assert grid.DEFAULT_BOUNDS.south < 25.0
+        assert grid.DEFAULT_BOUNDS.north > 49.0
@@ -1,12 +1,14 @@
 from __future__ import annotations
 
+from http import HTTPStatus
 from pathlib import Path
 from typing import Any
-from unittest.mock import AsyncMock, MagicMock
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+from curl_cffi import requests
 
-from zipcode_coordinates_tz import http
+from zipcode_coordinates_tz import cache, http
 
 
 def _make_streaming_response(content: bytes) -> MagicMock:
@@ -27,7 +29,7 @@ class TestGetJson:
         payload: dict[str, Any] = {"key": "value"}
         mock_response = AsyncMock()
         mock_response.raise_for_status = MagicMock()
-        mock_response.json = AsyncMock(return_value=payload)
+        mock_response.json = MagicMock(return_value=payload)
 
         mock_session = AsyncMock()
         mock_session.get = AsyncMock(return_value=mock_response)
@@ -39,20 +41,20 @@ class TestGetJson:
         payload: dict[str, Any] = {}
         mock_response = AsyncMock()
         mock_response.raise_for_status = MagicMock()
-        mock_response.json = AsyncMock(return_value=payload)
+        mock_response.json = MagicMock(return_value=payload)
 
         mock_session = AsyncMock()
         mock_session.get = AsyncMock(return_value=mock_response)
 
         params = {"format": "json"}
         async with http.get_json(mock_session, "https://example.com", params):
-            mock_session.get.assert_called_once_with("https://example.com")
+            mock_session.get.assert_called_once_with("https://example.com", params=params)
 
     async def test_no_params_by_default(self) -> None:
         payload: dict[str, Any] = {}
         mock_response = AsyncMock()
         mock_response.raise_for_status = MagicMock()
-        mock_response.json = AsyncMock(return_value=payload)
+        mock_response.json = MagicMock(return_value=payload)
 
         mock_session = AsyncMock()
         mock_session.get = AsyncMock(return_value=mock_response)
@@ -91,6 +93,44 @@ class TestGetAndDownloadFile:
         assert not saved_path.exists()
 
 
+def _make_not_modified_response() -> MagicMock:
+    """Build a mock 304 Not Modified response."""
+    response = MagicMock()
+    response.status_code = HTTPStatus.NOT_MODIFIED
+    response.aclose = AsyncMock()
+    return response
+
+
+@pytest.mark.asyncio
+class TestGetCachedFile:
+    async def test_not_modified_without_entry_downloads_again(self, tmp_path: Path) -> None:
+        mock_response = _make_streaming_response(b"file content here")
+        mock_response.status_code = HTTPStatus.OK
+        mock_response.headers = {"ETag": '"v1"'}
+        mock_session = AsyncMock()
+        mock_session.get = AsyncMock(side_effect=[_make_not_modified_response(), mock_response])
+        download_cache = cache.DownloadCache(tmp_path)
+
+        async with http.get_cached_file(mock_session, "https://example.com/file.csv", download_cache) as path:
+            assert path.read_bytes() == b"file content here"
+
+        assert mock_session.get.call_args.kwargs["headers"] == {"Cache-Control": "no-cache"}
+        entry = download_cache.get("https://example.com/file.csv")
+        assert entry is not None
+        assert entry.etag == '"v1"'
+
+    async def test_not_modified_twice_without_entry_raises(self, tmp_path: Path) -> None:
+        mock_session = AsyncMock()
+        mock_session.get = AsyncMock(side_effect=[_make_not_modified_response(), _make_not_modified_response()])
+        download_cache = cache.DownloadCache(tmp_path)
+
+        with pytest.raises(requests.exceptions.HTTPError, match="304 Not Modified"):
+            async with http.get_cached_file(mock_session, "https://example.com/file.csv", download_cache):
+                pass
+
+        assert download_cache.get("https://example.com/file.csv") is None
+
+
 @pytest.mark.asyncio
 class TestPostAndDownloadFile:
     async def test_downloads_response_content(self) -> None:
@@ -142,3 +182,62 @@ class TestPostAndDownloadFile:
             params=params,
             stream=True,
         )
+
+
+@pytest.mark.asyncio
+class TestPostAndSpool:
+    async def test_reads_response_content(self) -> None:
+        mock_response = _make_streaming_response(b"response data")
+        mock_session = AsyncMock()
+        mock_session.post = AsyncMock(return_value=mock_response)
+
+        async with http.post_and_spool(mock_session, "https://example.com/upload", {}, MagicMock()) as f:
+            assert f.read() == b"response data"
+
+    async def test_spills_to_disk_above_max_size(self) -> None:
+        mock_response = _make_streaming_response(b"x" * 16)
+        mock_session = AsyncMock()
+        mock_session.post = AsyncMock(return_value=mock_response)
+
+        async with http.post_and_spool(mock_session, "https://example.com/upload", {}, MagicMock(), max_size=8) as f:
+            assert f._rolled  # type: ignore[attr-defined]
+            assert f.read() == b"x" * 16
+
+    async def test_stays_in_memory_below_max_size(self) -> None:
+        mock_response = _make_streaming_response(b"x" * 4)
+        mock_session = AsyncMock()
+        mock_session.post = AsyncMock(return_value=mock_response)
+
+        async with http.post_and_spool(mock_session, "https://example.com/upload", {}, MagicMock(), max_size=8) as f:
+            assert not f._rolled  # type: ignore[attr-defined]
+
+
+@pytest.mark.asyncio
+class TestSessionScope:
+    async def test_yields_the_given_session(self) -> None:
+        mock_session = AsyncMock()
+        async with http.session_scope(mock_session) as session:
+            assert session is mock_session
+
+    async def test_opens_and_closes_a_new_session(self) -> None:
+        with patch("zipcode_coordinates_tz.http.requests.AsyncSession") as mock_session_cls:
+            mock_session = AsyncMock()
+            mock_session.__aenter__ = AsyncMock(return_value=mock_session)
+            mock_session.__aexit__ = AsyncMock(return_value=False)
+            mock_session_cls.return_value = mock_session
+            async with http.session_scope() as session:
+                assert session is mock_session
+            mock_session.__aexit__.assert_awaited_once()
+
+    async def test_yields_the_session_of_the_entered_pool(self) -> None:
+        async with http.SessionPool() as pool:
+            assert http.get_session_pool() is pool
+            async with http.session_scope() as first, http.session_scope(pool) as second:
+                assert first is second is pool.session
+        assert http.get_session_pool() is None
+
+
+class TestSessionPool:
+    def test_max_clients_must_be_positive(self) -> None:
+        with pytest.raises(ValueError, match="max_clients"):
+            http.SessionPool(max_clients=0)
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import pandas as pd
+import pytest
+
+from zipcode_coordinates_tz import constants
+from zipcode_coordinates_tz.journal import Journal, job_id
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+def _make_addresses_df(streets: list[str]) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            constants.Columns.STREET: streets,
+            constants.Columns.CITY: "New York",
+            constants.Columns.STATE: "NY",
+            constants.Columns.ZIPCODE: "10001",
+        }
+    )
+
+
+def _make_results_df(ids: list[int]) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            constants.Columns.MATCH: "Match",
+            constants.Columns.LATITUDE: [float(i) for i in ids],
+            constants.Columns.LONGITUDE: [float(-i) for i in ids],
+        },
+        index=ids,
+    )
+
+
+class TestJobId:
+    def test_is_stable(self) -> None:
+        df = _make_addresses_df(["1 Main St", "2 Main St"])
+        assert job_id(df, "4", "Current_Current") == job_id(df.copy(), "4", "Current_Current")
+
+    @pytest.mark.parametrize(
+        ("streets", "benchmark", "vintage"),
+        [
+            (["1 Main St", "3 Main St"], "4", "Current_Current"),
+            (["2 Main St", "1 Main St"], "4", "Current_Current"),
+            (["1 Main St", "2 Main St"], "8", "Current_Current"),
+            (["1 Main St", "2 Main St"], "4", "Census2020_Current"),
+        ],
+    )
+    def test_changes_with_inputs(self, streets: list[str], benchmark: str, vintage: str) -> None:
+        df = _make_addresses_df(["1 Main St", "2 Main St"])
+        assert job_id(df, "4", "Current_Current") != job_id(_make_addresses_df(streets), benchmark, vintage)
+
+
+class TestJournal:
+    def test_empty_journal_loads_empty_frame(self, tmp_path: Path) -> None:
+        result = Journal(tmp_path / "job").load()
+        assert result.empty
+        assert list(result.columns) == [constants.Columns.MATCH, constants.Columns.LATITUDE, constants.Columns.LONGITUDE]
+
+    def test_write_then_load(self, tmp_path: Path) -> None:
+        journal = Journal(tmp_path / "job")
+        journal.write(0, _make_results_df([0, 1]))
+        journal.write(2, _make_results_df([2]))
+
+        result = Journal(tmp_path / "job").load()
+
+        assert sorted(result.index) == [0, 1, 2]
+        assert result.loc[2, constants.Columns.LATITUDE] == pytest.approx(2.0)
+        assert not list((tmp_path / "job").glob("*.tmp"))
+
+    def test_ignores_partial_writes(self, tmp_path: Path) -> None:
+        journal = Journal(tmp_path / "job")
+        journal.write(0, _make_results_df([0]))
+        (tmp_path / "job" / "batch-0000000001.tmp").write_text("ID,Match\n1,Ma")
+
+        assert list(journal.load().index) == [0]
+
+    def test_for_job_uses_job_id(self, tmp_path: Path) -> None:
+        df = _make_addresses_df(["1 Main St"])
+        journal = Journal.for_job(tmp_path, df, "4", "Current_Current")
+        assert journal.directory == tmp_path / job_id(df, "4", "Current_Current")
+
+    def test_complete_removes_directory(self, tmp_path: Path) -> None:
+        journal = Journal(tmp_path / "job")
+        journal.write(0, _make_results_df([0]))
+        journal.complete()
+        assert not (tmp_path / "job").exists()
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import pytest
 
-from zipcode_coordinates_tz.models import Benchmark, Coordinate, FillMissing
+from zipcode_coordinates_tz.models import Address, BatchFailure, BatchSizing, Benchmark, Coordinate, FillMissing, MatchStatus
 
 
 class TestCoordinate:
@@ -31,6 +31,29 @@ class TestCoordinate:
         assert Coordinate(1.0, 2.0) != Coordinate(1.0, 3.0)
 
 
+class TestAddress:
+    def test_construction(self) -> None:
+        address = Address(street="1 Main St", city="New York", state="NY", zip_code="10001")
+        assert address.street == "1 Main St"
+        assert address.zip_code == "10001"
+
+    def test_unpacking(self) -> None:
+        street, city, state, zip_code = Address("1 Main St", "New York", "NY", "10001")
+        assert (street, city, state, zip_code) == ("1 Main St", "New York", "NY", "10001")
+
+
+class TestBatchFailure:
+    def test_construction(self) -> None:
+        failure = BatchFailure(rows=("a", "b"), error="Service Unavailable")
+        assert failure.rows == ("a", "b")
+        assert failure.error == "Service Unavailable"
+
+    def test_unpacking(self) -> None:
+        rows, error = BatchFailure((1,), "Bad Request")
+        assert rows == (1,)
+        assert error == "Bad Request"
+
+
 class TestBenchmark:
     def test_values(self) -> None:
         assert Benchmark.Public_AR_CURRENT.value == "4"
@@ -50,10 +73,21 @@ class TestBenchmark:
         assert names == {"Public_AR_CURRENT", "Public_AR_ACS2024", "Public_AR_Census2020"}
 
 
+class TestMatchStatus:
+    def test_values(self) -> None:
+        assert MatchStatus.MATCH.value == "Match"
+        assert MatchStatus.NO_MATCH.value == "No_Match"
+        assert MatchStatus.TIE.value == "Tie"
+
+    def test_str_returns_value(self) -> None:
+        assert str(MatchStatus.NO_MATCH) == "No_Match"
+
+
 class TestFillMissing:
     def test_values(self) -> None:
         assert FillMissing.DISABLED == 0
         assert FillMissing.ENABLED == 1
+        assert FillMissing.NEAREST == 2
 
     def test_str_returns_name(self) -> None:
         assert str(FillMissing.DISABLED) == "DISABLED"
@@ -71,3 +105,12 @@ class TestFillMissing:
     @pytest.mark.parametrize("value", list(FillMissing))
     def test_roundtrip(self, value: FillMissing) -> None:
         assert FillMissing(int(value)) == value
+
+
+class TestBatchSizing:
+    def test_values(self) -> None:
+        assert BatchSizing.FIXED == 0
+        assert BatchSizing.ADAPTIVE == 1
+
+    def test_str_returns_name(self) -> None:
+        assert str(BatchSizing.ADAPTIVE) == "ADAPTIVE"
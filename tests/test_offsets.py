@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+import pytz
+
+from zipcode_coordinates_tz import constants
+from zipcode_coordinates_tz.offsets import fill_utc_offsets, get_utc_offsets
+
+_SUMMER = datetime.datetime(2024, 7, 1, 12, tzinfo=datetime.timezone.utc)
+_WINTER = datetime.datetime(2024, 1, 1, 12, tzinfo=datetime.timezone.utc)
+
+
+class TestGetUtcOffsets:
+    def test_single_instant(self) -> None:
+        timezones = pd.Series([pytz.timezone("America/New_York"), pytz.timezone("America/Phoenix"), pytz.utc, pytz.timezone("Etc/GMT+5")])
+        result = get_utc_offsets(timezones, _SUMMER)
+
+        assert result[constants.Columns.UTC_OFFSET].dtype == np.int32
+        assert result[constants.Columns.UTC_OFFSET].tolist() == [-4 * 3600, -7 * 3600, 0, -5 * 3600]
+        assert result[constants.Columns.DST].tolist() == [True, False, False, False]
+        assert result[constants.Columns.LOCAL_TIME].tolist() == [
+            pd.Timestamp("2024-07-01 08:00"),
+            pd.Timestamp("2024-07-01 05:00"),
+            pd.Timestamp("2024-07-01 12:00"),
+            pd.Timestamp("2024-07-01 07:00"),
+        ]
+
+    def test_instant_per_row(self) -> None:
+        timezones = pd.Series(["America/New_York", "America/New_York", "America/Chicago"], dtype="category")
+        result = get_utc_offsets(timezones, [_WINTER, _SUMMER, _SUMMER])
+
+        assert result[constants.Columns.UTC_OFFSET].tolist() == [-5 * 3600, -4 * 3600, -5 * 3600]
+        assert result[constants.Columns.DST].tolist() == [False, True, True]
+
+    def test_matches_pytz_across_a_transition(self) -> None:
+        tz = pytz.timezone("America/Los_Angeles")
+        instants = pd.date_range("2024-03-10 09:00", "2024-03-10 11:00", freq="15min", tz="UTC")
+        result = get_utc_offsets(pd.Series([tz] * len(instants)), instants)
+
+        expected = [instant.astimezone(tz).utcoffset().total_seconds() for instant in instants.to_pydatetime()]
+        assert result[constants.Columns.UTC_OFFSET].tolist() == expected
+
+    def test_missing_timezones_and_instants(self) -> None:
+        timezones = pd.Series([None, "America/New_York", "America/New_York"], index=[5, 6, 7], dtype=object)
+        result = get_utc_offsets(timezones, [_SUMMER, None, _SUMMER])
+
+        assert result.index.tolist() == [5, 6, 7]
+        assert result[constants.Columns.UTC_OFFSET].tolist() == [0, 0, -4 * 3600]
+        assert result[constants.Columns.DST].tolist() == [False, False, True]
+        assert result[constants.Columns.LOCAL_TIME].isna().tolist() == [True, True, False]
+
+    def test_naive_instants_are_utc(self) -> None:
+        result = get_utc_offsets(pd.Series(["America/New_York"]), datetime.datetime(2024, 7, 1, 12))  # noqa: DTZ001
+        assert result[constants.Columns.LOCAL_TIME].tolist() == [pd.Timestamp("2024-07-01 08:00")]
+
+    def test_instants_must_match_the_rows(self) -> None:
+        with pytest.raises(ValueError, match="one instant per row"):
+            get_utc_offsets(pd.Series(["America/New_York"] * 3), [_SUMMER, _WINTER])
+
+
+class TestFillUtcOffsets:
+    def test_adds_the_columns(self) -> None:
+        df = pd.DataFrame({constants.Columns.TIMEZONE: [pytz.timezone("America/Denver"), None]})
+        result = fill_utc_offsets(df, _WINTER)
+
+        assert result is df
+        assert result[constants.Columns.UTC_OFFSET].tolist() == [-7 * 3600, 0]
+        assert result[constants.Columns.DST].tolist() == [False, False]
+
+    def test_defaults_to_now(self) -> None:
+        df = fill_utc_offsets(pd.DataFrame({constants.Columns.TIMEZONE: ["UTC"]}))
+        assert abs(df[constants.Columns.LOCAL_TIME].iloc[0] - pd.Timestamp.now(tz="UTC").tz_localize(None)) < pd.Timedelta(minutes=1)
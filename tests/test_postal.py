@@ -5,12 +5,14 @@ import io
 import tempfile
 from contextlib import asynccontextmanager
 from pathlib import Path
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pandas as pd
 import pytest
 
 from zipcode_coordinates_tz import constants, postal
+from zipcode_coordinates_tz.cache import LocalesCache
+from zipcode_coordinates_tz.models import ExcelEngine
 
 
 def _make_excel_bytes() -> bytes:
@@ -44,7 +46,7 @@ class TestGetLocales:
 
         with (
             patch("zipcode_coordinates_tz.postal.http.get_and_download_file", side_effect=fake_download),
-            patch("zipcode_coordinates_tz.postal.requests.AsyncSession") as mock_session_cls,
+            patch("zipcode_coordinates_tz.http.requests.AsyncSession") as mock_session_cls,
         ):
             mock_session = AsyncMock()
             mock_session.__aenter__ = AsyncMock(return_value=mock_session)
@@ -74,7 +76,7 @@ class TestGetLocales:
 
         with (
             patch("zipcode_coordinates_tz.postal.http.get_and_download_file", side_effect=fake_download),
-            patch("zipcode_coordinates_tz.postal.requests.AsyncSession") as mock_session_cls,
+            patch("zipcode_coordinates_tz.http.requests.AsyncSession") as mock_session_cls,
         ):
             mock_session = AsyncMock()
             mock_session.__aenter__ = AsyncMock(return_value=mock_session)
@@ -106,7 +108,7 @@ class TestGetLocales:
 
         with (
             patch("zipcode_coordinates_tz.postal.http.get_and_download_file", side_effect=fake_download),
-            patch("zipcode_coordinates_tz.postal.requests.AsyncSession") as mock_session_cls,
+            patch("zipcode_coordinates_tz.http.requests.AsyncSession") as mock_session_cls,
         ):
             mock_session = AsyncMock()
             mock_session.__aenter__ = AsyncMock(return_value=mock_session)
@@ -119,3 +121,102 @@ class TestGetLocales:
         ny_date = constants.get_date_in_ny()
         expected_fragment = f"{ny_date.year:04}-{ny_date.month:02}"
         assert expected_fragment in captured_url[0]
+
+
+class TestReadLocales:
+    def test_only_reads_the_kept_columns(self, tmp_path: Path) -> None:
+        df = pd.DataFrame(
+            {
+                "AREA NAME": ["FAKE"],
+                "DELIVERY ZIPCODE": ["07001"],
+                "PHYSICAL DELV ADDR": ["1 MAIN ST"],
+                "PHYSICAL CITY": ["AVENEL"],
+                "PHYSICAL STATE": ["NJ"],
+                "PHYSICAL ZIP 4": ["0001"],
+            }
+        )
+        file = tmp_path / "ZIP_Locale_Detail.xlsx"
+        df.to_excel(file, sheet_name="ZIP_DETAIL", index=False)
+
+        result = postal.read_locales(file, ExcelEngine.PANDAS)
+
+        assert list(result.columns) == [constants.Columns.STREET, constants.Columns.CITY, constants.Columns.STATE, constants.Columns.ZIPCODE]
+        assert result.iloc[0].tolist() == ["1 MAIN ST", "AVENEL", "NJ", "07001"]
+
+    @pytest.mark.parametrize(
+        ("engine", "installed", "expected"),
+        [
+            (ExcelEngine.AUTO, True, "calamine"),
+            (ExcelEngine.AUTO, False, None),
+            (ExcelEngine.CALAMINE, False, "calamine"),
+            (ExcelEngine.PANDAS, True, None),
+        ],
+    )
+    def test_engine(self, engine: ExcelEngine, installed: bool, expected: str | None) -> None:
+        with (
+            patch("zipcode_coordinates_tz.postal._has_calamine", return_value=installed),
+            patch("zipcode_coordinates_tz.postal.pd.read_excel", return_value=pd.DataFrame(columns=list(postal._RENAME_COLUMNS))) as mock_read_excel,
+        ):
+            postal.read_locales("ZIP_Locale_Detail.xls", engine)
+
+        assert mock_read_excel.call_args.kwargs["engine"] == expected
+        assert mock_read_excel.call_args.kwargs["usecols"] == list(postal._RENAME_COLUMNS)
+
+
+class TestFilterLocales:
+    _DF = pd.DataFrame(
+        {
+            "Street": ["1 MAIN ST", "2 MAIN ST", "3 MAIN ST", "4 MAIN ST", "5 MAIN ST"],
+            "City": ["Avenel", "NEWARK", None, "NEW YORK", "AVENEL"],
+            "State": ["NJ", "NJ", "NJ", "NY", "NJ"],
+            "ZipCode": ["07001", "07101", "08001", "10001", None],
+        },
+        index=[10, 11, 12, 13, 14],
+    )
+
+    def test_without_filters_returns_the_frame(self) -> None:
+        assert postal.filter_locales(self._DF) is self._DF
+
+    def test_states_and_cities_ignore_case(self) -> None:
+        result = postal.filter_locales(self._DF, states=["nj"], cities=["avenel"])
+        assert result.index.tolist() == [10, 14]
+
+    @pytest.mark.parametrize(
+        ("zipcodes", "expected"),
+        [
+            (["07001"], [10]),
+            (["07001", "10001"], [10, 13]),
+            (["07"], [10, 11]),
+            (["070-080"], [10, 11, 12]),
+            (["071-099", "07001"], [10, 11, 12]),
+        ],
+    )
+    def test_zipcodes(self, zipcodes: list[str], expected: list[int]) -> None:
+        assert postal.filter_locales(self._DF, zipcodes=zipcodes).index.tolist() == expected
+
+    @pytest.mark.parametrize("zipcode", ["", "07a", "070-08", "089-070", "123456"])
+    def test_invalid_zipcode_raises(self, zipcode: str) -> None:
+        with pytest.raises(ValueError, match="zipcode must be"):
+            postal.filter_locales(self._DF, zipcodes=[zipcode])
+
+    @pytest.mark.asyncio
+    async def test_get_locales_filters_the_cached_frame(self) -> None:
+        locales_cache = MagicMock()
+        locales_cache.get.return_value = self._DF
+
+        result = await postal.get_locales(datetime.date(2025, 1, 1), locales_cache=locales_cache, states=["NY"])
+
+        assert locales_cache.get.call_args.args[1] == ["NY"]
+        assert result.index.tolist() == [13]
+
+    @pytest.mark.asyncio
+    async def test_get_locales_matches_with_and_without_a_parquet_cache(self, tmp_path: Path) -> None:
+        pytest.importorskip("pyarrow")
+        locales_cache = LocalesCache(tmp_path)
+        with patch("zipcode_coordinates_tz.cache.constants.get_date_in_ny", return_value=datetime.date(2025, 1, 1)):
+            locales_cache.put(postal._URL_FMT.format(YEAR=2025, MONTH=1), self._DF.reset_index(drop=True))
+            result = await postal.get_locales(datetime.date(2025, 1, 1), locales_cache=locales_cache, states=["nj"], cities=["avenel"])
+
+        expected = postal.filter_locales(self._DF.reset_index(drop=True), states=["nj"], cities=["avenel"])
+        assert result.index.tolist() == expected.index.tolist() == [0, 4]
+        assert result.astype(object).equals(expected.astype(object))
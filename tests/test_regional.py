@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+from timezonefinder import TimezoneFinder
+
+from zipcode_coordinates_tz.grid import Bounds
+from zipcode_coordinates_tz.regional import RegionalTimezoneFinder, build_dataset
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+# Straddles the Eastern and Central timezones across Indiana and Illinois
+_REGIONS = [Bounds(38.0, -90.0, 42.0, -84.0)]
+
+
+@pytest.fixture(scope="module")
+def timezone_finder() -> TimezoneFinder:
+    return TimezoneFinder()
+
+
+@pytest.fixture(scope="module")
+def dataset_dir(timezone_finder: TimezoneFinder, tmp_path_factory: pytest.TempPathFactory) -> Path:
+    return build_dataset(timezone_finder, tmp_path_factory.mktemp("regional") / "dataset", _REGIONS)
+
+
+class TestBuildDataset:
+    def test_keeps_only_the_shortcuts_of_the_regions(self, timezone_finder: TimezoneFinder, dataset_dir: Path) -> None:
+        regional = TimezoneFinder(bin_file_location=dataset_dir)
+        assert 0 < len(regional.shortcut_mapping) < len(timezone_finder.shortcut_mapping)
+        assert regional.timezone_at(lat=51.5, lng=0.0) is None
+
+    def test_matches_the_full_dataset_within_the_regions(self, timezone_finder: TimezoneFinder, dataset_dir: Path) -> None:
+        regional = TimezoneFinder(bin_file_location=dataset_dir)
+        rng = np.random.default_rng(0)
+        for lat, lng in zip(rng.uniform(39.0, 41.0, 500).tolist(), rng.uniform(-89.0, -85.0, 500).tolist()):
+            assert regional.timezone_at(lat=lat, lng=lng) == timezone_finder.timezone_at(lat=lat, lng=lng)
+
+
+class TestRegionalTimezoneFinder:
+    def test_falls_back_outside_of_the_regions(self, timezone_finder: TimezoneFinder, dataset_dir: Path) -> None:
+        fallback = MagicMock(return_value=timezone_finder)
+        regional = RegionalTimezoneFinder(dataset_dir, fallback)
+
+        assert regional.timezone_at(lat=40.0, lng=-88.0) == "America/Chicago"
+        fallback.assert_not_called()
+        assert regional.timezone_at(lat=51.5, lng=0.0) == "Europe/London"
+        assert regional.timezone_at(lat=34.0522, lng=-118.2437) == "America/Los_Angeles"
+        fallback.assert_called_once()
+
+    def test_invalid_coordinates_raise(self, timezone_finder: TimezoneFinder, dataset_dir: Path) -> None:
+        regional = RegionalTimezoneFinder(dataset_dir, lambda: timezone_finder)
+        with pytest.raises(ValueError):  # noqa: PT011
+            regional.timezone_at(lat=200.0, lng=-88.0)
+
+    def test_load_or_build_reuses_the_dataset(self, tmp_path: Path) -> None:
+        first = RegionalTimezoneFinder.load_or_build(directory=tmp_path, regions=_REGIONS)
+        assert len(list(tmp_path.iterdir())) == 1
+        second = RegionalTimezoneFinder.load_or_build(directory=tmp_path, regions=_REGIONS)
+
+        assert second.data_location == first.data_location
+        assert second.timezone_at(lat=40.0, lng=-86.0) == "America/Indiana/Indianapolis"
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+from unittest.mock import patch
+
+import pytest
+from asyncclick.testing import CliRunner
+
+from zipcode_coordinates_tz.commands import cli
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+@pytest.mark.asyncio
+class TestSave:
+    @pytest.mark.parametrize("zipcode", ["07001-1234", "07a", "089-070"])
+    async def test_invalid_zipcode_is_a_usage_error(self, tmp_path: Path, zipcode: str) -> None:
+        with patch("zipcode_coordinates_tz.commands.save.postal.get_locales") as mock_get_locales:
+            result = await CliRunner().invoke(cli, ["save", str(tmp_path / "output.csv"), "--zipcode", zipcode])
+
+        assert result.exit_code == 2
+        assert "Invalid value for '--zipcode'" in result.output
+        assert "zipcode must be" in result.output
+        mock_get_locales.assert_not_called()
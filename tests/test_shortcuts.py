@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import pandas as pd
+import pytz
+
+from zipcode_coordinates_tz import constants
+from zipcode_coordinates_tz.shortcuts import TimezoneShortcuts
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+def _make_df(rows: list[tuple[str | None, str | None, str | None]]) -> pd.DataFrame:
+    return pd.DataFrame(
+        [(state, zip_code, pytz.timezone(tz) if tz is not None else None) for state, zip_code, tz in rows],
+        columns=[constants.Columns.STATE, constants.Columns.ZIPCODE, constants.Columns.TIMEZONE],
+    )
+
+
+class TestTimezoneShortcuts:
+    def test_from_frame_keeps_the_single_timezone_prefixes_of_multi_timezone_states(self) -> None:
+        df = _make_df(
+            [
+                ("TX", "75001", "America/Chicago"),
+                ("TX", "75002", "America/Chicago"),
+                ("TX", "79902", "America/Chicago"),
+                ("TX", "79901", "America/Denver"),
+                ("FL", "32501", None),
+                ("NY", "10001", "America/New_York"),
+            ]
+        )
+        shortcuts = TimezoneShortcuts.from_frame(df)
+
+        assert shortcuts.zip3s == {"750": "America/Chicago"}
+        assert shortcuts.states == {"NY": "America/New_York"}
+
+    def test_from_frame_only_keeps_the_states_whose_prefixes_all_agree(self) -> None:
+        df = _make_df(
+            [
+                ("AL", "35203", "America/Chicago"),
+                ("AL", "36801", "America/Chicago"),
+                ("AL", "36867", "America/New_York"),
+                ("GA", "30303", "America/New_York"),
+                ("GA", "31901", "America/New_York"),
+            ]
+        )
+        shortcuts = TimezoneShortcuts.from_frame(df)
+
+        assert shortcuts.states == {"GA": "America/New_York"}
+        assert shortcuts.zip3s == {"352": "America/Chicago"}
+
+    def test_from_frame_accepts_compact_timezones(self) -> None:
+        df = _make_df([("TX", "75001", "America/Chicago"), ("TX", "79901", "America/Denver")])
+        df[constants.Columns.TIMEZONE] = df[constants.Columns.TIMEZONE].map(str).astype("category")
+        assert TimezoneShortcuts.from_frame(df).zip3s == {"750": "America/Chicago", "799": "America/Denver"}
+
+    def test_lookup_by_state_then_prefix(self) -> None:
+        shortcuts = TimezoneShortcuts({"750": "America/Chicago"}, {"NY": "America/New_York"})
+        df = pd.DataFrame(
+            {
+                constants.Columns.STATE: ["NY", "TX", "TX", None],
+                constants.Columns.ZIPCODE: ["10001", "75001", "79901", None],
+            },
+            index=[3, 2, 1, 0],
+        )
+        names = shortcuts.lookup(df)
+
+        assert names.index.tolist() == [3, 2, 1, 0]
+        assert names.tolist()[:2] == ["America/New_York", "America/Chicago"]
+        assert names.iloc[2:].isna().all()
+
+    def test_save_and_load_round_trip(self, tmp_path: Path) -> None:
+        file = tmp_path / "shortcuts.json"
+        TimezoneShortcuts({"750": "America/Chicago"}, {"NY": "America/New_York"}).save(file)
+        shortcuts = TimezoneShortcuts.load(file)
+
+        assert shortcuts.zip3s == {"750": "America/Chicago"}
+        assert shortcuts.states == {"NY": "America/New_York"}
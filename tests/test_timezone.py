@@ -1,12 +1,17 @@
 from __future__ import annotations
 
+from unittest.mock import MagicMock
+
+import numpy as np
 import pandas as pd
 import pytest
 from timezonefinder import TimezoneFinder
 
 from zipcode_coordinates_tz import constants
+from zipcode_coordinates_tz.grid import Bounds, TimezoneGrid
 from zipcode_coordinates_tz.models import FillMissing
-from zipcode_coordinates_tz.timezone import fill_timezones
+from zipcode_coordinates_tz.shortcuts import TimezoneShortcuts
+from zipcode_coordinates_tz.timezone import _open_timezone_finder, fill_timezones, lookup_many, to_tzinfo
 
 
 def _make_df(rows: list[dict]) -> pd.DataFrame:  # type: ignore[type-arg]
@@ -116,6 +121,65 @@ class TestFillTimezones:
         result = fill_timezones(df, fill_missing=FillMissing.ENABLED)
         assert str(result[constants.Columns.TIMEZONE].iloc[1]) == _NYC_TZ
 
+    def test_fill_missing_prefers_the_closest_match(self) -> None:
+        # The ZipCode match (Chicago) wins over the City match (Denver), and the previous row wins over the next one
+        df = _make_df(
+            [
+                {"Street": "1 Main St", "City": "Springfield", "State": "IL", "ZipCode": "62701", "Latitude": 41.88, "Longitude": -87.63},
+                {"Street": "2 Main St", "City": "Springfield", "State": "IL", "ZipCode": "62701", "Latitude": None, "Longitude": None},
+                {"Street": "3 Main St", "City": "Springfield", "State": "IL", "ZipCode": "62702", "Latitude": 39.74, "Longitude": -104.99},
+                {"Street": "4 Main St", "City": "Springfield", "State": "IL", "ZipCode": "62702", "Latitude": None, "Longitude": None},
+                {"Street": "5 Main St", "City": "Springfield", "State": "IL", "ZipCode": "62703", "Latitude": None, "Longitude": None},
+                {"Street": "6 Main St", "City": "Springfield", "State": "IL", "ZipCode": "62703", "Latitude": _LA_LAT, "Longitude": _LA_LNG},
+            ]
+        )
+        result = fill_timezones(df, fill_missing=FillMissing.ENABLED)
+        assert [str(tz) for tz in result[constants.Columns.TIMEZONE]] == [
+            "America/Chicago",
+            "America/Chicago",
+            "America/Denver",
+            "America/Denver",
+            _LA_TZ,
+            _LA_TZ,
+        ]
+
+    def test_fill_missing_keeps_rows_without_a_state(self) -> None:
+        df = _make_df([{"Street": "1 Main St", "City": "New York", "State": None, "ZipCode": "10001", "Latitude": _NYC_LAT, "Longitude": _NYC_LNG}])
+        result = fill_timezones(df, fill_missing=FillMissing.ENABLED)
+        assert str(result[constants.Columns.TIMEZONE].iloc[0]) == _NYC_TZ
+
+    def test_fill_missing_nearest_uses_the_nearest_location_of_the_zip3(self) -> None:
+        # 83301 (Twin Falls) is in America/Boise, 83814 (Coeur d'Alene) is in America/Los_Angeles
+        df = _make_df(
+            [
+                {"Street": "1 Main St", "City": "Twin Falls", "State": "ID", "ZipCode": "83301", "Latitude": 42.56, "Longitude": -114.46},
+                {"Street": "1 Sherman Ave", "City": "Coeur d'Alene", "State": "ID", "ZipCode": "83814", "Latitude": 47.67, "Longitude": -116.78},
+                {"Street": "2 Main St", "City": "Twin Falls", "State": "ID", "ZipCode": "83301", "Latitude": None, "Longitude": None},
+                {"Street": "1 Lake St", "City": "Hayden", "State": "ID", "ZipCode": "83835", "Latitude": None, "Longitude": None},
+                {"Street": "1 Main St", "City": "Gooding", "State": "ID", "ZipCode": "83330", "Latitude": None, "Longitude": None},
+                {"Street": "1 Any St", "City": "Nowhere", "State": "MT", "ZipCode": "59001", "Latitude": None, "Longitude": None},
+            ]
+        )
+        result = fill_timezones(df, fill_missing=FillMissing.NEAREST)
+        assert [str(tz) if tz is not None else None for tz in result[constants.Columns.TIMEZONE]] == [
+            "America/Boise",
+            _LA_TZ,
+            "America/Boise",
+            _LA_TZ,
+            "America/Boise",
+            None,
+        ]
+
+    def test_fill_missing_nearest_does_not_depend_on_row_order(self) -> None:
+        rows: list[dict[str, object]] = [
+            {"Street": "1 Main St", "City": "Chicago", "State": "IL", "ZipCode": "60601", "Latitude": 41.88, "Longitude": -87.63},
+            {"Street": "2 Main St", "City": "Chicago", "State": "IL", "ZipCode": "60601", "Latitude": None, "Longitude": None},
+            {"Street": "3 Main St", "City": "Chicago", "State": "IL", "ZipCode": "60601", "Latitude": 41.89, "Longitude": -87.62},
+        ]
+        expected = fill_timezones(_make_df(rows), fill_missing=FillMissing.NEAREST, compact=True)[constants.Columns.TIMEZONE].tolist()
+        reversed_result = fill_timezones(_make_df(rows[::-1]), fill_missing=FillMissing.NEAREST, compact=True)
+        assert reversed_result[constants.Columns.TIMEZONE].tolist()[::-1] == expected == ["America/Chicago"] * 3
+
     def test_accepts_custom_timezone_finder(self) -> None:
         tf = TimezoneFinder()
         df = _make_df([{"Street": "1 Main St", "City": "New York", "State": "NY", "ZipCode": "10001", "Latitude": _NYC_LAT, "Longitude": _NYC_LNG}])
@@ -128,3 +192,128 @@ class TestFillTimezones:
         result = fill_timezones(df, fill_missing=fill_missing)
         assert constants.Columns.TIMEZONE in result.columns
         assert len(result) == 0
+
+    def test_each_distinct_coordinate_is_looked_up_once(self) -> None:
+        tf = MagicMock(wraps=TimezoneFinder())
+        nyc = {"City": "New York", "State": "NY", "ZipCode": "10001", "Latitude": _NYC_LAT, "Longitude": _NYC_LNG}
+        la = {"City": "Los Angeles", "State": "CA", "ZipCode": "90001", "Latitude": _LA_LAT, "Longitude": _LA_LNG}
+        df = _make_df([*({"Street": f"{i} Main St", **nyc} for i in range(5)), {"Street": "1 Sunset Blvd", **la}])
+        result = fill_timezones(df, fill_missing=FillMissing.DISABLED, timezone_finder=tf)
+
+        assert tf.timezone_at.call_count == 2
+        assert [str(tz) for tz in result[constants.Columns.TIMEZONE]] == [_NYC_TZ] * 5 + [_LA_TZ]
+
+    def test_object_coordinates_without_values(self) -> None:
+        # census.get_coordinates fills the coordinate columns with None when nothing was geocoded
+        df = _make_df([{"Street": "1 Main St", "City": "New York", "State": "NY", "ZipCode": "10001"}])
+        df[constants.Columns.LATITUDE] = None
+        df[constants.Columns.LONGITUDE] = None
+        result = fill_timezones(df, fill_missing=FillMissing.DISABLED)
+        assert result[constants.Columns.TIMEZONE].isna().all()
+
+    def test_invalid_coordinates_have_no_timezone(self) -> None:
+        df = _make_df([{"Street": "1 Main St", "City": "New York", "State": "NY", "ZipCode": "10001", "Latitude": 200.0, "Longitude": _NYC_LNG}])
+        result = fill_timezones(df, fill_missing=FillMissing.DISABLED)
+        assert result[constants.Columns.TIMEZONE].isna().all()
+
+    def test_timezone_grid_answers_without_polygon_lookup(self) -> None:
+        tf = MagicMock(wraps=TimezoneFinder())
+        timezone_grid = TimezoneGrid.build(TimezoneFinder(), Bounds(40.0, -75.0, 41.5, -73.0), resolution=0.25)
+        nyc = {"Street": "1 Main St", "City": "New York", "State": "NY", "ZipCode": "10001", "Latitude": 40.75, "Longitude": -74.0}
+        la = {"Street": "1 Sunset Blvd", "City": "Los Angeles", "State": "CA", "ZipCode": "90001", "Latitude": _LA_LAT, "Longitude": _LA_LNG}
+        result = fill_timezones(_make_df([nyc, la]), fill_missing=FillMissing.DISABLED, timezone_finder=tf, timezone_grid=timezone_grid)
+
+        # Only the coordinates outside of the grid are looked up
+        assert tf.timezone_at.call_count == 1
+        assert [str(tz) for tz in result[constants.Columns.TIMEZONE]] == [_NYC_TZ, _LA_TZ]
+
+    def test_timezone_shortcuts_resolve_without_coordinates(self) -> None:
+        tf = MagicMock(wraps=TimezoneFinder())
+        ny = {"Street": "1 Main St", "City": "New York", "State": "NY", "ZipCode": "10001"}
+        dallas = {"Street": "1 Elm St", "City": "Dallas", "State": "TX", "ZipCode": "75201"}
+        el_paso = {"Street": "1 Oregon St", "City": "El Paso", "State": "TX", "ZipCode": "79901", "Latitude": 31.76, "Longitude": -106.49}
+        result = fill_timezones(
+            _make_df([ny, dallas, el_paso]),
+            fill_missing=FillMissing.DISABLED,
+            timezone_finder=tf,
+            timezone_shortcuts=TimezoneShortcuts({"752": "America/Chicago"}, {"NY": _NYC_TZ}),
+        )
+
+        assert tf.timezone_at.call_count == 1
+        assert [str(tz) for tz in result[constants.Columns.TIMEZONE]] == [_NYC_TZ, "America/Chicago", "America/Denver"]
+
+    def test_workers_match_a_single_process(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr("zipcode_coordinates_tz.timezone.MIN_PARALLEL_COORDINATES", 1)
+        rows = [
+            {"Street": f"{i} Main St", "City": "City", "State": "NY", "ZipCode": "10001", "Latitude": 30.0 + i * 0.5, "Longitude": -120.0 + i}
+            for i in range(40)
+        ]
+        expected = fill_timezones(_make_df(rows), fill_missing=FillMissing.DISABLED)
+        result = fill_timezones(_make_df(rows), fill_missing=FillMissing.DISABLED, workers=2)
+        assert [str(tz) for tz in result[constants.Columns.TIMEZONE]] == [str(tz) for tz in expected[constants.Columns.TIMEZONE]]
+
+    def test_workers_must_be_positive(self) -> None:
+        with pytest.raises(ValueError, match="workers"):
+            fill_timezones(_make_df([]), workers=0)
+
+    def test_compact_holds_categorical_names(self) -> None:
+        nyc = {"Street": "1 Main St", "City": "New York", "State": "NY", "ZipCode": "10001", "Latitude": _NYC_LAT, "Longitude": _NYC_LNG}
+        unmatched = {"Street": "2 Main St", "City": "New York", "State": "NY", "ZipCode": "10001"}
+        la = {"Street": "1 Sunset Blvd", "City": "Los Angeles", "State": "CA", "ZipCode": "90001", "Latitude": _LA_LAT, "Longitude": _LA_LNG}
+        result = fill_timezones(_make_df([nyc, unmatched, la]), compact=True)
+
+        assert isinstance(result[constants.Columns.TIMEZONE].dtype, pd.CategoricalDtype)
+        assert result[constants.Columns.TIMEZONE].tolist() == [_NYC_TZ, _NYC_TZ, _LA_TZ]
+
+    def test_compact_empty_df_keeps_categorical(self) -> None:
+        result = fill_timezones(_make_df([]), compact=True)
+        assert isinstance(result[constants.Columns.TIMEZONE].dtype, pd.CategoricalDtype)
+
+
+class TestLookupMany:
+    def test_returns_codes_into_the_names(self) -> None:
+        codes, names = lookup_many(np.array([_NYC_LAT, _LA_LAT, _NYC_LAT]), np.array([_NYC_LNG, _LA_LNG, _NYC_LNG]))
+        assert codes.dtype == np.int16
+        assert [names[code] for code in codes] == [_NYC_TZ, _LA_TZ, _NYC_TZ]
+
+    def test_unknown_and_invalid_coordinates_are_missing(self) -> None:
+        codes, names = lookup_many([np.nan, 200.0, _NYC_LAT], [_NYC_LNG, _NYC_LNG, np.nan])
+        assert codes.tolist() == [-1, -1, -1]
+        assert names == []
+
+    def test_each_distinct_coordinate_is_looked_up_once(self) -> None:
+        tf = MagicMock(wraps=TimezoneFinder())
+        codes, names = lookup_many(np.full(100, _NYC_LAT), np.full(100, _NYC_LNG), timezone_finder=tf)
+        assert tf.timezone_at.call_count == 1
+        assert (codes == names.index(_NYC_TZ)).all()
+
+    def test_mismatched_lengths_raise(self) -> None:
+        with pytest.raises(ValueError, match="same length"):
+            lookup_many(np.zeros(2), np.zeros(3))
+
+
+class TestToTzinfo:
+    def test_materializes_one_tzinfo_per_name(self) -> None:
+        result = to_tzinfo(pd.Series([_NYC_TZ, None, _NYC_TZ, _LA_TZ], dtype="category", name="TZ"))
+
+        assert result.name == "TZ"
+        assert [str(tz) if tz is not None else None for tz in result] == [_NYC_TZ, None, _NYC_TZ, _LA_TZ]
+        assert result[0] is result[2]
+
+    def test_accepts_object_names(self) -> None:
+        result = to_tzinfo(pd.Series([_LA_TZ], index=[7]))
+        assert result.index.tolist() == [7]
+        assert str(result[7]) == _LA_TZ
+
+
+class TestOpenTimezoneFinder:
+    def test_us_only_opens_the_regional_dataset(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        regional_finder = MagicMock()
+        monkeypatch.setattr("zipcode_coordinates_tz.constants.TIMEZONE_FINDER_US_ONLY", True)
+        monkeypatch.setattr("zipcode_coordinates_tz.regional.RegionalTimezoneFinder.load_or_build", MagicMock(return_value=regional_finder))
+        assert _open_timezone_finder(in_memory=False) is regional_finder
+
+    def test_us_only_falls_back_when_unsupported(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr("zipcode_coordinates_tz.constants.TIMEZONE_FINDER_US_ONLY", True)
+        monkeypatch.setattr("zipcode_coordinates_tz.regional.RegionalTimezoneFinder.load_or_build", MagicMock(side_effect=ImportError))
+        assert type(_open_timezone_finder(in_memory=False)) is TimezoneFinder
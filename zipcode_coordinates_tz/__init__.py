@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import importlib.metadata
 
-from zipcode_coordinates_tz import census, constants, models, postal, timezone
+from zipcode_coordinates_tz import cache, census, constants, grid, journal, models, offsets, postal, regional, shortcuts, timezone
 
 # set the version number within the package using importlib
 try:
@@ -12,4 +12,4 @@ except importlib.metadata.PackageNotFoundError:
     __version__ = None
 
 
-__all__ = ["__version__", "census", "constants", "models", "postal", "timezone"]
+__all__ = ["__version__", "cache", "census", "constants", "grid", "journal", "models", "offsets", "postal", "regional", "shortcuts", "timezone"]
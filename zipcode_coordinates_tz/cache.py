@@ -0,0 +1,421 @@
+from __future__ import annotations
+
+import abc
+import contextlib
+import datetime
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Final, NamedTuple
+
+import pandas as pd
+
+from zipcode_coordinates_tz import constants, models
+
+if TYPE_CHECKING:
+    from collections.abc import Collection
+    from types import TracebackType
+
+    from typing_extensions import Self
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_NEGATIVE_TTL: Final[datetime.timedelta] = datetime.timedelta(days=30)
+DEFAULT_CACHE_FILE: Final[Path] = constants.CACHE_DIR / "geocode.sqlite3"
+DEFAULT_DOWNLOAD_DIR: Final[Path] = constants.CACHE_DIR / "downloads"
+DEFAULT_RETENTION_MONTHS: Final[int] = 1
+DEFAULT_LOCALES_DIR: Final[Path] = constants.CACHE_DIR / "locales"
+
+_BLOBS_DIR: Final[str] = "blobs"
+_ENTRIES_DIR: Final[str] = "entries"
+_HASH_CHUNK_SIZE: Final[int] = 1024 * 1024
+_PRUNE_GRACE: Final[float] = 3600.0  # seconds a file without an entry is kept for, in case another process is storing it
+
+_ADDRESS_COLUMNS: Final[list[str]] = [constants.Columns.STREET, constants.Columns.CITY, constants.Columns.STATE, constants.Columns.ZIPCODE]
+_RESULT_COLUMNS: Final[list[str]] = [constants.Columns.MATCH, constants.Columns.LATITUDE, constants.Columns.LONGITUDE]
+
+_CREATE_TABLE: Final[str] = """
+CREATE TABLE IF NOT EXISTS geocode (
+    street TEXT NOT NULL,
+    city TEXT NOT NULL,
+    state TEXT NOT NULL,
+    zip_code TEXT NOT NULL,
+    benchmark TEXT NOT NULL,
+    vintage TEXT NOT NULL,
+    match TEXT NOT NULL,
+    latitude REAL,
+    longitude REAL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (street, city, state, zip_code, benchmark, vintage)
+) WITHOUT ROWID
+"""
+_CREATE_LOOKUP_TABLE: Final[str] = """
+CREATE TEMP TABLE IF NOT EXISTS lookup (
+    pos INTEGER PRIMARY KEY,
+    street TEXT NOT NULL,
+    city TEXT NOT NULL,
+    state TEXT NOT NULL,
+    zip_code TEXT NOT NULL
+)
+"""
+_SELECT_LOOKUP: Final[str] = """
+SELECT l.pos, g.match, g.latitude, g.longitude
+FROM lookup l
+JOIN geocode g
+    ON g.street = l.street AND g.city = l.city AND g.state = l.state AND g.zip_code = l.zip_code
+WHERE g.benchmark = ? AND g.vintage = ? AND ((g.match = ? AND g.updated >= ?) OR (g.match != ? AND g.updated >= ?))
+"""
+_UPSERT: Final[str] = "INSERT OR REPLACE INTO geocode VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+
+
+def normalize_addresses(df_addresses: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normalizes the address columns so that cosmetic differences do not produce distinct cache keys.
+
+    Every value is converted to an upper case string with surrounding whitespace removed and internal whitespace collapsed,
+    missing values become the empty string.
+
+    Args:
+        df_addresses (pd.DataFrame): A DataFrame containing the Street, City, State and ZipCode columns.
+
+    Returns:
+        A DataFrame with the normalized Street, City, State and ZipCode columns, sharing the index of df_addresses.
+
+    >>> normalize_addresses(pd.DataFrame({"Street": [" 1  main st "], "City": ["New York"], "State": ["ny"], "ZipCode": [None]})).iloc[0].tolist()
+    ['1 MAIN ST', 'NEW YORK', 'NY', '']
+    """
+    return pd.DataFrame(
+        {column: df_addresses[column].fillna("").astype(str).str.upper().str.split().str.join(" ").fillna("") for column in _ADDRESS_COLUMNS},
+        index=df_addresses.index,
+    )
+
+
+class GeocodeCache(abc.ABC):
+    """
+    A store of batch geocoding results keyed by the normalized address, benchmark and vintage.
+
+    Implementations are consulted by census.get_coordinates before any request is made, only addresses without a
+    valid entry are sent to the Census batch geocoder and the results of those requests are written back.
+    """
+
+    @abc.abstractmethod
+    def get(self, df_addresses: pd.DataFrame, benchmark: str, vintage: str) -> pd.DataFrame:
+        """
+        Looks up the cached results for the addresses.
+
+        Args:
+            df_addresses (pd.DataFrame): A DataFrame containing the Street, City, State and ZipCode columns.
+            benchmark (str): The benchmark value.
+            vintage (str): The vintage value.
+
+        Returns:
+            A DataFrame with the Match, Latitude and Longitude columns for the addresses with a valid cached result,
+            indexed by the matching index labels of df_addresses.
+        """
+
+    @abc.abstractmethod
+    def put(self, df_results: pd.DataFrame, benchmark: str, vintage: str) -> None:
+        """
+        Stores the results for the addresses.
+
+        Args:
+            df_results (pd.DataFrame): A DataFrame containing the Street, City, State, ZipCode, Match, Latitude and Longitude columns.
+            benchmark (str): The benchmark value.
+            vintage (str): The vintage value.
+        """
+
+
+class SQLiteGeocodeCache(GeocodeCache):
+    """
+    A GeocodeCache backed by a local SQLite database.
+
+    Matched addresses are kept until ttl expires (forever by default), while addresses that could not be matched are
+    kept for negative_ttl so that they are periodically retried instead of being sent on every run.
+
+    Args:
+        path (Path | str | None): The database file (defaults to DEFAULT_CACHE_FILE).
+        ttl (datetime.timedelta | None): How long matched results remain valid (defaults to forever).
+        negative_ttl (datetime.timedelta): How long unmatched results remain valid (defaults to DEFAULT_NEGATIVE_TTL).
+    """
+
+    def __init__(
+        self,
+        path: Path | str | None = None,
+        ttl: datetime.timedelta | None = None,
+        negative_ttl: datetime.timedelta = DEFAULT_NEGATIVE_TTL,
+    ) -> None:
+        self.path = Path(path) if path is not None else DEFAULT_CACHE_FILE
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(_CREATE_TABLE)
+            self._connection.execute(_CREATE_LOOKUP_TABLE)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None, exc_value: BaseException | None, traceback: TracebackType | None) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Closes the underlying database connection."""
+        self._connection.close()
+
+    def get(self, df_addresses: pd.DataFrame, benchmark: str, vintage: str) -> pd.DataFrame:
+        df_keys = normalize_addresses(df_addresses)
+        now = time.time()
+        match_since = now - self.ttl.total_seconds() if self.ttl is not None else float("-inf")
+        no_match_since = now - self.negative_ttl.total_seconds()
+        with self._connection:
+            self._connection.execute("DELETE FROM lookup")
+            self._connection.executemany(
+                "INSERT INTO lookup VALUES (?, ?, ?, ?, ?)",
+                zip(range(len(df_keys)), *(df_keys[column] for column in _ADDRESS_COLUMNS)),
+            )
+            rows = self._connection.execute(
+                _SELECT_LOOKUP,
+                (benchmark, vintage, str(models.MatchStatus.MATCH), match_since, str(models.MatchStatus.MATCH), no_match_since),
+            ).fetchall()
+            self._connection.execute("DELETE FROM lookup")
+
+        df_hits = pd.DataFrame(rows, columns=["pos", *_RESULT_COLUMNS]).astype(
+            {constants.Columns.LATITUDE: "float64", constants.Columns.LONGITUDE: "float64"}
+        )
+        df_hits.index = df_addresses.index.take(df_hits.pop("pos").to_numpy())
+        logger.debug("Found %d out of %d addresses in %s.", len(df_hits), len(df_addresses), self.path)
+        return df_hits
+
+    def put(self, df_results: pd.DataFrame, benchmark: str, vintage: str) -> None:
+        if df_results.empty:
+            return
+
+        df_keys = normalize_addresses(df_results)
+        now = time.time()
+        with self._connection:
+            self._connection.executemany(
+                _UPSERT,
+                zip(
+                    *(df_keys[column] for column in _ADDRESS_COLUMNS),
+                    [benchmark] * len(df_results),
+                    [vintage] * len(df_results),
+                    df_results[constants.Columns.MATCH].astype(str),
+                    # SQLite stores NaN as NULL
+                    df_results[constants.Columns.LATITUDE].astype("float64"),
+                    df_results[constants.Columns.LONGITUDE].astype("float64"),
+                    [now] * len(df_results),
+                ),
+            )
+        logger.debug("Stored %d addresses in %s.", len(df_results), self.path)
+
+
+def _month_index(date: datetime.date) -> int:
+    return date.year * 12 + date.month - 1
+
+
+class DownloadEntry(NamedTuple):
+    """Represents a cached download.
+
+    Attributes:
+        url: The URL the file was downloaded from.
+        path: The cached file.
+        etag: The ETag header of the response, if any.
+        last_modified: The Last-Modified header of the response, if any.
+        month: The month the file was stored in, as YYYY-MM.
+    """
+
+    url: str
+    path: Path
+    etag: str | None
+    last_modified: str | None
+    month: str
+
+
+class DownloadCache:
+    """
+    A content-addressed store of downloaded files, revalidated by http.get_cached_file with a conditional GET.
+
+    Files are stored once per distinct content, named after their SHA-256 digest, and each URL records the digest of its
+    latest response along with its ETag and Last-Modified headers. Entries expire at the end of the retention_months-th
+    month after the one they were stored in, after which the URL is downloaded again unconditionally, and the files no
+    entry refers to any more are removed.
+
+    Args:
+        directory (Path | str | None): The directory that holds the files (defaults to DEFAULT_DOWNLOAD_DIR).
+        retention_months (int): The number of calendar months an entry is kept for, counting the month it was stored in
+            (defaults to DEFAULT_RETENTION_MONTHS).
+    """
+
+    def __init__(self, directory: Path | str | None = None, retention_months: int = DEFAULT_RETENTION_MONTHS) -> None:
+        if retention_months < 1:
+            msg = f"retention_months must be at least 1, got {retention_months}"
+            raise ValueError(msg)
+
+        self.directory = Path(directory) if directory is not None else DEFAULT_DOWNLOAD_DIR
+        self.retention_months = retention_months
+        (self.directory / _BLOBS_DIR).mkdir(parents=True, exist_ok=True)
+        (self.directory / _ENTRIES_DIR).mkdir(parents=True, exist_ok=True)
+
+    def _entry_file(self, url: str) -> Path:
+        return self.directory / _ENTRIES_DIR / f"{hashlib.sha256(url.encode()).hexdigest()[:32]}.json"
+
+    def _is_expired(self, month: str, today: datetime.date) -> bool:
+        stored = datetime.datetime.strptime(month, "%Y-%m").date()  # noqa: DTZ007
+        return _month_index(today) - _month_index(stored) >= self.retention_months
+
+    def _read_entry(self, entry_file: Path) -> DownloadEntry | None:
+        try:
+            data = json.loads(entry_file.read_text(encoding="utf-8"))
+            return DownloadEntry(data["url"], self.directory / _BLOBS_DIR / data["blob"], data["etag"], data["last_modified"], data["month"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def get(self, url: str) -> DownloadEntry | None:
+        """
+        Looks up the cached download of the URL.
+
+        Args:
+            url (str): The URL of the file.
+
+        Returns:
+            The DownloadEntry, or None when the URL was never stored, its entry expired or its file is missing.
+        """
+        entry = self._read_entry(self._entry_file(url))
+        if entry is None or entry.url != url or not entry.path.exists():
+            return None
+        if self._is_expired(entry.month, constants.get_date_in_ny()):
+            logger.debug("The cached download of %s from %s expired.", url, entry.month)
+            return None
+        return entry
+
+    def put(self, url: str, file: Path, etag: str | None = None, last_modified: str | None = None) -> DownloadEntry:
+        """
+        Stores a downloaded file as the latest response of the URL, moving it into the cache.
+
+        Args:
+            url (str): The URL the file was downloaded from.
+            file (Path): The downloaded file, on the same file system as the cache.
+            etag (str | None): The ETag header of the response.
+            last_modified (str | None): The Last-Modified header of the response.
+
+        Returns:
+            The DownloadEntry.
+        """
+        digest = hashlib.sha256()
+        with file.open("rb") as f:
+            for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        blob = f"{digest.hexdigest()}{file.suffix}"
+        file.replace(self.directory / _BLOBS_DIR / blob)
+
+        month = constants.get_date_in_ny().strftime("%Y-%m")
+        entry_file = self._entry_file(url)
+        tmp_file = entry_file.with_name(f"{entry_file.name}.{os.getpid()}.tmp")
+        tmp_file.write_text(json.dumps({"url": url, "blob": blob, "etag": etag, "last_modified": last_modified, "month": month}), encoding="utf-8")
+        tmp_file.replace(entry_file)
+        logger.debug("Stored %s as %s.", url, blob)
+        self.prune()
+        return DownloadEntry(url, self.directory / _BLOBS_DIR / blob, etag, last_modified, month)
+
+    def prune(self) -> None:
+        """Removes the expired entries and the files that no entry refers to any more."""
+        today = constants.get_date_in_ny()
+        blobs: set[str] = set()
+        for entry_file in (self.directory / _ENTRIES_DIR).glob("*.json"):
+            entry = self._read_entry(entry_file)
+            if entry is not None and self._is_expired(entry.month, today):
+                logger.debug("Removing the expired download of %s from %s.", entry.url, entry.month)
+                entry_file.unlink(missing_ok=True)
+            elif entry is not None:
+                blobs.add(entry.path.name)
+
+        now = time.time()
+        for blob_file in (self.directory / _BLOBS_DIR).iterdir():
+            with contextlib.suppress(OSError):
+                if blob_file.name not in blobs and now - blob_file.stat().st_mtime > _PRUNE_GRACE:
+                    blob_file.unlink()
+
+
+class LocalesCache:
+    """
+    A store of the parsed USPS locales DataFrame of each month, so that postal.get_locales neither downloads nor parses the
+    spreadsheet again within the month.
+
+    Frames are stored as Parquet, memory-mapped when read, when pyarrow is installed, and pickled otherwise. Like the
+    DownloadCache, the frames expire at the end of the retention_months-th month after the one they were stored in.
+
+    Args:
+        directory (Path | str | None): The directory that holds the frames (defaults to DEFAULT_LOCALES_DIR).
+        retention_months (int): The number of calendar months a frame is kept for, counting the month it was stored in
+            (defaults to DEFAULT_RETENTION_MONTHS).
+    """
+
+    def __init__(self, directory: Path | str | None = None, retention_months: int = DEFAULT_RETENTION_MONTHS) -> None:
+        if retention_months < 1:
+            msg = f"retention_months must be at least 1, got {retention_months}"
+            raise ValueError(msg)
+
+        self.directory = Path(directory) if directory is not None else DEFAULT_LOCALES_DIR
+        self.retention_months = retention_months
+        self.parquet = importlib.util.find_spec("pyarrow") is not None
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _file(self, url: str, month: datetime.date) -> Path:
+        suffix = ".parquet" if self.parquet else ".pkl"
+        return self.directory / f"{month:%Y-%m}-{hashlib.sha256(url.encode()).hexdigest()[:16]}{suffix}"
+
+    def get(self, url: str, states: Collection[str] | None = None) -> pd.DataFrame | None:
+        """
+        Loads the frame parsed from the file at the URL.
+
+        Args:
+            url (str): The URL of the USPS file.
+            states (Collection[str] | None): The states to load, as stored (ie: upper case), only the rows of which a Parquet
+                frame converts to pandas, a pickled frame is loaded whole (defaults to every state).
+
+        Returns:
+            The DataFrame, or None when it was not stored within the retention period.
+        """
+        today = constants.get_date_in_ny()
+        for months_ago in range(self.retention_months):
+            index = _month_index(today) - months_ago
+            file = self._file(url, datetime.date(index // 12, index % 12 + 1, 1))
+            if file.exists():
+                logger.debug("Loading the locales of %s from %s.", url, file)
+                if not self.parquet:
+                    return pd.read_pickle(file)  # noqa: S301
+                filters = None if states is None else [(constants.Columns.STATE, "in", sorted(states))]
+                return pd.read_parquet(file, memory_map=True, filters=filters)
+        return None
+
+    def put(self, url: str, df: pd.DataFrame) -> None:
+        """
+        Stores the frame parsed from the file at the URL, and removes the expired frames.
+
+        Args:
+            url (str): The URL of the USPS file.
+            df (pd.DataFrame): The parsed DataFrame.
+        """
+        today = constants.get_date_in_ny()
+        file = self._file(url, today)
+        tmp_file = file.with_name(f"{file.name}.{os.getpid()}.tmp")
+        # Both formats keep the index, so that a frame has the same row labels whichever way it was stored
+        if self.parquet:
+            df.to_parquet(tmp_file, index=True)
+        else:
+            df.to_pickle(tmp_file)
+        tmp_file.replace(file)
+        logger.debug("Stored the locales of %s as %s.", url, file)
+
+        for other in self.directory.glob("????-??-*"):
+            with contextlib.suppress(OSError, ValueError):
+                stored = datetime.datetime.strptime(other.name[:7], "%Y-%m").date()  # noqa: DTZ007
+                if _month_index(today) - _month_index(stored) >= self.retention_months:
+                    other.unlink()
@@ -1,14 +1,23 @@
 from __future__ import annotations
 
-import io
+import asyncio
 import logging
-from typing import Final
+import time
+from http import HTTPStatus
+from typing import IO, TYPE_CHECKING, Final
 
 import curl_cffi
+import numpy as np
 import pandas as pd
 from curl_cffi import requests
 
-from zipcode_coordinates_tz import constants, http, models
+from zipcode_coordinates_tz import cache, constants, http, journal, models
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncGenerator, AsyncIterable, AsyncIterator, Callable, Hashable, Iterable, Iterator
+    from pathlib import Path
+
+    import numpy.typing as npt
 
 logger = logging.getLogger(__name__)
 
@@ -16,15 +25,22 @@ logger = logging.getLogger(__name__)
 DEFAULT_BATCH_SIZE: Final[int] = 9500
 MAX_BATCH_RECORDS: Final[int] = 10000
 MAX_BATCH_BUFFER_SIZE: Final[int] = 5000000  # 5MB
-
-_CENSUS_URL: Final[str] = "https://geocoding.geo.census.gov/geocoder/locations/address"
-_CENSUS_BATCH_URL: Final[str] = "https://geocoding.geo.census.gov/geocoder/geographies/addressbatch"
-_BENCHMARKS_URL: Final[str] = "https://geocoding.geo.census.gov/geocoder/benchmarks"
-_VINTAGES_URL: Final[str] = "https://geocoding.geo.census.gov/geocoder/vintages"
+DEFAULT_MAX_CONCURRENCY: Final[int] = 1
+DEFAULT_MAX_ADDRESS_CONCURRENCY: Final[int] = 8
+MIN_ADAPTIVE_BATCH_SIZE: Final[int] = 100
+DEFAULT_TARGET_BATCH_LATENCY: Final[float] = 120.0  # seconds
+BISECT_FAILURE_BUDGET: Final[int] = 28  # enough to isolate two bad records out of MAX_BATCH_RECORDS
+FAILURES_ATTR: Final[str] = "failures"  # The key of DataFrame.attrs that holds the failed batches of a result
+
+_CENSUS_URL: Final[str] = f"{constants.CENSUS_GEOCODER_URL}/locations/address"
+_CENSUS_BATCH_URL: Final[str] = f"{constants.CENSUS_GEOCODER_URL}/geographies/addressbatch"
+_BENCHMARKS_URL: Final[str] = f"{constants.CENSUS_GEOCODER_URL}/benchmarks"
+_VINTAGES_URL: Final[str] = f"{constants.CENSUS_GEOCODER_URL}/vintages"
 
 _BENCHMARK_RENAME_COLUMNS: Final[dict[str, str]] = {"isDefault": "Default", "benchmarkName": "Name", "benchmarkDescription": "Description"}
 _VINTAGE_RENAME_COLUMNS: Final[dict[str, str]] = {"isDefault": "Default", "vintageName": "Name", "vintageDescription": "Description"}
 _COLUMNS: Final[list[str]] = ["Name", "Description", "Default"]
+_ADDRESS_COLUMNS: Final[list[str]] = [constants.Columns.STREET, constants.Columns.CITY, constants.Columns.STATE, constants.Columns.ZIPCODE]
 _CENSUS_BATCH_COLUMNS: Final[list[str]] = [
     "ID",  # Unique identifier from the input
     "Input Address",  # Original address string
@@ -47,18 +63,129 @@ def _fill_empty_rules(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def _extract_longitude(coord: str) -> float:
-    return float(coord.split(",", maxsplit=1)[0])
+class _BatchSizer:
+    """
+    Tracks the number of records to place in the next batch.
+
+    In ADAPTIVE mode the size grows by half while batches complete within the target latency, is scaled down towards the
+    target when they are slower and is halved when a batch fails; it is always kept within [MIN_ADAPTIVE_BATCH_SIZE, MAX_BATCH_RECORDS].
+    """
+
+    def __init__(self, size: int, sizing: models.BatchSizing, target_latency: float) -> None:
+        self.size = max(1, min(MAX_BATCH_RECORDS, size))
+        self.sizing = sizing
+        self.target_latency = target_latency
+
+    def _resize(self, size: float) -> None:
+        self.size = int(max(MIN_ADAPTIVE_BATCH_SIZE, min(MAX_BATCH_RECORDS, size)))
+        logger.debug("Batch size is now %d.", self.size)
+
+    def on_success(self, records: int, elapsed: float) -> None:
+        if self.sizing != models.BatchSizing.ADAPTIVE or records < self.size:
+            # Partial batches (the tail of the input or those cut short by the byte budget) say nothing about the size.
+            return
+
+        if elapsed <= self.target_latency:
+            self._resize(self.size * 1.5)
+        else:
+            self._resize(self.size * self.target_latency / elapsed)
+
+    def on_failure(self) -> None:
+        if self.sizing == models.BatchSizing.ADAPTIVE:
+            self._resize(self.size / 2)
+
+
+def _to_csv_lines(df: pd.DataFrame) -> list[bytes]:
+    """
+    Serializes the rows of the DataFrame into the CSV lines of a batch upload, one encoded line per row with the index as the ID.
+
+    Line breaks inside a value are replaced by a space so that every row occupies exactly one line.
+    """
+    df = df.replace(r"[\r\n]+", " ", regex=True)
+    return [line.encode() + b"\n" for line in df.to_csv(header=False, lineterminator="\n").split("\n")[:-1]]
+
+
+def _iter_batches(
+    df: pd.DataFrame,
+    sizer: _BatchSizer,
+    on_skip: Callable[[pd.DataFrame, str], None] | None = None,
+) -> Iterator[tuple[int, pd.DataFrame, bytes]]:
+    """
+    Greedily packs the rows of the DataFrame into batches that respect both the record and the byte limits.
 
+    The size of each batch is read from the sizer when it is produced, so adjustments made while earlier batches are in
+    flight apply to the remaining rows.
 
-def _extract_latitude(coord: str) -> float:
-    return float(coord.split(",", maxsplit=1)[1])
+    Args:
+        df (pd.DataFrame): The addresses to geocode.
+        sizer (_BatchSizer): Provides the maximum number of records of the next batch.
+        on_skip (Callable[[pd.DataFrame, str], None] | None): Called with the row and the error of every row that is skipped
+            because it exceeds the byte limit on its own, like a batch that failed.
 
+    Returns:
+        An Iterator of the offset, rows and CSV payload of each batch.
+    """
+    lines = _to_csv_lines(df)
+    offsets = np.zeros(len(lines) + 1, dtype=np.int64)
+    np.cumsum([len(line) for line in lines], out=offsets[1:])
+    start = 0
+    while start < len(lines):
+        # The furthest row that keeps the payload within the byte limit, capped by the record limit:
+        end = int(np.searchsorted(offsets, offsets[start] + MAX_BATCH_BUFFER_SIZE, side="right")) - 1
+        end = min(end, start + sizer.size)
+        if end == start:
+            error = f"The {len(lines[start])} bytes of the row exceed the {MAX_BATCH_BUFFER_SIZE} byte batch limit"
+            logger.warning("Skipping row %s: %s.", df.index[start], error)
+            if on_skip is not None:
+                on_skip(df.iloc[start : start + 1], error)
+            start += 1
+            continue
+
+        yield start, df.iloc[start:end], b"".join(lines[start:end])
+        start = end
+
+
+def _parse_batch_response(f: IO[bytes]) -> pd.DataFrame:
+    """
+    Parses the CSV body of a Census batch response.
+
+    Args:
+        f (IO[bytes]): The response body.
+
+    Returns:
+        A DataFrame of the Match status, Latitude and Longitude indexed by the ID column.
 
-async def get_benchmarks() -> pd.DataFrame:
+    """
+    df_geo = pd.read_csv(
+        f,
+        sep=",",
+        names=_CENSUS_BATCH_COLUMNS,
+        dtype={"Match": str, "Coordinates": str},
+        index_col=False,
+    ).set_index("ID")
+
+    # Split the "Longitude,Latitude" Coordinates of the Matches in a single vectorized step,
+    # reindex guarantees both columns exist even when no row contains a comma.
+    df_lon_lat = (
+        df_geo["Coordinates"]
+        .where(df_geo["Match"] == str(models.MatchStatus.MATCH))
+        .str.split(",", n=1, expand=True)
+        .reindex(columns=[0, 1])
+        .astype("float64")
+    )
+    df_geo[constants.Columns.LATITUDE] = df_lon_lat[1]
+    df_geo[constants.Columns.LONGITUDE] = df_lon_lat[0]
+    return df_geo[[constants.Columns.MATCH, constants.Columns.LATITUDE, constants.Columns.LONGITUDE]]
+
+
+async def get_benchmarks(session: requests.AsyncSession | http.SessionPool | None = None) -> pd.DataFrame:
     """
     Queries for the benchmarks.
 
+    Args:
+        session (requests.AsyncSession | http.SessionPool | None): The optional Session, or SessionPool, to send the request on
+            (defaults to the SessionPool entered by the caller, else a new Session for this call).
+
     Returns:
         A DataFrame with the shape of
             #   Column       Non-Null Count  Dtype
@@ -68,21 +195,26 @@ async def get_benchmarks() -> pd.DataFrame:
             2   Default      0 non-null      bool
     """
     async with (
-        requests.AsyncSession() as session,
+        http.session_scope(session) as benchmarks_session,
         http.get_json(
-            session,
+            benchmarks_session,
             _BENCHMARKS_URL,
         ) as data,
     ):
         return pd.DataFrame(data.get("benchmarks", [])).rename(columns=_BENCHMARK_RENAME_COLUMNS).reindex(columns=_COLUMNS)
 
 
-async def get_vintages(benchmark: models.Benchmark | str = models.Benchmark.Public_AR_CURRENT) -> pd.DataFrame:
+async def get_vintages(
+    benchmark: models.Benchmark | str = models.Benchmark.Public_AR_CURRENT,
+    session: requests.AsyncSession | http.SessionPool | None = None,
+) -> pd.DataFrame:
     """
     Queries for the vintages for the specified benchmark.
 
     Args:
         benchmark (models.Benchmark | str): The benchmark value (see get_benchmarks for possible values).
+        session (requests.AsyncSession | http.SessionPool | None): The optional Session, or SessionPool, to send the request on
+            (defaults to the SessionPool entered by the caller, else a new Session for this call).
 
     Returns:
         A DataFrame with the shape of
@@ -94,9 +226,9 @@ async def get_vintages(benchmark: models.Benchmark | str = models.Benchmark.Publ
     """
     params = {"benchmark": str(benchmark)}
     async with (
-        requests.AsyncSession() as session,
+        http.session_scope(session) as vintages_session,
         http.get_json(
-            session,
+            vintages_session,
             _VINTAGES_URL,
             params,
         ) as data,
@@ -104,8 +236,13 @@ async def get_vintages(benchmark: models.Benchmark | str = models.Benchmark.Publ
         return pd.DataFrame(data.get("vintages", [])).rename(columns=_VINTAGE_RENAME_COLUMNS).reindex(columns=_COLUMNS)
 
 
-async def get_address_coordinates(
-    street: str, city: str, state: str, zip_code: str, benchmark: models.Benchmark | str = models.Benchmark.Public_AR_CURRENT
+async def get_address_coordinates(  # noqa: PLR0913
+    street: str,
+    city: str,
+    state: str,
+    zip_code: str,
+    benchmark: models.Benchmark | str = models.Benchmark.Public_AR_CURRENT,
+    session: requests.AsyncSession | http.SessionPool | None = None,
 ) -> models.Coordinate | None:
     """
     Queries the coordinate for the specified address.
@@ -116,15 +253,17 @@ async def get_address_coordinates(
         state (str): The two-letter state abbreviation.
         zip_code (str): The zip code.
         benchmark (models.Benchmark | str): The benchmark value (see get_benchmarks for possible values).
+        session (requests.AsyncSession | http.SessionPool | None): The optional Session, or SessionPool, to send the request on
+            (defaults to the SessionPool entered by the caller, else a new Session for this call).
 
     Returns:
         models.Coordinate or None if not found.
     """
     params = {"format": "json", "benchmark": str(benchmark), "street": street, "city": city, "state": state, "zip": zip_code}
     async with (
-        requests.AsyncSession() as session,
+        http.session_scope(session) as address_session,
         http.get_json(
-            session,
+            address_session,
             _CENSUS_URL,
             params,
         ) as data,
@@ -136,15 +275,255 @@ async def get_address_coordinates(
         return coordinates[0] if coordinates else None
 
 
-async def get_coordinates(
+async def _get_address_coordinates_or_none(
+    i: int,
+    address: models.Address | tuple[str, str, str, str],
+    benchmark: models.Benchmark | str,
+    session: requests.AsyncSession,
+) -> models.Coordinate | None:
+    """Like get_address_coordinates, but a request that still fails after being retried is logged and returns None."""
+    street, city, state, zip_code = address
+    try:
+        return await get_address_coordinates(street, city, state, zip_code, benchmark, session)
+    except requests.exceptions.RequestException as e:
+        logger.warning("Failed to download the coordinates of address %d: %s", i, e)
+        return None
+
+
+async def get_addresses_coordinates(
+    addresses: Iterable[models.Address | tuple[str, str, str, str]],
+    benchmark: models.Benchmark | str = models.Benchmark.Public_AR_CURRENT,
+    max_concurrency: int = DEFAULT_MAX_ADDRESS_CONCURRENCY,
+    session: requests.AsyncSession | http.SessionPool | None = None,
+) -> list[models.Coordinate | None]:
+    """
+    Queries the coordinates for each of the addresses, sharing a single Session between the requests.
+
+    Args:
+        addresses (Iterable[models.Address | tuple[str, str, str, str]]): The street, city, state and zip code of each address.
+        benchmark (models.Benchmark | str): The benchmark value (see get_benchmarks for possible values).
+        max_concurrency (int): The maximum number of requests in flight at once (defaults to DEFAULT_MAX_ADDRESS_CONCURRENCY).
+        session (requests.AsyncSession | http.SessionPool | None): The optional Session, or SessionPool, to send the requests on
+            (defaults to the SessionPool entered by the caller, else a new Session for this call).
+
+    Returns:
+        The models.Coordinate of each address in the order of addresses, or None if it was not found or its request still
+        failed after being retried.
+    """
+    if max_concurrency < 1:
+        msg = f"max_concurrency must be at least 1, got {max_concurrency}"
+        raise ValueError(msg)
+
+    results: dict[int, models.Coordinate | None] = {}
+    pending = enumerate(addresses)
+
+    async def _worker(address_session: requests.AsyncSession) -> None:
+        # Each worker pulls the next address from the shared iterator as soon as its previous request completes.
+        for i, address in pending:
+            results[i] = await _get_address_coordinates_or_none(i, address, benchmark, address_session)
+
+    async with http.session_scope(session) as address_session:
+        workers = [asyncio.ensure_future(_worker(address_session)) for _ in range(max_concurrency)]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            # Stop the other workers before the session is closed when one of them raised.
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    return [results[i] for i in range(len(results))]
+
+
+async def _get_batch_coordinates(
+    session: requests.AsyncSession,
+    params: dict[str, str],
+    idx: int,
+    chunk: pd.DataFrame,
+    payload: bytes,
+) -> pd.DataFrame:
+    """
+    Submits a single batch of addresses to the Census batch geocoder.
+
+    Args:
+        session (requests.AsyncSession): The Session.
+        params (dict[str, str]): The benchmark and vintage query parameters.
+        idx (int): The offset of the chunk within the input, used to name the upload.
+        chunk (pd.DataFrame): The addresses to geocode.
+        payload (bytes): The chunk serialized as the CSV upload.
+
+    Returns:
+        A DataFrame of the Match status, Latitude and Longitude indexed by the chunk index.
+
+    Raises:
+        requests.exceptions.RequestException: If the request still fails after being retried.
+    """
+    assert len(chunk) <= MAX_BATCH_RECORDS, f"{len(chunk)} > {MAX_BATCH_RECORDS}"  # noqa: S101
+    assert len(payload) <= MAX_BATCH_BUFFER_SIZE, f"{len(payload)} > {MAX_BATCH_BUFFER_SIZE}"  # noqa: S101
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Sending request with csv file:\n%s", payload.decode())
+
+    mp = curl_cffi.CurlMime()
+    mp.addpart(
+        name="addressFile",  # form field name
+        content_type="text/csv",  # mime type
+        filename=f"upload-{idx}.csv",  # filename seen by remote server
+        data=payload,  # file-like object or bytes
+    )
+
+    async with http.post_and_spool(session, _CENSUS_BATCH_URL, params, mp) as response:
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Response received:\n%s", response.read().decode())
+            response.seek(0)
+
+        # Parse the response as a CSV without blocking the event loop:
+        df_geo = await asyncio.to_thread(_parse_batch_response, response)
+
+    logger.debug("Retrieved coordinates for %d out of %d", df_geo[constants.Columns.LATITUDE].notna().sum(), len(chunk))
+    return df_geo
+
+
+def _is_payload_error(e: Exception) -> bool:
+    """Returns True if a batch failed because of its payload: a 4xx response, or a response that could not be parsed."""
+    if isinstance(e, requests.exceptions.HTTPError):
+        status_code = getattr(e.response, "status_code", None)
+        return status_code is not None and HTTPStatus.BAD_REQUEST <= status_code < HTTPStatus.INTERNAL_SERVER_ERROR
+    # pandas raises a ValueError (ie: ParserError) for a response that is not the expected CSV
+    return isinstance(e, ValueError)
+
+
+class _BatchRunner:
+    """
+    Submits batches on a session, splitting the batches that fail.
+
+    A batch that fails because of its payload (a 4xx response, or a response that cannot be parsed) is bisected and each
+    half is submitted on its own, recursively, so that a single bad record or an oversized request only costs a few small
+    requests instead of every record of the batch. Every failed request is taken from a budget shared by the batch, once
+    it runs out the remaining failed parts are reported without being split again. Any other failure, such as a 5xx
+    response or a timeout, would fail every half the same way, so the batch is reported at once.
+
+    Args:
+        session (requests.AsyncSession): The Session.
+        params (dict[str, str]): The benchmark and vintage query parameters.
+        sizer (_BatchSizer): Informed of the outcome and latency of every batch.
+        on_batch (Callable[[pd.DataFrame, pd.DataFrame], None]): Called with the addresses and the results of every completed batch.
+        on_failure (Callable[[pd.DataFrame, str], None]): Called with the addresses and the error of every batch that failed.
+    """
+
+    def __init__(
+        self,
+        session: requests.AsyncSession,
+        params: dict[str, str],
+        sizer: _BatchSizer,
+        on_batch: Callable[[pd.DataFrame, pd.DataFrame], None],
+        on_failure: Callable[[pd.DataFrame, str], None],
+    ) -> None:
+        self.session = session
+        self.params = params
+        self.sizer = sizer
+        self.on_batch = on_batch
+        self.on_failure = on_failure
+
+    async def run(self, idx: int, chunk: pd.DataFrame, payload: bytes) -> None:
+        """Submits the batch, bisecting it if it fails."""
+        started = time.perf_counter()
+        try:
+            df_geo = await _get_batch_coordinates(self.session, self.params, idx, chunk, payload)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            self.sizer.on_failure()
+            # Without a budget the batch is reported as is
+            budget = [BISECT_FAILURE_BUDGET if _is_payload_error(e) else 0]
+            if budget[0] > 0:
+                logger.warning("Failed to download coordinates for %d addresses, splitting the batch: %s", len(chunk), e)
+            await self._bisect(idx, chunk, payload, str(e), budget)
+            return
+
+        self.sizer.on_success(len(chunk), time.perf_counter() - started)
+        self.on_batch(chunk, df_geo)
+
+    async def _bisect(self, idx: int, chunk: pd.DataFrame, payload: bytes, error: str, budget: list[int]) -> None:
+        if len(chunk) == 1 or budget[0] <= 0:
+            logger.error("Failed to download coordinates for %d addresses: %s", len(chunk), error)
+            self.on_failure(chunk, error)
+            return
+
+        # Each row of the chunk is exactly one line of the payload
+        lines = payload.splitlines(keepends=True)
+        mid = len(chunk) // 2
+        for offset, sub_chunk, sub_lines in ((0, chunk.iloc[:mid], lines[:mid]), (mid, chunk.iloc[mid:], lines[mid:])):
+            sub_payload = b"".join(sub_lines)
+            try:
+                df_geo = await _get_batch_coordinates(self.session, self.params, idx + offset, sub_chunk, sub_payload)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                budget[0] -= 1
+                if not _is_payload_error(e):
+                    budget[0] = 0  # Splitting further would fail the same way
+                await self._bisect(idx + offset, sub_chunk, sub_payload, str(e), budget)
+                continue
+
+            self.on_batch(sub_chunk, df_geo)
+
+
+def _assign_coordinates(df: pd.DataFrame, coordinates: npt.NDArray[np.float64]) -> pd.DataFrame:
+    """Adds the Latitude and Longitude columns from the (latitude, longitude) pairs, by position so repeated index labels are kept as is."""
+    return df.assign(**{constants.Columns.LATITUDE: coordinates[:, 0], constants.Columns.LONGITUDE: coordinates[:, 1]})
+
+
+class _Addresses:
+    """
+    The distinct addresses of a DataFrame and the mapping of its rows onto them.
+
+    The distinct addresses are numbered in the order they first appear, the number is the index of df_addresses and is
+    also used as the ID of the address within a batch.
+
+    Args:
+        df_zip_locals (pd.DataFrame): A DataFrame containing the Street, City, State and ZipCode columns.
+    """
+
+    def __init__(self, df_zip_locals: pd.DataFrame) -> None:
+        self.df_zip_locals = df_zip_locals[_ADDRESS_COLUMNS]
+        # The failures of a previous result are not carried over to the rows derived from it
+        self.df_zip_locals.attrs.pop(FAILURES_ATTR, None)
+        self.address_ids = self.df_zip_locals.groupby(_ADDRESS_COLUMNS, sort=False, dropna=False).ngroup().to_numpy()
+        self.df_addresses = self.df_zip_locals[~self.df_zip_locals.duplicated()].reset_index(drop=True)
+
+    def rows(self, ids: pd.Index) -> tuple[Hashable, ...]:
+        """Returns the index labels of the rows whose address is one of the ids."""
+        return tuple(self.df_zip_locals.index[np.isin(self.address_ids, ids)])
+
+    def scatter(self, df_geo: pd.DataFrame) -> pd.DataFrame:
+        """
+        Copies the coordinates of the addresses to the rows that share them.
+
+        Args:
+            df_geo (pd.DataFrame): A DataFrame with the Latitude and Longitude columns indexed by the address ID.
+
+        Returns:
+            The rows whose address is part of df_geo, with their Latitude and Longitude.
+        """
+        mask = np.isin(self.address_ids, df_geo.index)
+        coordinates = df_geo[[constants.Columns.LATITUDE, constants.Columns.LONGITUDE]].loc[self.address_ids[mask]].to_numpy(dtype=np.float64)
+        return _assign_coordinates(self.df_zip_locals[mask], coordinates)
+
+
+async def get_coordinates(  # noqa: PLR0913
     df_zip_locals: pd.DataFrame,
     benchmark: models.Benchmark | str = models.Benchmark.Public_AR_CURRENT,
     vintage: str = constants.DEFAULT_VINTAGE,
     batch_size: int = DEFAULT_BATCH_SIZE,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    geocode_cache: cache.GeocodeCache | None = None,
+    batch_sizing: models.BatchSizing = models.BatchSizing.FIXED,
+    target_batch_latency: float = DEFAULT_TARGET_BATCH_LATENCY,
+    checkpoint_dir: Path | str | None = None,
+    session: requests.AsyncSession | http.SessionPool | None = None,
 ) -> pd.DataFrame:
     """
     Queries for the latitude and longitude coordinates for the addresses contained in the dataframe.
 
+    Rows that share the same Street, City, State and ZipCode are only sent once, and their coordinates are copied to every
+    row with that address.
+
     Args:
         df_zip_locals (pd.DataFrame): A DataFrame in the shape of
             Data columns (total 4 columns):
@@ -156,7 +535,19 @@ async def get_coordinates(
             3   ZipCode  0 non-null      object
         benchmark (models.Benchmark | str): The benchmark value (see get_benchmarks for possible values).
         vintage (str): The vintage value (see get_vintages for possible values).
-        batch_size (int): The maximum number of rows to send in a single request (defaults to DEFAULT_BATCH_SIZE).
+        batch_size (int): The maximum number of rows to send in a single request (defaults to DEFAULT_BATCH_SIZE), a batch is
+            also cut short whenever its CSV payload would exceed MAX_BATCH_BUFFER_SIZE bytes.
+        max_concurrency (int): The maximum number of batch requests in flight at once (defaults to DEFAULT_MAX_CONCURRENCY).
+        geocode_cache (cache.GeocodeCache | None): The optional cache of previous results, only the addresses that are not
+            found in the cache are sent to the Census and their results are written back to it.
+        batch_sizing (models.BatchSizing): Whether batch_size is fixed or only the initial size, adapted to the observed
+            latency and failures of each batch (defaults to FIXED).
+        target_batch_latency (float): The number of seconds an ADAPTIVE batch should take (defaults to DEFAULT_TARGET_BATCH_LATENCY).
+        checkpoint_dir (Path | str | None): The optional directory in which the results of every completed batch are journaled,
+            calling again with the same addresses, benchmark and vintage resumes from the completed batches. The journal
+            is removed once every batch has completed.
+        session (requests.AsyncSession | http.SessionPool | None): The optional Session, or SessionPool, to send the requests
+            on (defaults to the SessionPool entered by the caller, else a new Session for this call).
 
     Returns:
         A DataFrame with the shape of
@@ -168,68 +559,333 @@ async def get_coordinates(
             3   ZipCode     0 non-null      object
             4   Latitude    0 non-null      float64
             5   Longitude   0 non-null      float64
+        The rows of the batches that could not be geocoded, even after being split into smaller batches, and the rows whose
+        CSV line alone exceeds MAX_BATCH_BUFFER_SIZE bytes are returned without coordinates, and a BatchFailure for each
+        of those batches is listed in its attrs (see get_failures).
     """
+    if max_concurrency < 1:
+        msg = f"max_concurrency must be at least 1, got {max_concurrency}"
+        raise ValueError(msg)
+
     if df_zip_locals.empty:
         return _fill_empty_rules(df_zip_locals)
 
-    batch_size = min(MAX_BATCH_RECORDS, batch_size)
+    # Only geocode each distinct address once, the results are scattered back to every row that shares it.
+    addresses = _Addresses(df_zip_locals)
+    df_zip_locals, df_addresses = addresses.df_zip_locals, addresses.df_addresses
+    logger.debug("Geocoding %d distinct addresses out of %d rows.", len(df_addresses), len(df_zip_locals))
+
+    job_journal = journal.Journal.for_job(checkpoint_dir, df_addresses, str(benchmark), vintage) if checkpoint_dir is not None else None
+    df_coordinates_lst, df_misses = _get_known_coordinates(df_addresses, str(benchmark), vintage, job_journal, geocode_cache)
+
+    def _on_batch(chunk: pd.DataFrame, df_geo: pd.DataFrame) -> None:
+        if geocode_cache is not None:
+            geocode_cache.put(chunk.join(df_geo, how="inner"), str(benchmark), vintage)
+        if job_journal is not None:
+            # Batches are named after their first address ID, which is never part of another completed batch of the job.
+            job_journal.write(int(chunk.index[0]), df_geo)
+
+    batch_failures: list[tuple[pd.DataFrame, str]] = []
+    if not df_misses.empty:
+        sizer = _BatchSizer(batch_size, batch_sizing, target_batch_latency)
+        params = {"benchmark": str(benchmark), "vintage": vintage}
+        df_batches_lst, batch_failures = await _get_batches_coordinates(df_misses, params, sizer, max_concurrency, _on_batch, session)
+        df_coordinates_lst.extend(df_batches_lst)
+
+    if job_journal is not None and not batch_failures:
+        job_journal.complete()
+
+    if not df_coordinates_lst:
+        df_result = _fill_empty_rules(df_zip_locals)
+    else:
+        # Concatenate all the dataframes, align them to the distinct addresses then broadcast back to the original rows:
+        df_coordinates = pd.concat(df_coordinates_lst)[[constants.Columns.LATITUDE, constants.Columns.LONGITUDE]].reindex(df_addresses.index)
+        logger.debug("Scattering %d coordinates to %d rows", len(df_coordinates), len(df_zip_locals))
+        df_result = _assign_coordinates(df_zip_locals, df_coordinates.to_numpy(dtype=np.float64)[addresses.address_ids])
+
+    # Report the failures against the original rows that share the failed addresses
+    df_result.attrs[FAILURES_ATTR] = [models.BatchFailure(addresses.rows(chunk.index), error) for chunk, error in batch_failures]
+    return df_result
+
+
+def get_failures(df: pd.DataFrame) -> list[models.BatchFailure]:
+    """
+    Returns the batches that could not be geocoded for a result of get_coordinates, or for a DataFrame yielded by iter_coordinates.
+
+    Args:
+        df (pd.DataFrame): The result.
+
+    Returns:
+        A BatchFailure for every batch of rows that were returned without coordinates because their request failed, or
+            because their CSV line alone exceeds MAX_BATCH_BUFFER_SIZE bytes.
+
+    >>> get_failures(pd.DataFrame())
+    []
+    """
+    return list(df.attrs.get(FAILURES_ATTR, []))
+
+
+async def iter_coordinates(  # noqa: PLR0913
+    frames: pd.DataFrame | AsyncIterable[pd.DataFrame],
+    benchmark: models.Benchmark | str = models.Benchmark.Public_AR_CURRENT,
+    vintage: str = constants.DEFAULT_VINTAGE,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    geocode_cache: cache.GeocodeCache | None = None,
+    batch_sizing: models.BatchSizing = models.BatchSizing.FIXED,
+    target_batch_latency: float = DEFAULT_TARGET_BATCH_LATENCY,
+    session: requests.AsyncSession | http.SessionPool | None = None,
+) -> AsyncIterator[pd.DataFrame]:
+    """
+    Streams the latitude and longitude coordinates for the addresses, yielding the rows of each batch as soon as it completes.
+
+    The input is consumed one DataFrame at a time while at most max_concurrency batches are in flight, so the memory held
+    is bounded by a few batches rather than by the whole dataset, and downstream stages can start on the first batch.
+    Rows that share the same address within an input DataFrame are only sent once, addresses found in the geocode cache
+    are yielded before the batches of their DataFrame are submitted.
+
+    Every input row is yielded exactly once, with its original index label, but in the order its batch completed; the rows
+    of a batch that could not be geocoded are yielded without coordinates, in a DataFrame that lists the BatchFailure of
+    the batch in its attrs (see get_failures).
+
+    Args:
+        frames (pd.DataFrame | AsyncIterable[pd.DataFrame]): A DataFrame, or an async stream of DataFrames, containing the
+            Street, City, State and ZipCode columns.
+        benchmark (models.Benchmark | str): The benchmark value (see get_benchmarks for possible values).
+        vintage (str): The vintage value (see get_vintages for possible values).
+        batch_size (int): The maximum number of rows to send in a single request (defaults to DEFAULT_BATCH_SIZE).
+        max_concurrency (int): The maximum number of batch requests in flight at once (defaults to DEFAULT_MAX_CONCURRENCY).
+        geocode_cache (cache.GeocodeCache | None): The optional cache of previous results.
+        batch_sizing (models.BatchSizing): Whether batch_size is fixed or adapted to the observed latency (defaults to FIXED).
+        target_batch_latency (float): The number of seconds an ADAPTIVE batch should take (defaults to DEFAULT_TARGET_BATCH_LATENCY).
+        session (requests.AsyncSession | http.SessionPool | None): The optional Session, or SessionPool, to send the requests
+            on (defaults to the SessionPool entered by the caller, else a new Session for this call).
+
+    Returns:
+        An AsyncIterator of DataFrames with the Street, City, State, ZipCode, Latitude and Longitude columns.
+    """
+    if max_concurrency < 1:
+        msg = f"max_concurrency must be at least 1, got {max_concurrency}"
+        raise ValueError(msg)
+
+    sizer = _BatchSizer(batch_size, batch_sizing, target_batch_latency)
     params = {"benchmark": str(benchmark), "vintage": vintage}
-    batch_cnt = max(1, len(df_zip_locals) // batch_size)
-    logger.debug("Chunking %d rows into %d batch requests with %d rows each.", len(df_zip_locals), batch_cnt, batch_size)
+    async with http.session_scope(session) as stream_session:
+        geocoder = _StreamGeocoder(stream_session, params, sizer, geocode_cache)
+        stream = _stream_coordinates(frames, geocoder, max_concurrency)
+        try:
+            async for df in stream:
+                yield df
+        finally:
+            # Close the stream right away, rather than when it is collected, so its batches in flight are stopped.
+            await stream.aclose()
+
+
+async def _stream_coordinates(
+    frames: pd.DataFrame | AsyncIterable[pd.DataFrame],
+    geocoder: _StreamGeocoder,
+    max_concurrency: int,
+) -> AsyncGenerator[pd.DataFrame, None]:
+    """Geocodes the frames for iter_coordinates, yielding the rows of each batch as soon as it completes."""
+    pending: set[asyncio.Future[list[pd.DataFrame]]] = set()
+    skipped: list[tuple[pd.DataFrame, str]] = []
+    try:
+        async for df_zip_locals in _aiter_frames(frames):
+            addresses = _Addresses(df_zip_locals)
+            df_known, df_misses = geocoder.known(addresses)
+            if not df_known.empty:
+                yield df_known
+
+            for idx, chunk, payload in _iter_batches(df_misses, geocoder.sizer, lambda chunk, error: skipped.append((chunk, error))):
+                if len(pending) >= max_concurrency:
+                    # Wait for a slot, handing over every batch that has completed in the meantime.
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for df in _completed_results(done):
+                        yield df
+                pending.add(asyncio.ensure_future(geocoder.geocode(addresses, idx, chunk, payload)))
+
+            # The rows too large to be sent are yielded without coordinates, like the rows of a failed batch
+            for chunk, error in skipped:
+                yield geocoder.fail(addresses, chunk, error)
+            skipped.clear()
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for df in _completed_results(done):
+                yield df
+    finally:
+        # Stop the batches still in flight when the consumer stops early or a batch raised.
+        for future in pending:
+            future.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+class _StreamGeocoder:
+    """
+    Geocodes the batches of iter_coordinates, turning the results of each batch into the rows that share its addresses.
 
-    df_zip_locals = df_zip_locals[[constants.Columns.STREET, constants.Columns.CITY, constants.Columns.STATE, constants.Columns.ZIPCODE]]
+    Args:
+        session (requests.AsyncSession): The Session.
+        params (dict[str, str]): The benchmark and vintage query parameters.
+        sizer (_BatchSizer): Informed of the outcome and latency of every batch.
+        geocode_cache (cache.GeocodeCache | None): The optional cache of previous results.
+    """
+
+    def __init__(
+        self,
+        session: requests.AsyncSession,
+        params: dict[str, str],
+        sizer: _BatchSizer,
+        geocode_cache: cache.GeocodeCache | None,
+    ) -> None:
+        self.session = session
+        self.params = params
+        self.sizer = sizer
+        self.geocode_cache = geocode_cache
+
+    def known(self, addresses: _Addresses) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Looks up the addresses in the geocode cache.
+
+        Returns:
+            The rows whose address was found in the cache, with their coordinates, and the addresses that still need to be geocoded.
+        """
+        if self.geocode_cache is None:
+            return addresses.df_zip_locals.iloc[:0], addresses.df_addresses
+
+        df_cached = self.geocode_cache.get(addresses.df_addresses, self.params["benchmark"], self.params["vintage"])
+        return addresses.scatter(df_cached), addresses.df_addresses.drop(index=df_cached.index)
+
+    async def geocode(self, addresses: _Addresses, idx: int, chunk: pd.DataFrame, payload: bytes) -> list[pd.DataFrame]:
+        """
+        Submits the batch, bisecting it if it fails.
+
+        Returns:
+            The rows whose address was part of the batch, with their coordinates.
+        """
+        df_results: list[pd.DataFrame] = []
+
+        def _on_batch(sub_chunk: pd.DataFrame, df_geo: pd.DataFrame) -> None:
+            if self.geocode_cache is not None:
+                self.geocode_cache.put(sub_chunk.join(df_geo, how="inner"), self.params["benchmark"], self.params["vintage"])
+            df_results.append(addresses.scatter(df_geo))
+
+        def _on_failure(sub_chunk: pd.DataFrame, error: str) -> None:
+            df_results.append(self.fail(addresses, sub_chunk, error))
+
+        await _BatchRunner(self.session, self.params, self.sizer, _on_batch, _on_failure).run(idx, chunk, payload)
+        return df_results
+
+    def fail(self, addresses: _Addresses, chunk: pd.DataFrame, error: str) -> pd.DataFrame:
+        """
+        Reports the addresses of a batch that could not be geocoded.
+
+        Returns:
+            The rows whose address was part of the batch, without coordinates, with the BatchFailure in their attrs.
+        """
+        df_geo = pd.DataFrame({constants.Columns.LATITUDE: np.nan, constants.Columns.LONGITUDE: np.nan}, index=chunk.index)
+        df_failed = addresses.scatter(df_geo)
+        df_failed.attrs[FAILURES_ATTR] = [models.BatchFailure(addresses.rows(chunk.index), error)]
+        return df_failed
+
+
+async def _aiter_frames(frames: pd.DataFrame | AsyncIterable[pd.DataFrame]) -> AsyncIterator[pd.DataFrame]:
+    """Iterates over the non-empty DataFrames of the input."""
+    if isinstance(frames, pd.DataFrame):
+        if not frames.empty:
+            yield frames
+        return
+
+    async for df in frames:
+        if not df.empty:
+            yield df
+
+
+def _completed_results(done: set[asyncio.Future[list[pd.DataFrame]]]) -> Iterator[pd.DataFrame]:
+    """Iterates over the results of the completed batches, raising the error of any batch that raised."""
+    for future in done:
+        yield from future.result()
+
+
+def _get_known_coordinates(
+    df_addresses: pd.DataFrame,
+    benchmark: str,
+    vintage: str,
+    job_journal: journal.Journal | None,
+    geocode_cache: cache.GeocodeCache | None,
+) -> tuple[list[pd.DataFrame], pd.DataFrame]:
+    """
+    Collects the results that are already known from the journal of the job and then from the cache.
+
+    Returns:
+        The known results and the addresses that still need to be geocoded.
+    """
     df_coordinates_lst: list[pd.DataFrame] = []
-    async with requests.AsyncSession() as session:
-        for idx in range(0, len(df_zip_locals), batch_size):
-            chunk = df_zip_locals[idx : idx + batch_size]
-            with io.BytesIO() as f:
-                chunk.to_csv(f, header=False, encoding="utf-8")
-                f.seek(0)
-
-                assert len(chunk) < MAX_BATCH_RECORDS, f"{len(chunk)} >= {MAX_BATCH_RECORDS}"  # noqa: S101
-                assert f.getbuffer().nbytes < MAX_BATCH_BUFFER_SIZE, f"{f.getbuffer().nbytes} < {MAX_BATCH_BUFFER_SIZE}"  # noqa: S101
-                logger.debug("Sending request with csv file:\n%s", f.read().decode())
-
-                f.seek(0)
-
-                mp = curl_cffi.CurlMime()
-                mp.addpart(
-                    name="addressFile",  # form field name
-                    content_type="text/csv",  # mime type
-                    filename=f"upload-{idx}.csv",  # filename seen by remote server
-                    data=f.read(),  # file-like object or bytes
-                )
-
-                try:
-                    async with http.post_and_download_file(session, _CENSUS_BATCH_URL, params, mp) as downloaded_file:
-                        logger.debug("Response received:\n%s", downloaded_file.read_text())
-
-                        # Parse the downloaded file as a CSV:
-                        # Include only the Matches
-                        # Extract the Longitude and Latitude from the Coordinates column
-                        df_geo = pd.read_csv(
-                            downloaded_file,
-                            sep=",",
-                            names=_CENSUS_BATCH_COLUMNS,
-                            index_col=False,
-                        )
-
-                        df_geo = df_geo.set_index("ID")
-                        df_geo = df_geo.loc[df_geo["Match"] == "Match"]
-                        logger.debug("Retrieved coordinates for %d out of %d", len(df_geo), len(chunk))
-                        df_geo[constants.Columns.LONGITUDE] = df_geo["Coordinates"].apply(_extract_longitude)
-                        df_geo[constants.Columns.LATITUDE] = df_geo["Coordinates"].apply(_extract_latitude)
-                        df_geo = df_geo[[constants.Columns.LATITUDE, constants.Columns.LONGITUDE]]
-
-                        # Append the produced frame into the list
-                        df_coordinates_lst.append(df_geo[[constants.Columns.LATITUDE, constants.Columns.LONGITUDE]])
-                except requests.exceptions.RequestException:
-                    logger.exception("Failed to download coordinates.")
+    df_misses = df_addresses
+    if job_journal is not None:
+        df_completed = job_journal.load()
+        df_coordinates_lst.append(df_completed)
+        df_misses = df_misses.drop(index=df_completed.index)
 
-    if not df_coordinates_lst:
-        return _fill_empty_rules(df_zip_locals)
+    if geocode_cache is not None:
+        df_cached = geocode_cache.get(df_misses, benchmark, vintage)
+        logger.info("Found %d out of %d addresses in the geocode cache.", len(df_cached), len(df_misses))
+        df_coordinates_lst.append(df_cached)
+        df_misses = df_misses.drop(index=df_cached.index)
+
+    return df_coordinates_lst, df_misses
+
+
+async def _get_batches_coordinates(  # noqa: PLR0913
+    df_zip_locals: pd.DataFrame,
+    params: dict[str, str],
+    sizer: _BatchSizer,
+    max_concurrency: int,
+    on_batch: Callable[[pd.DataFrame, pd.DataFrame], None],
+    session: requests.AsyncSession | http.SessionPool | None = None,
+) -> tuple[list[pd.DataFrame], list[tuple[pd.DataFrame, str]]]:
+    """
+    Submits the addresses to the Census batch geocoder.
+
+    Args:
+        df_zip_locals (pd.DataFrame): The addresses to geocode.
+        params (dict[str, str]): The benchmark and vintage query parameters.
+        sizer (_BatchSizer): Provides the maximum number of records of each batch.
+        max_concurrency (int): The maximum number of batch requests in flight at once.
+        on_batch (Callable[[pd.DataFrame, pd.DataFrame], None]): Called with the addresses and the results of every completed batch.
+        session (requests.AsyncSession | http.SessionPool | None): The optional Session, or SessionPool, to send the requests on.
+
+    Returns:
+        The results of the completed batches and the addresses and error of every batch that failed.
+    """
+    logger.debug(
+        "Chunking %d rows into %s batch requests starting with %d rows each, %d at a time.",
+        len(df_zip_locals),
+        sizer.sizing,
+        sizer.size,
+        max_concurrency,
+    )
+
+    df_coordinates_lst: list[pd.DataFrame] = []
+    failures: list[tuple[pd.DataFrame, str]] = []
+
+    def _on_batch(chunk: pd.DataFrame, df_geo: pd.DataFrame) -> None:
+        on_batch(chunk, df_geo)
+        df_coordinates_lst.append(df_geo)
+
+    def _on_failure(chunk: pd.DataFrame, error: str) -> None:
+        failures.append((chunk, error))
+
+    batches = _iter_batches(df_zip_locals, sizer, _on_failure)
+
+    async def _worker(runner: _BatchRunner) -> None:
+        # Each worker pulls the next chunk from the shared generator as soon as its previous request completes,
+        # keeping at most `max_concurrency` requests in flight.
+        for idx, chunk, payload in batches:
+            await runner.run(idx, chunk, payload)
+
+    async with http.session_scope(session) as batch_session:
+        runner = _BatchRunner(batch_session, params, sizer, _on_batch, _on_failure)
+        await asyncio.gather(*(_worker(runner) for _ in range(max_concurrency)))
 
-    # Concatenate all the dataframes then join by index with the original frame:
-    df_coordinates = pd.concat(df_coordinates_lst)
-    logger.debug("Joining %d with %d", len(df_zip_locals), len(df_coordinates))
-    return df_zip_locals.join(df_coordinates)
+    return df_coordinates_lst, failures
@@ -5,10 +5,11 @@ from pathlib import Path
 from typing import TYPE_CHECKING, Final
 
 import asyncclick as click
+import pandas as pd
 
-from zipcode_coordinates_tz import census, constants, postal, timezone, utils
+from zipcode_coordinates_tz import cache, census, constants, http, postal, shortcuts, timezone, utils
 from zipcode_coordinates_tz.commands.common import cli
-from zipcode_coordinates_tz.models import FillMissing
+from zipcode_coordinates_tz.models import ExcelEngine, FillMissing
 
 if TYPE_CHECKING:
     import datetime
@@ -18,12 +19,58 @@ logger = logging.getLogger(__name__)
 DATE_TIME_FMT: Final[str] = "%Y-%m-%d"
 
 
+def _validate_zipcodes(ctx: click.Context, param: click.Parameter, value: tuple[str, ...]) -> tuple[str, ...]:
+    try:
+        for zipcode in value:
+            postal.parse_zipcode_filter(zipcode)
+    except ValueError as e:
+        raise click.BadParameter(str(e), ctx, param) from e
+    return value
+
+
+def _load_timezone_shortcuts(file: str | None) -> shortcuts.TimezoneShortcuts | None:
+    if file is None or not Path(file).exists():
+        return None
+    return shortcuts.TimezoneShortcuts.load(file)
+
+
+async def _geocode(df: pd.DataFrame, cache_file: str | None, checkpoint_dir: str | None) -> pd.DataFrame:
+    if cache_file is None:
+        return await census.get_coordinates(df, checkpoint_dir=checkpoint_dir)
+
+    with cache.SQLiteGeocodeCache(cache_file) as geocode_cache:
+        return await census.get_coordinates(df, geocode_cache=geocode_cache, checkpoint_dir=checkpoint_dir)
+
+
+async def _get_coordinates(
+    df: pd.DataFrame,
+    cache_file: str | None,
+    checkpoint_dir: str | None,
+    timezone_shortcuts: shortcuts.TimezoneShortcuts | None,
+) -> pd.DataFrame:
+    if timezone_shortcuts is None:
+        return await _geocode(df, cache_file, checkpoint_dir)
+
+    # The rows the shortcuts resolve do not need coordinates to get their timezone
+    resolved = timezone_shortcuts.lookup(df).notna()
+    logger.info("Timezone shortcuts resolve %d rows, geocoding the other %d rows.", resolved.sum(), len(df) - resolved.sum())
+    df_geocoded = await _geocode(df[~resolved], cache_file, checkpoint_dir)
+    return pd.concat([df_geocoded, df[resolved]]).reindex(df.index)
+
+
 @cli.command("save")
 @click.argument("file", type=click.Path(dir_okay=False, writable=True))
 @click.option("--date", type=click.DateTime([DATE_TIME_FMT]), default=constants.get_date_in_ny().strftime(DATE_TIME_FMT))
 @click.option("--city", type=str.casefold, multiple=True, default=None, help="Filter on City or Town")
 @click.option("--state", type=str.upper, multiple=True, default=None, help="Filter on State")
-@click.option("--zipcode", type=str, multiple=True, default=None, help="Filter on Zipcode")
+@click.option(
+    "--zipcode",
+    type=str,
+    multiple=True,
+    default=None,
+    callback=_validate_zipcodes,
+    help="Filter on Zipcode, a prefix such as 070 or a range of prefixes such as 070-089",
+)
 @click.option("--coordinates", type=bool, is_flag=True, help="Flag indicating whether to include coordinates")
 @click.option("--timezones", type=bool, is_flag=True, help="Flag indicating whether to include timezones")
 @click.option(
@@ -32,6 +79,74 @@ DATE_TIME_FMT: Final[str] = "%Y-%m-%d"
     is_flag=True,
     help="Flag indicating whether to fill in missing timezones with a value from their closest location.",
 )
+@click.option(
+    "--fill-nearest",
+    type=bool,
+    is_flag=True,
+    help="Flag indicating whether to fill in missing timezones with the timezone of the nearest geocoded location in the same "
+    "ZIP3, then State, rather than by --fill.",
+)
+@click.option(
+    "--cache",
+    "cache_file",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="SQLite file used to cache geocoding results between runs.",
+)
+@click.option(
+    "--checkpoint-dir",
+    type=click.Path(file_okay=False, writable=True),
+    default=None,
+    help="Directory in which completed geocoding batches are journaled, so that an interrupted run resumes where it stopped.",
+)
+@click.option(
+    "--timezone-grid",
+    type=bool,
+    is_flag=True,
+    help="Flag indicating whether to resolve timezones from a precomputed grid, built and cached on first use, falling back to "
+    "the exact lookup near timezone boundaries.",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of processes the timezones are looked up in.",
+)
+@click.option(
+    "--compact-timezones",
+    type=bool,
+    is_flag=True,
+    help="Flag indicating whether to hold the timezones as categorical IANA names rather than a timezone object per row, "
+    "which JSON output then writes as plain names.",
+)
+@click.option(
+    "--timezone-shortcuts",
+    "timezone_shortcuts_file",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="JSON index of the states and ZIP3 prefixes within a single timezone, whose rows are neither geocoded (unless "
+    "--coordinates) nor looked up. It is derived from the timezones of the first run without --state, --city and --zipcode filters.",
+)
+@click.option(
+    "--download-cache",
+    type=bool,
+    is_flag=True,
+    help="Flag indicating whether to keep the USPS file in a local cache, revalidated with a conditional GET on every run "
+    "rather than downloaded again.",
+)
+@click.option(
+    "--locales-cache",
+    type=bool,
+    is_flag=True,
+    help="Flag indicating whether to keep the parsed USPS locales of the month in a local cache (Parquet when pyarrow is "
+    "installed), so later runs of the month neither download nor parse the file.",
+)
+@click.option(
+    "--excel-engine",
+    type=click.Choice([str(engine) for engine in ExcelEngine], case_sensitive=False),
+    default=str(ExcelEngine.AUTO),
+    help="Reader of the USPS file, auto uses calamine when python-calamine is installed, else the default reader of pandas.",
+)
 async def save(  # noqa: PLR0913
     file: str,
     date: datetime.date | None,
@@ -41,28 +156,49 @@ async def save(  # noqa: PLR0913
     coordinates: bool,  # noqa: FBT001
     timezones: bool,  # noqa: FBT001
     fill: bool,  # noqa: FBT001
+    fill_nearest: bool,  # noqa: FBT001
+    cache_file: str | None,
+    checkpoint_dir: str | None,
+    timezone_grid: bool,  # noqa: FBT001
+    workers: int,
+    compact_timezones: bool,  # noqa: FBT001
+    timezone_shortcuts_file: str | None,
+    download_cache: bool,  # noqa: FBT001
+    locales_cache: bool,  # noqa: FBT001
+    excel_engine: str,
 ) -> None:
-    df_postal_locales = await postal.get_locales(date)
-    logger.info("Query for locales returned %d rows.", len(df_postal_locales))
-
-    if city:
-        df_postal_locales = df_postal_locales[df_postal_locales[constants.Columns.CITY].str.casefold().isin(city)]
-        logger.info("City filter set applied reduced to %d rows", len(df_postal_locales))
-
-    if state:
-        df_postal_locales = df_postal_locales[df_postal_locales[constants.Columns.STATE].isin(state)]
-        logger.info("State filter set applied reduced to %d rows", len(df_postal_locales))
-
-    if zipcode:
-        df_postal_locales = df_postal_locales[df_postal_locales[constants.Columns.ZIPCODE].isin(zipcode)]
-        logger.info("ZipCode filter set applied reduced to %d rows", len(df_postal_locales))
-
-    if coordinates or timezones:
-        # In order to include timezones, we need the coordinates
-        df_postal_locales = await census.get_coordinates(df_postal_locales)
+    # Share the connections of the USPS download and of every geocoding request
+    async with http.SessionPool():
+        df_postal_locales = await postal.get_locales(
+            date,
+            download_cache=cache.DownloadCache() if download_cache else None,
+            locales_cache=cache.LocalesCache() if locales_cache else None,
+            engine=ExcelEngine(excel_engine.lower()),
+            states=state,
+            cities=city,
+            zipcodes=zipcode,
+        )
+        logger.info("Query for locales returned %d rows.", len(df_postal_locales))
+
+        timezone_shortcuts = _load_timezone_shortcuts(timezone_shortcuts_file)
+        if coordinates or timezones:
+            # In order to include timezones, we need the coordinates
+            df_postal_locales = await _get_coordinates(df_postal_locales, cache_file, checkpoint_dir, None if coordinates else timezone_shortcuts)
 
     if timezones:
-        df_postal_locales = timezone.fill_timezones(df_postal_locales, fill_missing=FillMissing.ENABLED if fill else FillMissing.DISABLED)
+        fill_missing = FillMissing.ENABLED if fill else FillMissing.DISABLED
+        df_postal_locales = timezone.fill_timezones(
+            df_postal_locales,
+            fill_missing=FillMissing.NEAREST if fill_nearest else fill_missing,
+            timezone_grid=timezone.get_timezone_grid() if timezone_grid else None,
+            workers=workers,
+            compact=compact_timezones,
+            timezone_shortcuts=timezone_shortcuts,
+        )
+        # Only a run over the whole country sees every state and ZIP3 prefix the index is derived from
+        if timezone_shortcuts_file is not None and timezone_shortcuts is None and not state and not city and not zipcode:
+            shortcuts.TimezoneShortcuts.from_frame(df_postal_locales).save(timezone_shortcuts_file)
+            logger.info("Saved the timezone shortcuts to %s.", timezone_shortcuts_file)
 
         df_postal_locales_missing_tz = df_postal_locales[df_postal_locales[constants.Columns.TIMEZONE].isna()]
         if not df_postal_locales_missing_tz.empty:
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import datetime
 import os
+from pathlib import Path
 from typing import Final
 
 import pytz
@@ -12,6 +13,8 @@ MAX_RETRIES_TIME: Final[int] = 60
 
 BUFFER_LENGTH: Final[int] = 1024
 
+SPOOL_MAX_SIZE: Final[int] = 16 * 1024 * 1024  # 16MB
+
 DEFAULT_VINTAGE: Final[str] = "Current_Current"
 
 DEFAULT_TIMEZONE: Final[datetime.tzinfo] = pytz.timezone("America/New_York")
@@ -20,6 +23,12 @@ TRUTHY: Final[frozenset[str]] = frozenset(["true", "1"])
 
 TIMEZONE_FINDER_BIN_FILE_LOCATION: Final[str | None] = os.getenv("TIMEZONE_FINDER_BIN_FILE_LOCATION")
 TIMEZONE_FINDER_IN_MEMORY: Final[bool] = os.getenv("TIMEZONE_FINDER_IN_MEMORY", "").casefold() in TRUTHY
+TIMEZONE_FINDER_US_ONLY: Final[bool] = os.getenv("TIMEZONE_FINDER_US_ONLY", "").casefold() in TRUTHY
+
+CENSUS_GEOCODER_URL: Final[str] = os.getenv("ZIPCODE_COORDINATES_TZ_CENSUS_URL", "https://geocoding.geo.census.gov/geocoder").rstrip("/")
+USPS_URL: Final[str] = os.getenv("ZIPCODE_COORDINATES_TZ_USPS_URL", "https://postalpro.usps.com").rstrip("/")
+
+CACHE_DIR: Final[Path] = Path(os.getenv("ZIPCODE_COORDINATES_TZ_CACHE_DIR", Path.home() / ".cache" / "zipcode-coordinates-tz"))
 
 
 class Columns:
@@ -32,6 +41,10 @@ class Columns:
     LATITUDE: Final[str] = "Latitude"
     LONGITUDE: Final[str] = "Longitude"
     TIMEZONE: Final[str] = "TZ"
+    MATCH: Final[str] = "Match"
+    UTC_OFFSET: Final[str] = "UTCOffset"
+    DST: Final[str] = "DST"
+    LOCAL_TIME: Final[str] = "LocalTime"
 
 
 def get_date_in_ny() -> datetime.date:
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import importlib.metadata
+import json
+import logging
+import math
+import os
+import shutil
+from pathlib import Path
+from typing import TYPE_CHECKING, Final, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from zipcode_coordinates_tz import constants
+
+if TYPE_CHECKING:
+    import numpy.typing as npt
+    from timezonefinder import TimezoneFinder
+
+logger = logging.getLogger(__name__)
+
+
+BOUNDARY: Final[int] = -1
+DEFAULT_RESOLUTION: Final[float] = 0.05  # degrees, about 5.5km of latitude
+DEFAULT_SAMPLES: Final[int] = 3  # per side of a cell, so the corners, the middle of the edges and the center
+DEFAULT_GRID_DIR: Final[Path] = constants.CACHE_DIR / "timezone-grid"
+
+_CODES_FILE: Final[str] = "codes.npy"
+_META_FILE: Final[str] = "meta.json"
+
+
+class Bounds(NamedTuple):
+    """Represents a latitude and longitude bounding box.
+
+    Attributes:
+        south: The minimum latitude in decimal degrees.
+        west: The minimum longitude in decimal degrees.
+        north: The maximum latitude in decimal degrees.
+        east: The maximum longitude in decimal degrees.
+    """
+
+    south: float
+    west: float
+    north: float
+    east: float
+
+
+# The contiguous United States, Alaska, Hawaii and the territories fall outside and use the exact lookup.
+DEFAULT_BOUNDS: Final[Bounds] = Bounds(24.0, -125.0, 50.0, -66.0)
+
+
+def _timezone_names_at(latitudes: npt.NDArray[np.float64], longitudes: npt.NDArray[np.float64], timezone_finder: TimezoneFinder) -> list[str | None]:
+    names: list[str | None] = []
+    for latitude, longitude in zip(latitudes.tolist(), longitudes.tolist()):
+        name = None
+        with contextlib.suppress(ValueError):
+            name = timezone_finder.timezone_at(lat=latitude, lng=longitude)
+        names.append(name)
+    return names
+
+
+class TimezoneGrid:
+    """
+    A lookup table of the timezone of every cell of a regular latitude and longitude grid.
+
+    A cell holds the code of its timezone when every sample point of the cell (by default its corners, the middle of its
+    edges and its center) and of its eight neighbours lies in that timezone, and BOUNDARY otherwise. Requiring the
+    neighbours to agree keeps a boundary that wanders between the sample points of a cell from going unnoticed.
+    Coordinates in a BOUNDARY cell, or outside the bounds, have to be resolved with the exact polygon lookup.
+
+    Args:
+        codes (npt.NDArray[np.int16]): The code of each cell, rows from south to north and columns from west to east.
+        names (list[str]): The IANA timezone name of each code.
+        bounds (Bounds): The bounding box covered by the grid.
+        resolution (float): The size of a cell in degrees.
+    """
+
+    def __init__(self, codes: npt.NDArray[np.int16], names: list[str], bounds: Bounds, resolution: float) -> None:
+        self.codes = codes
+        self.names = names
+        self.bounds = bounds
+        self.resolution = resolution
+
+    @classmethod
+    def build(
+        cls,
+        timezone_finder: TimezoneFinder,
+        bounds: Bounds = DEFAULT_BOUNDS,
+        resolution: float = DEFAULT_RESOLUTION,
+        samples: int = DEFAULT_SAMPLES,
+    ) -> TimezoneGrid:
+        """
+        Builds the grid by sampling the TimezoneFinder.
+
+        The sample points are laid out on a lattice shared by neighbouring cells, so each point is only looked up once.
+
+        Args:
+            timezone_finder (TimezoneFinder): The TimezoneFinder instance to sample.
+            bounds (Bounds): The bounding box to cover (defaults to DEFAULT_BOUNDS).
+            resolution (float): The size of a cell in degrees (defaults to DEFAULT_RESOLUTION).
+            samples (int): The number of sample points along each side of a cell, at least 2 (defaults to DEFAULT_SAMPLES).
+
+        Returns:
+            The TimezoneGrid.
+        """
+        if samples < 2:  # noqa: PLR2004
+            msg = f"samples must be at least 2, got {samples}"
+            raise ValueError(msg)
+
+        rows = math.ceil((bounds.north - bounds.south) / resolution)
+        cols = math.ceil((bounds.east - bounds.west) / resolution)
+        step = samples - 1
+        lattice_latitudes = bounds.south + np.arange(rows * step + 1) * (resolution / step)
+        lattice_longitudes = bounds.west + np.arange(cols * step + 1) * (resolution / step)
+        latitudes, longitudes = np.meshgrid(lattice_latitudes, lattice_longitudes, indexing="ij")
+        logger.info("Building a %dx%d timezone grid from %d sample points.", rows, cols, latitudes.size)
+
+        lattice_names = _timezone_names_at(latitudes.ravel(), longitudes.ravel(), timezone_finder)
+        lattice_codes, names = pd.factorize(pd.Series(lattice_names, dtype=object), use_na_sentinel=True)
+        lattice = lattice_codes.reshape(latitudes.shape)
+
+        # A cell is uniform when each of its samples x samples points has the code of its south west corner:
+        first = lattice[0 : rows * step : step, 0 : cols * step : step]
+        uniform = first != BOUNDARY
+        for i in range(samples):
+            for j in range(samples):
+                uniform &= lattice[i : i + rows * step : step, j : j + cols * step : step] == first
+
+        codes = np.where(uniform, first, BOUNDARY).astype(np.int16)
+        # Then a cell is only kept when its neighbours all share its code, cells on the edge of the grid never are:
+        padded = np.pad(codes, 1, constant_values=BOUNDARY)
+        uniform = codes != BOUNDARY
+        for i in range(3):
+            for j in range(3):
+                uniform &= padded[i : i + rows, j : j + cols] == codes
+        codes[~uniform] = BOUNDARY
+        logger.info("%d out of %d cells lie within a single timezone.", uniform.sum(), uniform.size)
+        return cls(codes, [str(name) for name in names], bounds, resolution)
+
+    def save(self, directory: Path | str) -> None:
+        """
+        Persists the grid, the codes are written as a .npy file so that they can be memory-mapped by load.
+
+        Args:
+            directory (Path | str): The directory to write the grid to.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = directory / f"{_CODES_FILE}.tmp"
+        with tmp_path.open("wb") as f:
+            np.save(f, np.asarray(self.codes))
+        tmp_path.replace(directory / _CODES_FILE)
+        meta = {"names": self.names, "bounds": list(self.bounds), "resolution": self.resolution}
+        (directory / _META_FILE).write_text(json.dumps(meta), encoding="utf-8")
+
+    @classmethod
+    def load(cls, directory: Path | str) -> TimezoneGrid:
+        """
+        Loads a grid written by save, memory-mapping the codes.
+
+        Args:
+            directory (Path | str): The directory the grid was written to.
+
+        Returns:
+            The TimezoneGrid.
+        """
+        directory = Path(directory)
+        meta = json.loads((directory / _META_FILE).read_text(encoding="utf-8"))
+        codes = np.load(directory / _CODES_FILE, mmap_mode="r")
+        return cls(codes, meta["names"], Bounds(*meta["bounds"]), meta["resolution"])
+
+    @classmethod
+    def load_or_build(
+        cls,
+        timezone_finder: TimezoneFinder,
+        directory: Path | str | None = None,
+        bounds: Bounds = DEFAULT_BOUNDS,
+        resolution: float = DEFAULT_RESOLUTION,
+        samples: int = DEFAULT_SAMPLES,
+    ) -> TimezoneGrid:
+        """
+        Loads the grid for the parameters from the directory, building and saving it the first time.
+
+        Grids are stored in a sub-directory named after the parameters and the timezonefinder version, so a new version
+        of the timezone data produces a new grid.
+
+        Args:
+            timezone_finder (TimezoneFinder): The TimezoneFinder instance to sample when the grid is built.
+            directory (Path | str | None): The directory that holds the grids (defaults to DEFAULT_GRID_DIR).
+            bounds (Bounds): The bounding box to cover (defaults to DEFAULT_BOUNDS).
+            resolution (float): The size of a cell in degrees (defaults to DEFAULT_RESOLUTION).
+            samples (int): The number of sample points along each side of a cell (defaults to DEFAULT_SAMPLES).
+
+        Returns:
+            The TimezoneGrid.
+        """
+        key = json.dumps([importlib.metadata.version("timezonefinder"), list(bounds), resolution, samples])
+        grid_dir = Path(directory if directory is not None else DEFAULT_GRID_DIR) / hashlib.sha256(key.encode()).hexdigest()[:16]
+        if (grid_dir / _META_FILE).exists():
+            logger.debug("Loading the timezone grid from %s.", grid_dir)
+            return cls.load(grid_dir)
+
+        grid = cls.build(timezone_finder, bounds, resolution, samples)
+        # Write to a private directory first, so concurrent builds never observe a partial grid.
+        tmp_dir = grid_dir.with_name(f"{grid_dir.name}.{os.getpid()}.tmp")
+        grid.save(tmp_dir)
+        try:
+            tmp_dir.replace(grid_dir)
+        except OSError:
+            # Another process saved the same grid first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        logger.info("Saved the timezone grid to %s.", grid_dir)
+        return grid
+
+    def lookup(self, latitudes: npt.NDArray[np.float64], longitudes: npt.NDArray[np.float64]) -> npt.NDArray[np.int16]:
+        """
+        Looks up the timezone code of the cell of every coordinate pair.
+
+        Args:
+            latitudes (npt.NDArray[np.float64]): The latitudes, NaN when unknown.
+            longitudes (npt.NDArray[np.float64]): The longitudes, NaN when unknown.
+
+        Returns:
+            The code of each pair, or BOUNDARY when it is unknown, outside the bounds or in a cell that spans timezones.
+        """
+        rows = (latitudes - self.bounds.south) / self.resolution
+        cols = (longitudes - self.bounds.west) / self.resolution
+        # NaN fails every comparison, so unknown coordinates are never inside:
+        inside = (rows >= 0) & (rows < self.codes.shape[0]) & (cols >= 0) & (cols < self.codes.shape[1])
+        codes = np.full(len(latitudes), BOUNDARY, dtype=np.int16)
+        codes[inside] = self.codes[rows[inside].astype(np.intp), cols[inside].astype(np.intp)]
+        return codes
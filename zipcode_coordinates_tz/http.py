@@ -1,13 +1,17 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+import tempfile as sync_tempfile
 from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from http import HTTPStatus
 from pathlib import Path
-from typing import TYPE_CHECKING, Any, cast
+from typing import IO, TYPE_CHECKING, Any, Final, cast
 
 import curl_cffi
 from aiofiles import tempfile
-from curl_cffi import requests
+from curl_cffi import AsyncCurl, CurlHttpVersion, CurlMOpt, requests
 from tenacity import (
     retry,
     retry_if_exception,
@@ -16,24 +20,187 @@ from tenacity import (
     wait_exponential,
 )
 
-from zipcode_coordinates_tz import constants
+from zipcode_coordinates_tz import cache, constants
 
 if TYPE_CHECKING:
     from collections.abc import AsyncIterator
+    from types import TracebackType
+
+    from aiofiles.threadpool.binary import AsyncBufferedIOBase
+    from typing_extensions import Self
 
 logger = logging.getLogger(__name__)
 
 
+DEFAULT_MAX_CLIENTS: Final[int] = 16
+DEFAULT_MAX_HOST_CONNECTIONS: Final[int] = 8
+DEFAULT_HTTP_VERSION: Final[CurlHttpVersion] = CurlHttpVersion.V2TLS  # HTTP/2 when the server negotiates it, else HTTP/1.1
+
+
+class SessionPool:
+    """
+    A pool of keep-alive connections shared by every request of postal and census, instead of a Session per call.
+
+    The pool holds one Session per event loop, created on first use, whose connections (and their DNS lookups and TLS
+    handshakes) are reused by later requests to the same host. Entering the pool with async with makes it the default of
+    session_scope, so every call within the block that is not given a session shares it, until the block exits and the
+    connections are closed.
+
+    Args:
+        max_clients (int): The maximum number of requests in flight at once (defaults to DEFAULT_MAX_CLIENTS).
+        max_host_connections (int): The maximum number of connections open to a single host (defaults to
+            DEFAULT_MAX_HOST_CONNECTIONS), 0 for no limit.
+        http_version (CurlHttpVersion): The HTTP version to negotiate (defaults to DEFAULT_HTTP_VERSION).
+    """
+
+    def __init__(
+        self,
+        max_clients: int = DEFAULT_MAX_CLIENTS,
+        max_host_connections: int = DEFAULT_MAX_HOST_CONNECTIONS,
+        http_version: CurlHttpVersion = DEFAULT_HTTP_VERSION,
+    ) -> None:
+        if max_clients < 1:
+            msg = f"max_clients must be at least 1, got {max_clients}"
+            raise ValueError(msg)
+
+        self.max_clients = max_clients
+        self.max_host_connections = max_host_connections
+        self.http_version = http_version
+        self._sessions: dict[asyncio.AbstractEventLoop, tuple[AsyncCurl, requests.AsyncSession]] = {}
+        self._tokens: list[Any] = []
+
+    @property
+    def session(self) -> requests.AsyncSession:
+        """The Session of the running event loop."""
+        loop = asyncio.get_running_loop()
+        if loop not in self._sessions:
+            acurl = AsyncCurl(loop=loop)
+            acurl.setopt(CurlMOpt.MAX_HOST_CONNECTIONS, self.max_host_connections)
+            session: requests.AsyncSession = requests.AsyncSession(
+                loop=loop, async_curl=acurl, max_clients=self.max_clients, http_version=self.http_version
+            )
+            self._sessions[loop] = (acurl, session)
+            logger.debug("Opened a pooled session of %d clients.", self.max_clients)
+        return self._sessions[loop][1]
+
+    async def close(self) -> None:
+        """Closes the connections of the running event loop, the Sessions of closed event loops are discarded."""
+        loop = asyncio.get_running_loop()
+        sessions, self._sessions = self._sessions, {}
+        for session_loop, (acurl, session) in sessions.items():
+            if session_loop is loop:
+                await session.close()
+                await acurl.close()
+
+    async def __aenter__(self) -> Self:
+        self._tokens.append(_default_pool.set(self))
+        return self
+
+    async def __aexit__(self, exc_type: type[BaseException] | None, exc: BaseException | None, tb: TracebackType | None) -> None:
+        _default_pool.reset(self._tokens.pop())
+        await self.close()
+
+
+_default_pool: ContextVar[SessionPool | None] = ContextVar("_default_pool", default=None)
+
+
+def get_session_pool() -> SessionPool | None:
+    """Returns the SessionPool entered by the current context, if any."""
+    return _default_pool.get()
+
+
+@asynccontextmanager
+async def session_scope(session: requests.AsyncSession | SessionPool | None = None) -> AsyncIterator[requests.AsyncSession]:
+    """
+    Yields the Session to send requests on.
+
+    Args:
+        session (requests.AsyncSession | SessionPool | None): The Session, or the SessionPool whose Session, to use (defaults
+            to the SessionPool entered by the current context, else a new Session that is closed on exit).
+
+    Returns:
+        An Iterator that contains the Session.
+    """
+    if session is None:
+        session = get_session_pool()
+
+    if isinstance(session, SessionPool):
+        yield session.session
+    elif session is not None:
+        yield session
+    else:
+        async with requests.AsyncSession() as new_session:
+            yield new_session
+
+
 def _is_request_exception(e: BaseException) -> bool:
     """Returns True if the exception is a requests exception."""
     return isinstance(e, requests.exceptions.RequestException)
 
 
-@retry(
+_retry = retry(
     retry=retry_if_exception(_is_request_exception),
     wait=wait_exponential(),
     stop=stop_after_attempt(constants.MAX_RETRIES) | stop_after_delay(constants.MAX_RETRIES_TIME),
+    # Surface the error of the last attempt rather than a RetryError, so callers can handle the request exception.
+    reraise=True,
 )
+
+
+@_retry
+async def _get_json(session: requests.AsyncSession, url: str, params: dict[str, Any] | None) -> dict[str, Any]:
+    response = await session.get(url, params=params)
+    response.raise_for_status()
+    data: dict[str, Any] = response.json()
+    return data
+
+
+@_retry
+async def _get_to_file(session: requests.AsyncSession, url: str, f: AsyncBufferedIOBase) -> None:
+    # Start over on every attempt, discarding whatever a failed attempt had written:
+    await f.seek(0)
+    await f.truncate()
+    response = await session.get(url, stream=True)
+    response.raise_for_status()
+    async for chunk in response.aiter_content(chunk_size=constants.BUFFER_LENGTH):
+        await f.write(chunk)
+
+
+@_retry
+async def _get_to_file_if_modified(session: requests.AsyncSession, url: str, headers: dict[str, str], f: AsyncBufferedIOBase) -> requests.Response:
+    await f.seek(0)
+    await f.truncate()
+    response = await session.get(url, headers=headers, stream=True)
+    if response.status_code == HTTPStatus.NOT_MODIFIED:
+        await response.aclose()
+        return response
+
+    response.raise_for_status()
+    async for chunk in response.aiter_content():
+        await f.write(chunk)
+    return response
+
+
+@_retry
+async def _post_to_file(session: requests.AsyncSession, url: str, params: dict[str, Any], mp: curl_cffi.CurlMime, f: AsyncBufferedIOBase) -> None:
+    await f.seek(0)
+    await f.truncate()
+    response = await session.post(url, multipart=mp, params=params, stream=True)
+    response.raise_for_status()
+    async for chunk in response.aiter_content(chunk_size=constants.BUFFER_LENGTH):
+        await f.write(chunk)
+
+
+@_retry
+async def _post_to_spool(session: requests.AsyncSession, url: str, params: dict[str, Any], mp: curl_cffi.CurlMime, f: IO[bytes]) -> None:
+    f.seek(0)
+    f.truncate()
+    response = await session.post(url, multipart=mp, params=params, stream=True)
+    response.raise_for_status()
+    async for chunk in response.aiter_content():
+        f.write(chunk)
+
+
 @asynccontextmanager
 async def get_json(session: requests.AsyncSession, url: str, params: dict[str, Any] | None = None) -> AsyncIterator[dict[str, Any]]:
     """
@@ -47,17 +214,9 @@ async def get_json(session: requests.AsyncSession, url: str, params: dict[str, A
     Returns:
         An Iterator that contains the json payload.
     """
-    response = await session.get(url)
-    response.raise_for_status()
-    data: dict[str, Any] = await response.json()
-    yield data
+    yield await _get_json(session, url, params)
 
 
-@retry(
-    retry=retry_if_exception(_is_request_exception),
-    wait=wait_exponential(),
-    stop=stop_after_attempt(constants.MAX_RETRIES) | stop_after_delay(constants.MAX_RETRIES_TIME),
-)
 @asynccontextmanager
 async def get_and_download_file(session: requests.AsyncSession, url: str) -> AsyncIterator[Path]:
     """
@@ -73,16 +232,12 @@ async def get_and_download_file(session: requests.AsyncSession, url: str) -> Asy
     url_path = Path(url)
     logger.debug("Downloading %s", url)
     async with tempfile.NamedTemporaryFile(prefix=url_path.with_suffix("").name, suffix=url_path.suffix, delete=False) as f:
-        response = await session.get(url, stream=True)
-        response.raise_for_status()
         download_path = Path(cast("str", f.name))
         logger.debug("Saving %s to %s", url, download_path)
-        async for chunk in response.aiter_content(chunk_size=constants.BUFFER_LENGTH):
-            await f.write(chunk)
-
-        await f.flush()
-        await f.close()
         try:
+            await _get_to_file(session, url, f)
+            await f.flush()
+            await f.close()
             logger.debug("Downloaded %d bytes.", download_path.stat().st_size)
             yield download_path
         finally:
@@ -90,11 +245,58 @@ async def get_and_download_file(session: requests.AsyncSession, url: str) -> Asy
                 download_path.unlink()
 
 
-@retry(
-    retry=retry_if_exception(_is_request_exception),
-    wait=wait_exponential(),
-    stop=stop_after_attempt(constants.MAX_RETRIES) | stop_after_delay(constants.MAX_RETRIES_TIME),
-)
+@asynccontextmanager
+async def get_cached_file(session: requests.AsyncSession, url: str, download_cache: cache.DownloadCache) -> AsyncIterator[Path]:
+    """
+    Downloads a file from the specified url into the DownloadCache, unless the cached copy is still current.
+
+    A URL already in the cache is revalidated with a conditional GET (If-None-Match and If-Modified-Since), and only
+    downloaded again when the server does not answer 304 Not Modified. A 304 to a URL that is not cached is a miss, and
+    the file is requested once more with Cache-Control: no-cache.
+
+    Args:
+        session (requests.AsyncSession): The Session.
+        url (str): The url to the file to download.
+        download_cache (cache.DownloadCache): The cache to serve and store the file from.
+
+    Returns:
+        An Iterator that contains the Path to the cached file, which is kept after the context exits.
+    """
+    entry = download_cache.get(url)
+    headers = {}
+    if entry is not None and entry.etag is not None:
+        headers["If-None-Match"] = entry.etag
+    if entry is not None and entry.last_modified is not None:
+        headers["If-Modified-Since"] = entry.last_modified
+
+    url_path = Path(url)
+    logger.debug("Downloading %s %s", url, "conditionally" if headers else "unconditionally")
+    async with tempfile.NamedTemporaryFile(
+        prefix=url_path.with_suffix("").name, suffix=url_path.suffix, dir=download_cache.directory, delete=False
+    ) as f:
+        download_path = Path(cast("str", f.name))
+        try:
+            response = await _get_to_file_if_modified(session, url, headers, f)
+            if entry is None and response.status_code == HTTPStatus.NOT_MODIFIED:
+                # Nothing is cached that could be not modified, so the file is fetched again bypassing any cache on the way
+                logger.warning("%s answered 304 Not Modified without a cached copy, downloading it again.", url)
+                response = await _get_to_file_if_modified(session, url, {"Cache-Control": "no-cache"}, f)
+                if response.status_code == HTTPStatus.NOT_MODIFIED:
+                    msg = f"{url} answered 304 Not Modified to an unconditional request"
+                    raise requests.exceptions.HTTPError(msg, response=response)
+            await f.close()
+            if entry is not None and response.status_code == HTTPStatus.NOT_MODIFIED:
+                logger.debug("%s is not modified, using %s.", url, entry.path)
+            else:
+                logger.debug("Downloaded %d bytes.", download_path.stat().st_size)
+                entry = download_cache.put(url, download_path, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        finally:
+            if download_path.exists():
+                download_path.unlink()
+
+    yield entry.path
+
+
 @asynccontextmanager
 async def post_and_download_file(
     session: requests.AsyncSession,
@@ -117,18 +319,43 @@ async def post_and_download_file(
     url_path = Path(url)
     logger.debug("Downloading %s", url)
     async with tempfile.NamedTemporaryFile(prefix=url_path.with_suffix("").name, suffix=url_path.suffix, delete=False) as f:
-        response = await session.post(url, multipart=mp, params=params, stream=True)
-        response.raise_for_status()
         download_path = Path(cast("str", f.name))
         logger.debug("Saving %s to %s", url, download_path)
-        async for chunk in response.aiter_content(chunk_size=constants.BUFFER_LENGTH):
-            await f.write(chunk)
-
-        await f.flush()
-        await f.close()
         try:
+            await _post_to_file(session, url, params, mp, f)
+            await f.flush()
+            await f.close()
             logger.debug("Downloaded %d bytes.", download_path.stat().st_size)
             yield download_path
         finally:
             if download_path.exists():
                 download_path.unlink()
+
+
+@asynccontextmanager
+async def post_and_spool(
+    session: requests.AsyncSession,
+    url: str,
+    params: dict[str, Any],
+    mp: curl_cffi.CurlMime,
+    max_size: int = constants.SPOOL_MAX_SIZE,
+) -> AsyncIterator[IO[bytes]]:
+    """
+    POSTs a multipart form and buffers the response body in memory, spilling to a temporary file only when it exceeds max_size.
+
+    Args:
+        session (requests.AsyncSession): The Session.
+        url (str): The URL to POST to.
+        params (dict[str, Any]): Query parameters to include in the request.
+        mp (curl_cffi.CurlMime): The multipart form data to send.
+        max_size (int): The number of bytes to hold in memory before spilling to disk (defaults to constants.SPOOL_MAX_SIZE).
+
+    Returns:
+        An Iterator that contains the binary file object positioned at the start of the response body.
+    """
+    logger.debug("Downloading %s", url)
+    with sync_tempfile.SpooledTemporaryFile(max_size=max_size, prefix=Path(url).name) as f:
+        await _post_to_spool(session, url, params, mp, cast("IO[bytes]", f))
+        logger.debug("Downloaded %d bytes.", f.tell())
+        f.seek(0)
+        yield cast("IO[bytes]", f)
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import Final
+
+import pandas as pd
+
+from zipcode_coordinates_tz import constants
+
+logger = logging.getLogger(__name__)
+
+
+_ID_COLUMN: Final[str] = "ID"
+_BATCH_GLOB: Final[str] = "batch-*.csv"
+_RESULT_COLUMNS: Final[list[str]] = [constants.Columns.MATCH, constants.Columns.LATITUDE, constants.Columns.LONGITUDE]
+
+
+def job_id(df_addresses: pd.DataFrame, benchmark: str, vintage: str) -> str:
+    """
+    Computes a stable identifier for geocoding the addresses with the benchmark and vintage.
+
+    Args:
+        df_addresses (pd.DataFrame): The distinct addresses of the job, the index is part of the identity.
+        benchmark (str): The benchmark value.
+        vintage (str): The vintage value.
+
+    Returns:
+        A hex digest that changes whenever the addresses, their order, the benchmark or the vintage change.
+    """
+    digest = hashlib.sha256(f"{benchmark}\0{vintage}\0".encode())
+    digest.update(pd.util.hash_pandas_object(df_addresses, index=True).to_numpy().tobytes())
+    return digest.hexdigest()[:32]
+
+
+class Journal:
+    """
+    A durable record of the batches completed by a census.get_coordinates job.
+
+    The results of every completed batch are written to their own file within a directory named after the job, so that a
+    job interrupted part way through can be restarted and only submit the batches that were not yet completed.
+
+    Args:
+        directory (Path | str): The directory that holds the journal files of this job.
+    """
+
+    def __init__(self, directory: Path | str) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def for_job(cls, checkpoint_dir: Path | str, df_addresses: pd.DataFrame, benchmark: str, vintage: str) -> Journal:
+        """
+        Opens the journal of the job within the checkpoint directory, resuming it if it already exists.
+
+        Args:
+            checkpoint_dir (Path | str): The directory that holds the journals of all jobs.
+            df_addresses (pd.DataFrame): The distinct addresses of the job.
+            benchmark (str): The benchmark value.
+            vintage (str): The vintage value.
+
+        Returns:
+            The Journal.
+        """
+        return cls(Path(checkpoint_dir) / job_id(df_addresses, benchmark, vintage))
+
+    def load(self) -> pd.DataFrame:
+        """
+        Reads the results of the batches completed so far.
+
+        Returns:
+            A DataFrame with the Match, Latitude and Longitude columns indexed by the address ID.
+        """
+        files = sorted(self.directory.glob(_BATCH_GLOB))
+        if not files:
+            return pd.DataFrame(columns=_RESULT_COLUMNS).astype({constants.Columns.LATITUDE: "float64", constants.Columns.LONGITUDE: "float64"})
+
+        df_results = pd.concat([pd.read_csv(f, index_col=_ID_COLUMN, dtype={constants.Columns.MATCH: str}) for f in files])
+        logger.info("Resuming from %d completed batches with %d results in %s.", len(files), len(df_results), self.directory)
+        return df_results
+
+    def write(self, idx: int, df_results: pd.DataFrame) -> None:
+        """
+        Durably records the results of a completed batch.
+
+        The file is written under a temporary name and renamed once flushed, so a crash never leaves a partial batch behind.
+
+        Args:
+            idx (int): The first address ID of the batch, which names the file.
+            df_results (pd.DataFrame): A DataFrame with the Match, Latitude and Longitude columns indexed by the address ID.
+        """
+        path = self.directory / f"batch-{idx:010d}.csv"
+        tmp_path = path.with_suffix(".tmp")
+        with tmp_path.open("w", encoding="utf-8", newline="") as f:
+            df_results[_RESULT_COLUMNS].rename_axis(_ID_COLUMN).to_csv(f)
+            f.flush()
+            os.fsync(f.fileno())
+        tmp_path.replace(path)
+
+    def complete(self) -> None:
+        """Removes the journal once every batch of the job has been completed."""
+        shutil.rmtree(self.directory, ignore_errors=True)
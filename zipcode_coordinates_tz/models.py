@@ -1,3 +1,4 @@
+from collections.abc import Hashable
 from enum import Enum, IntEnum
 from typing import NamedTuple
 
@@ -14,6 +15,34 @@ class Coordinate(NamedTuple):
     longitude: float
 
 
+class Address(NamedTuple):
+    """Represents a postal address to geocode.
+
+    Attributes:
+        street: The street address.
+        city: The city.
+        state: The two-letter state abbreviation.
+        zip_code: The zip code.
+    """
+
+    street: str
+    city: str
+    state: str
+    zip_code: str
+
+
+class BatchFailure(NamedTuple):
+    """Represents a batch of addresses that could not be geocoded.
+
+    Attributes:
+        rows: The index labels of the input rows whose address was part of the batch.
+        error: The error that caused the batch to fail.
+    """
+
+    rows: tuple[Hashable, ...]
+    error: str
+
+
 class Benchmark(str, Enum):
     """Census geocoding benchmark identifiers.
 
@@ -34,6 +63,23 @@ class Benchmark(str, Enum):
         return self.value
 
 
+class MatchStatus(str, Enum):
+    """Census batch geocoding match statuses.
+
+    Members:
+        MATCH: The address was matched to a location.
+        NO_MATCH: The address could not be matched.
+        TIE: The address matched more than one location.
+    """
+
+    MATCH = "Match"
+    NO_MATCH = "No_Match"
+    TIE = "Tie"
+
+    def __str__(self) -> str:
+        return self.value
+
+
 class FillMissing(IntEnum):
     """Controls whether missing timezones are filled from neighboring records.
 
@@ -41,10 +87,46 @@ class FillMissing(IntEnum):
         DISABLED: Do not fill missing timezones.
         ENABLED: Fill missing timezones using the closest geographic match
             (ZipCode, City+State, then State).
+        NEAREST: Fill missing timezones with the timezone of the nearest geocoded
+            location within the same ZIP3, then State.
     """
 
     DISABLED = 0
     ENABLED = 1
+    NEAREST = 2
+
+    def __str__(self) -> str:
+        return str(self.name)
+
+
+class BatchSizing(IntEnum):
+    """Controls how many records are placed in each Census batch request.
+
+    Members:
+        FIXED: Every batch holds up to the requested batch size.
+        ADAPTIVE: The batch size grows while batches complete within the target latency, and shrinks when they are
+            slower or fail.
+    """
+
+    FIXED = 0
+    ADAPTIVE = 1
 
     def __str__(self) -> str:
         return str(self.name)
+
+
+class ExcelEngine(str, Enum):
+    """The readers of the USPS spreadsheet.
+
+    Members:
+        AUTO: CALAMINE when python-calamine is installed (with pandas 2.2 or later), else PANDAS.
+        CALAMINE: The Rust calamine reader of python-calamine, for both .xls and .xlsx files.
+        PANDAS: The default reader of pandas for the file, xlrd for .xls and openpyxl for .xlsx files.
+    """
+
+    AUTO = "auto"
+    CALAMINE = "calamine"
+    PANDAS = "pandas"
+
+    def __str__(self) -> str:
+        return self.value
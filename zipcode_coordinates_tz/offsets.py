@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import datetime
+import logging
+from functools import cache
+from typing import TYPE_CHECKING, Final
+
+import numpy as np
+import pandas as pd
+import pytz
+
+from zipcode_coordinates_tz import constants
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    import numpy.typing as npt
+
+    # A single instant, or one per row
+    Instants = datetime.datetime | np.datetime64 | Sequence[datetime.datetime | None] | npt.NDArray[np.datetime64] | pd.Index | pd.Series
+
+logger = logging.getLogger(__name__)
+
+
+_NANOSECONDS: Final[int] = 10**9
+_NAT: Final[int] = np.iinfo(np.int64).min  # NaT as epoch nanoseconds
+
+
+class _Transitions:
+    """The UTC offset and DST flag a timezone has from each of its transitions on."""
+
+    def __init__(self, times: npt.NDArray[np.int64], offsets: npt.NDArray[np.int32], dst: npt.NDArray[np.bool_]) -> None:
+        self.times = times
+        self.offsets = offsets
+        self.dst = dst
+
+    def indices(self, seconds: npt.NDArray[np.int64]) -> npt.NDArray[np.intp]:
+        """Returns the index of the transition in effect at each of the UTC epoch seconds."""
+        return np.maximum(np.searchsorted(self.times, seconds, side="right") - 1, 0)
+
+
+@cache
+def _get_transitions(name: str) -> _Transitions:
+    """Reads the transition table of the timezone from pytz, once per name."""
+    tz = pytz.timezone(name)
+    transition_times = getattr(tz, "_utc_transition_times", None)
+    if not transition_times:
+        # A timezone without transitions (ie: UTC or Etc/GMT+5) always has the same offset
+        offset = tz.utcoffset(None)
+        return _Transitions(
+            np.array([_NAT], dtype=np.int64),
+            np.array([0 if offset is None else offset.total_seconds()], dtype=np.int32),
+            np.zeros(1, dtype=bool),
+        )
+
+    transition_info = tz._transition_info  # type: ignore[union-attr]  # noqa: SLF001
+    return _Transitions(
+        np.array(transition_times, dtype="datetime64[s]").astype(np.int64),
+        np.array([utcoffset.total_seconds() for utcoffset, _, _ in transition_info], dtype=np.int32),
+        np.array([bool(dst) for _, dst, _ in transition_info], dtype=bool),
+    )
+
+
+def _to_utc_nanoseconds(instants: Instants | None, length: int) -> npt.NDArray[np.int64]:
+    """Converts the instants to UTC epoch nanoseconds, a 0-dimensional array for a single instant, naive instants are taken as UTC."""
+    if instants is None:
+        instants = pd.Timestamp.now(tz="UTC")
+
+    if isinstance(instants, (datetime.datetime, np.datetime64)):
+        timestamp = pd.Timestamp(instants)
+        timestamp = timestamp.tz_localize("UTC") if timestamp.tzinfo is None else timestamp.tz_convert("UTC")
+        return np.array(timestamp.value, dtype=np.int64)
+
+    nanoseconds = pd.DatetimeIndex(pd.to_datetime(pd.Series(instants), utc=True)).tz_convert(None).to_numpy(dtype="datetime64[ns]").view(np.int64)
+    if len(nanoseconds) != length:
+        msg = f"instants must be a single instant or have one instant per row, got {len(nanoseconds)} for {length} rows"
+        raise ValueError(msg)
+    return nanoseconds
+
+
+def get_utc_offsets(timezones: pd.Series, instants: Instants | None = None) -> pd.DataFrame:
+    """
+    Computes the UTC offset, DST flag and local wall-clock time of every row at an instant.
+
+    Rows are grouped by timezone, and the transition table of each timezone is only read once, from which the offset in
+    effect is found with a binary search: once per timezone for a single instant, or once per row for an instant per row.
+    pytz only tabulates transitions up to 2037, later instants keep the offset of the last transition.
+
+    Args:
+        timezones (pd.Series): The timezones, such as the TZ column of timezone.fill_timezones, as datetime.tzinfo objects or
+            IANA timezone names, categorical or not.
+        instants (Instants | None): A single instant, or one instant per row, naive instants are
+            taken as UTC (defaults to now).
+
+    Returns:
+        A DataFrame with the index of timezones and the shape of
+            #   Column      Non-Null Count  Dtype
+            ---  ------      --------------  -----
+            0   UTCOffset   0 non-null      int32 (seconds, 0 without a timezone or instant)
+            1   DST         0 non-null      bool (False without a timezone or instant)
+            2   LocalTime   0 non-null      datetime64[ns] (NaT without a timezone or instant)
+    """
+    nanoseconds = _to_utc_nanoseconds(instants, len(timezones))
+    seconds = nanoseconds // _NANOSECONDS
+    codes, uniques = pd.factorize(timezones, use_na_sentinel=True)
+    transitions = [_get_transitions(str(tz)) for tz in uniques]
+    logger.debug("Computing the UTC offsets of %d rows in %d timezones.", len(timezones), len(transitions))
+
+    if np.ndim(nanoseconds) == 0:
+        # The trailing 0 and False are what a code of -1 indexes.
+        indices = [transition.indices(seconds) for transition in transitions]
+        zone_offsets = np.array([*(t.offsets[i] for t, i in zip(transitions, indices)), 0], dtype=np.int32)
+        zone_dst = np.array([*(t.dst[i] for t, i in zip(transitions, indices)), False], dtype=bool)
+        offsets = zone_offsets[codes]
+        dst = zone_dst[codes]
+    else:
+        offsets = np.zeros(len(codes), dtype=np.int32)
+        dst = np.zeros(len(codes), dtype=bool)
+        rows = np.flatnonzero(codes >= 0)
+        rows = rows[np.argsort(codes[rows], kind="stable")]
+        groups, starts = np.unique(codes[rows], return_index=True)
+        for group, group_rows in zip(groups.tolist(), np.split(rows, starts[1:])):
+            transition = transitions[group]
+            group_indices = transition.indices(seconds[group_rows])
+            offsets[group_rows] = transition.offsets[group_indices]
+            dst[group_rows] = transition.dst[group_indices]
+
+    missing = (codes < 0) | (nanoseconds == _NAT)
+    offsets[missing] = 0
+    dst[missing] = False
+    local_times = nanoseconds + offsets.astype(np.int64) * _NANOSECONDS
+    local_times[missing] = _NAT
+    return pd.DataFrame(
+        {
+            constants.Columns.UTC_OFFSET: offsets,
+            constants.Columns.DST: dst,
+            constants.Columns.LOCAL_TIME: local_times.view("datetime64[ns]"),
+        },
+        index=timezones.index,
+    )
+
+
+def fill_utc_offsets(df: pd.DataFrame, instants: Instants | None = None) -> pd.DataFrame:
+    """
+    Fills in the UTC offset, DST flag and local wall-clock time of every row of a DataFrame with a TZ column.
+
+    Args:
+        df (pd.DataFrame): A DataFrame with the TZ column, such as the result of timezone.fill_timezones.
+        instants (Instants | None): A single instant, or one instant per row, naive instants are
+            taken as UTC (defaults to now).
+
+    Returns:
+        The DataFrame with the UTCOffset, DST and LocalTime columns of get_utc_offsets.
+    """
+    df_offsets = get_utc_offsets(df[constants.Columns.TIMEZONE], instants)
+    for column in df_offsets.columns:
+        df[column] = df_offsets[column].to_numpy()
+    return df
@@ -1,15 +1,23 @@
 from __future__ import annotations
 
+import importlib.util
 import logging
-from typing import TYPE_CHECKING, Final
+from typing import TYPE_CHECKING, Final, Literal
 
+import numpy as np
 import pandas as pd
-from curl_cffi import requests
 
-from zipcode_coordinates_tz import constants, http
+from zipcode_coordinates_tz import constants, http, models
 
 if TYPE_CHECKING:
     import datetime
+    from collections.abc import Collection
+    from pathlib import Path
+
+    import numpy.typing as npt
+    from curl_cffi import requests
+
+    from zipcode_coordinates_tz import cache
 
 logger = logging.getLogger(__name__)
 
@@ -28,18 +36,158 @@ _DTYPES: Final[dict[str, type]] = {
 }
 _TAKE_COLUMNS: Final[list[str]] = [constants.Columns.STREET, constants.Columns.CITY, constants.Columns.STATE, constants.Columns.ZIPCODE]
 _SHEET_NAME: Final[str] = "ZIP_DETAIL"
-_URL_FMT: Final[str] = "https://postalpro.usps.com/mnt/glusterfs/{YEAR:04}-{MONTH:02}/ZIP_Locale_Detail.xls"
+_URL_FMT: Final[str] = constants.USPS_URL + "/mnt/glusterfs/{YEAR:04}-{MONTH:02}/ZIP_Locale_Detail.xls"
+_ZIPCODE_LENGTH: Final[int] = 5
+_CALAMINE_PANDAS_VERSION: Final[tuple[int, int]] = (2, 2)  # The first version of pandas with the calamine engine
+
+
+def _has_calamine() -> bool:
+    pandas_version = tuple(int(part) for part in pd.__version__.split(".")[:2])
+    return pandas_version >= _CALAMINE_PANDAS_VERSION and importlib.util.find_spec("python_calamine") is not None
+
+
+def _get_pandas_engine(engine: models.ExcelEngine) -> Literal["calamine"] | None:
+    """Returns the name of the pandas.read_excel engine of the reader, None for the default of pandas."""
+    if engine == models.ExcelEngine.AUTO:
+        engine = models.ExcelEngine.CALAMINE if _has_calamine() else models.ExcelEngine.PANDAS
+    return "calamine" if engine == models.ExcelEngine.CALAMINE else None
+
+
+def read_locales(file: Path | str, engine: models.ExcelEngine = models.ExcelEngine.AUTO) -> pd.DataFrame:
+    """
+    Parses the ZIP_DETAIL sheet of a USPS ZIP_Locale_Detail spreadsheet, only reading the columns that are kept.
+
+    Args:
+        file (Path | str): The .xls (or .xlsx) file.
+        engine (models.ExcelEngine): The reader of the file (defaults to calamine when python-calamine is installed, else
+            the default reader of pandas).
+
+    Returns:
+        A DataFrame with the shape of get_locales.
+    """
+    pandas_engine = _get_pandas_engine(engine)
+    logger.debug("Reading the USPS locales with the %s engine.", pandas_engine or "default")
+    df_zip_locale = pd.read_excel(file, sheet_name=_SHEET_NAME, usecols=list(_DTYPES), dtype=_DTYPES, engine=pandas_engine)
+    return df_zip_locale.rename(columns=_RENAME_COLUMNS)[_TAKE_COLUMNS]
+
+
+def parse_zipcode_filter(zipcode: str) -> tuple[str, str]:
+    """
+    Parses a zipcode filter of filter_locales.
+
+    Args:
+        zipcode (str): A zip code, a prefix of one or a range of prefixes of the same length such as 070-089.
+
+    Returns:
+        The lowest and highest prefix the filter matches.
+
+    Raises:
+        ValueError: If the filter is none of those (ie: a ZIP+4 code such as 07001-1234).
+
+    >>> parse_zipcode_filter("070-089")
+    ('070', '089')
+    """
+    low, _, high = zipcode.strip().partition("-")
+    high = high or low
+    if not (low.isdigit() and high.isdigit() and len(low) == len(high) <= _ZIPCODE_LENGTH and low <= high):
+        msg = f"zipcode must be a zip code, a prefix of one or a range of prefixes of the same length such as 070-089, got {zipcode!r}"
+        raise ValueError(msg)
+    return low, high
+
+
+def _match_zipcodes(zipcodes: pd.Series, zipcode_filters: Collection[str]) -> npt.NDArray[np.bool_]:
+    exact: dict[int, set[str]] = {}
+    ranges: list[tuple[str, str]] = []
+    for low, high in map(parse_zipcode_filter, zipcode_filters):
+        if low == high:
+            exact.setdefault(len(low), set()).add(low)
+        else:
+            ranges.append((low, high))
+
+    prefixes: dict[int, pd.Series] = {}
+    matches = np.zeros(len(zipcodes), dtype=bool)
+    for length, values in exact.items():
+        prefixes[length] = zipcodes.str[:length]
+        matches |= prefixes[length].isin(values).to_numpy(dtype=bool)
+    for low, high in ranges:
+        if len(low) not in prefixes:
+            prefixes[len(low)] = zipcodes.str[: len(low)]
+        prefix = prefixes[len(low)]
+        matches |= ((prefix >= low) & (prefix <= high)).to_numpy(dtype=bool, na_value=False)
+    return matches
+
+
+def filter_locales(
+    df: pd.DataFrame,
+    states: Collection[str] | None = None,
+    cities: Collection[str] | None = None,
+    zipcodes: Collection[str] | None = None,
+) -> pd.DataFrame:
+    """
+    Keeps the rows of the locales that match every filter.
 
+    Each filter is only evaluated over the rows the previous ones kept, states then zip codes then cities, and the rows are
+    taken from the DataFrame once at the end, which is returned as is without any filter.
 
-async def get_locales(date: datetime.date | None = None) -> pd.DataFrame:
+    Args:
+        df (pd.DataFrame): The DataFrame of get_locales.
+        states (Collection[str] | None): The states to keep, in any case (defaults to every state).
+        cities (Collection[str] | None): The cities to keep, in any case (defaults to every city).
+        zipcodes (Collection[str] | None): The zip codes to keep, each a zip code such as 07001, a prefix such as 070 or
+            a range of prefixes of the same length such as 070-089 (defaults to every zip code).
+
+    Returns:
+        The DataFrame of the matching rows, with their index labels.
+    """
+    if not states and not cities and not zipcodes:
+        return df
+
+    positions = np.arange(len(df))
+    if states:
+        positions = positions[df[constants.Columns.STATE].isin({state.upper() for state in states}).to_numpy(dtype=bool)]
+    if zipcodes:
+        positions = positions[_match_zipcodes(df[constants.Columns.ZIPCODE].iloc[positions].astype("string"), zipcodes)]
+    if cities:
+        # Only the distinct cities of the remaining rows are case folded
+        codes, uniques = pd.factorize(df[constants.Columns.CITY].iloc[positions])
+        kept = pd.Index(uniques).astype("string").str.casefold().isin({city.casefold() for city in cities})
+        positions = positions[np.append(kept, False)[codes]]  # a code of -1, a missing city, indexes the False
+
+    logger.debug("Filters kept %d out of %d rows.", len(positions), len(df))
+    return df.take(positions)
+
+
+async def get_locales(  # noqa: PLR0913
+    date: datetime.date | None = None,
+    session: requests.AsyncSession | http.SessionPool | None = None,
+    download_cache: cache.DownloadCache | None = None,
+    locales_cache: cache.LocalesCache | None = None,
+    engine: models.ExcelEngine = models.ExcelEngine.AUTO,
+    states: Collection[str] | None = None,
+    cities: Collection[str] | None = None,
+    zipcodes: Collection[str] | None = None,
+) -> pd.DataFrame:
     """
     Queries US Postoffice for a DataFrame containing zip code to address, city and state.
 
     Args:
         date (datetime.date | None): The date (defaults to today)
+        session (requests.AsyncSession | http.SessionPool | None): The optional Session, or SessionPool, to download the file
+            with (defaults to the SessionPool entered by the caller, else a new Session for this call).
+        download_cache (cache.DownloadCache | None): The optional cache the file is kept in, it is then only downloaded
+            again when the copy of the cache is no longer current (defaults to downloading it on every call).
+        locales_cache (cache.LocalesCache | None): The optional cache of the parsed DataFrame, which is returned without any
+            request when it holds the DataFrame of the month.
+        engine (models.ExcelEngine): The reader of the file (defaults to calamine when python-calamine is installed, else
+            the default reader of pandas).
+        states (Collection[str] | None): The states to keep, which a Parquet locales_cache only reads (defaults to every
+            state).
+        cities (Collection[str] | None): The cities to keep, in any case (defaults to every city).
+        zipcodes (Collection[str] | None): The zip codes, prefixes such as 070 or prefix ranges such as 070-089 to keep
+            (defaults to every zip code).
 
     Returns:
-        A DataFrame with the shape of
+        A DataFrame of the rows that match every filter (see filter_locales) with the shape of
             #   Column   Non-Null Count  Dtype
             ---  ------   --------------  -----
             0   Street   0 non-null      object
@@ -49,9 +197,23 @@ async def get_locales(date: datetime.date | None = None) -> pd.DataFrame:
     """
     if date is None:
         date = constants.get_date_in_ny()
+    # Reject a malformed zip code before anything is downloaded
+    for zipcode in zipcodes or ():
+        parse_zipcode_filter(zipcode)
+    states = sorted({state.upper() for state in states}) if states else None
     url = _URL_FMT.format(YEAR=date.year, MONTH=date.month)
-    async with requests.AsyncSession() as session, http.get_and_download_file(session, url) as f:
-        df_zip_locale = pd.read_excel(f, sheet_name=_SHEET_NAME, dtype=_DTYPES)
-        return df_zip_locale.rename(
-            columns=_RENAME_COLUMNS,
-        )[_TAKE_COLUMNS]
+    df_cached = locales_cache.get(url, states) if locales_cache is not None else None
+    if df_cached is not None:
+        return filter_locales(df_cached, states, cities, zipcodes)
+
+    async with http.session_scope(session) as download_session:
+        if download_cache is None:
+            download = http.get_and_download_file(download_session, url)
+        else:
+            download = http.get_cached_file(download_session, url, download_cache)
+        async with download as f:
+            df_zip_locale = read_locales(f, engine)
+
+    if locales_cache is not None:
+        locales_cache.put(url, df_zip_locale)
+    return filter_locales(df_zip_locale, states, cities, zipcodes)
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import importlib.metadata
+import io
+import json
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import TYPE_CHECKING, Final
+
+import numpy as np
+from timezonefinder import TimezoneFinder
+
+from zipcode_coordinates_tz import constants
+from zipcode_coordinates_tz.grid import Bounds
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_REGIONAL_DIR: Final[Path] = constants.CACHE_DIR / "timezone-regional"
+
+# The United States and its territories, every other coordinate falls back to the full dataset.
+US_REGIONS: Final[list[Bounds]] = [
+    Bounds(24.0, -125.0, 50.0, -66.0),  # The contiguous United States
+    Bounds(51.0, -180.0, 72.0, -129.0),  # Alaska
+    Bounds(51.0, 172.0, 54.0, 180.0),  # The Aleutian Islands west of the antimeridian
+    Bounds(18.5, -161.0, 22.5, -154.5),  # Hawaii
+    Bounds(17.5, -68.0, 18.7, -64.5),  # Puerto Rico and the U.S. Virgin Islands
+    Bounds(13.0, 144.5, 21.0, 146.5),  # Guam and the Northern Mariana Islands
+    Bounds(-14.6, -171.2, -11.0, -168.1),  # American Samoa
+]
+
+
+def _in_regions(latitudes: np.ndarray, longitudes: np.ndarray, regions: Sequence[Bounds]) -> np.ndarray:
+    inside = np.zeros(len(latitudes), dtype=bool)
+    for region in regions:
+        inside |= (latitudes >= region.south) & (latitudes <= region.north) & (longitudes >= region.west) & (longitudes <= region.east)
+    return inside
+
+
+def _link_or_copy(source: Path, target: Path) -> None:
+    try:
+        target.symlink_to(source, target_is_directory=source.is_dir())
+    except OSError:
+        # ie: Windows without the privilege to create symbolic links
+        if source.is_dir():
+            shutil.copytree(source, target)
+        else:
+            shutil.copy2(source, target)
+
+
+def build_dataset(timezone_finder: TimezoneFinder, directory: Path | str, regions: Sequence[Bounds] = US_REGIONS) -> Path:
+    """
+    Writes a timezonefinder dataset whose shortcut index only covers the regions.
+
+    Reading the shortcut index of the whole world is what makes a TimezoneFinder slow to open, so the dataset keeps the
+    shortcuts of the cells centered within the regions and links to the polygon files of the timezone_finder, of which
+    only the pages of the polygons of the regions are ever read. Coordinates in the kept cells resolve exactly as with
+    the full dataset, while the TimezoneFinder of the dataset finds no timezone for any other coordinate.
+
+    Args:
+        timezone_finder (TimezoneFinder): The TimezoneFinder of the full dataset.
+        directory (Path | str): The directory to write the dataset to, it must not exist.
+        regions (Sequence[Bounds]): The regions to keep (defaults to US_REGIONS).
+
+    Returns:
+        The directory of the dataset.
+    """
+    # h3 is not a dependency of this package but of timezonefinder, and it is only needed to build a dataset
+    import h3.api.basic_int as h3  # type: ignore[import-untyped]  # noqa: PLC0415
+
+    # Only timezonefinder 8 and later expose a writer for the shortcut index, so an older version raises ImportError here
+    from timezonefinder.flatbuf.io.hybrid_shortcuts import get_hybrid_shortcut_file_path, write_hybrid_shortcuts_flatbuffers  # noqa: PLC0415
+
+    directory = Path(directory)
+    source = Path(timezone_finder.data_location)
+    shortcut_file = get_hybrid_shortcut_file_path(timezone_finder.zone_ids.dtype, directory)
+
+    hex_ids = list(timezone_finder.shortcut_mapping)
+    centers = np.array([h3.cell_to_latlng(hex_id) for hex_id in hex_ids], dtype=np.float64).reshape(-1, 2)
+    inside = _in_regions(centers[:, 0], centers[:, 1], regions)
+    mapping = {
+        hex_id: value if isinstance(value, int) else [int(boundary_id) for boundary_id in value]
+        for hex_id, value, keep in zip(hex_ids, timezone_finder.shortcut_mapping.values(), inside.tolist())
+        if keep
+    }
+    logger.info("Keeping %d out of %d timezone shortcuts.", len(mapping), len(hex_ids))
+
+    directory.mkdir(parents=True)
+    for path in source.iterdir():
+        if path.name != shortcut_file.name:
+            _link_or_copy(path.resolve(), directory / path.name)
+    # The writer reports its progress on stdout
+    with contextlib.redirect_stdout(io.StringIO()):
+        write_hybrid_shortcuts_flatbuffers(mapping, timezone_finder.zone_ids.dtype, shortcut_file)
+    return directory
+
+
+class RegionalTimezoneFinder(TimezoneFinder):
+    """
+    A TimezoneFinder over a dataset written by build_dataset, which falls back to the full dataset outside of its regions.
+
+    Args:
+        bin_file_location (Path | str): The directory of the regional dataset.
+        fallback (Callable[[], TimezoneFinder]): Creates the TimezoneFinder of the full dataset, it is only called the first
+            time a coordinate outside of the regions is looked up.
+        in_memory (bool): Whether to read the polygon data into memory rather than memory-mapping it.
+    """
+
+    def __init__(self, bin_file_location: Path | str, fallback: Callable[[], TimezoneFinder], in_memory: bool = False) -> None:  # noqa: FBT001, FBT002
+        super().__init__(bin_file_location=bin_file_location, in_memory=in_memory)
+        self.fallback = fallback
+        self._fallback_finder: TimezoneFinder | None = None
+
+    def _get_fallback(self) -> TimezoneFinder:
+        if self._fallback_finder is None:
+            logger.debug("Loading the full timezone dataset for a coordinate outside of the regions.")
+            self._fallback_finder = self.fallback()
+        return self._fallback_finder
+
+    def timezone_at(self, *, lng: float, lat: float) -> str | None:
+        """
+        Finds the timezone of the coordinate.
+
+        Args:
+            lng (float): The longitude in decimal degrees.
+            lat (float): The latitude in decimal degrees.
+
+        Returns:
+            The IANA timezone name, or None.
+        """
+        zone = super().timezone_at(lng=lng, lat=lat)
+        if zone is None:
+            return self._get_fallback().timezone_at(lng=lng, lat=lat)
+        return zone
+
+    @classmethod
+    def load_or_build(
+        cls,
+        bin_file_location: Path | str | None = None,
+        directory: Path | str | None = None,
+        regions: Sequence[Bounds] = US_REGIONS,
+        in_memory: bool = False,  # noqa: FBT001, FBT002
+    ) -> RegionalTimezoneFinder:
+        """
+        Opens the regional dataset for the regions from the directory, building it the first time.
+
+        Datasets are stored in a sub-directory named after the regions, the timezonefinder version and the location of the
+        full dataset, so a new version of the timezone data produces a new dataset. The full dataset is only opened to
+        build the regional one, or later on to look up a coordinate outside of the regions.
+
+        Args:
+            bin_file_location (Path | str | None): The directory of the full dataset (defaults to the one of timezonefinder).
+            directory (Path | str | None): The directory that holds the regional datasets (defaults to DEFAULT_REGIONAL_DIR).
+            regions (Sequence[Bounds]): The regions to keep (defaults to US_REGIONS).
+            in_memory (bool): Whether to read the polygon data into memory rather than memory-mapping it.
+
+        Returns:
+            The RegionalTimezoneFinder.
+        """
+        key = json.dumps([importlib.metadata.version("timezonefinder"), str(bin_file_location), [list(region) for region in regions]])
+        dataset_dir = Path(directory if directory is not None else DEFAULT_REGIONAL_DIR) / hashlib.sha256(key.encode()).hexdigest()[:16]
+
+        def open_full_dataset() -> TimezoneFinder:
+            return TimezoneFinder(bin_file_location=bin_file_location, in_memory=in_memory)
+
+        if dataset_dir.exists():
+            logger.debug("Loading the regional timezone dataset from %s.", dataset_dir)
+            return cls(dataset_dir, open_full_dataset, in_memory)
+
+        timezone_finder = open_full_dataset()
+        # Build in a private directory first, so concurrent builds never observe a partial dataset.
+        tmp_dir = dataset_dir.with_name(f"{dataset_dir.name}.{os.getpid()}.tmp")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        build_dataset(timezone_finder, tmp_dir, regions)
+        try:
+            tmp_dir.replace(dataset_dir)
+        except OSError:
+            # Another process saved the same dataset first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        logger.info("Saved the regional timezone dataset to %s.", dataset_dir)
+        return cls(dataset_dir, lambda: timezone_finder, in_memory)
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import json
+import logging
+from pathlib import Path
+
+import pandas as pd
+
+from zipcode_coordinates_tz import constants
+
+logger = logging.getLogger(__name__)
+
+
+def _single_timezones(timezones: pd.Series, keys: pd.Series) -> dict[str, str]:
+    """Returns the timezone of each key whose rows all have the same timezone, a key with any missing timezone is left out."""
+    grouped = timezones.groupby(keys.to_numpy(), dropna=True)
+    counts = grouped.nunique(dropna=False)
+    firsts = grouped.first()
+    return {str(key): str(firsts[key]) for key in counts.index[counts == 1] if pd.notna(firsts[key])}
+
+
+class TimezoneShortcuts:
+    """
+    An index of the states and ZIP3 prefixes (the first three digits of a zip code) that lie within a single timezone.
+
+    Rows of such a state or prefix get their timezone without being geocoded or looked up, only the rows of the states
+    that span several timezones, and of the prefixes of those that are not known to be within one, need coordinates.
+
+    Args:
+        zip3s (dict[str, str]): The IANA timezone name of each ZIP3 prefix within a single timezone.
+        states (dict[str, str] | None): The IANA timezone name of each state within a single timezone (defaults to none).
+    """
+
+    def __init__(self, zip3s: dict[str, str], states: dict[str, str] | None = None) -> None:
+        self.zip3s = zip3s
+        self.states = states if states is not None else {}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> TimezoneShortcuts:
+        """
+        Derives the states and ZIP3 prefixes within a single timezone from the timezones of a DataFrame, such as the result
+        of timezone.fill_timezones over the whole country.
+
+        A state is only kept when every row of it has the same timezone, so every ZIP3 prefix of it agrees, and the
+        prefixes of the other states are kept when every row of the prefix has the same timezone.
+
+        Args:
+            df (pd.DataFrame): A DataFrame with the ZipCode, State and TZ columns.
+
+        Returns:
+            The TimezoneShortcuts.
+        """
+        timezones = df[constants.Columns.TIMEZONE].map(str, na_action="ignore").astype(object)
+        states = _single_timezones(timezones, df[constants.Columns.STATE])
+        multi = ~df[constants.Columns.STATE].isin(states.keys()).to_numpy(dtype=bool)
+        zip3s = _single_timezones(timezones[multi], df.loc[multi, constants.Columns.ZIPCODE].astype("string").str[:3])
+        logger.info("%d states and %d ZIP3 prefixes of the other states lie within a single timezone.", len(states), len(zip3s))
+        return cls(zip3s, states)
+
+    def save(self, file: Path | str) -> None:
+        """
+        Persists the index as JSON.
+
+        Args:
+            file (Path | str): The file to write the index to.
+        """
+        file = Path(file)
+        file.parent.mkdir(parents=True, exist_ok=True)
+        file.write_text(json.dumps({"states": self.states, "zip3s": self.zip3s}, indent=2, sort_keys=True), encoding="utf-8")
+
+    @classmethod
+    def load(cls, file: Path | str) -> TimezoneShortcuts:
+        """
+        Loads an index written by save.
+
+        Args:
+            file (Path | str): The file the index was written to.
+
+        Returns:
+            The TimezoneShortcuts.
+        """
+        data = json.loads(Path(file).read_text(encoding="utf-8"))
+        return cls(data["zip3s"], data["states"])
+
+    def lookup(self, df: pd.DataFrame) -> pd.Series:
+        """
+        Looks up the timezone of every row by its State, then by the ZIP3 prefix of its ZipCode.
+
+        Args:
+            df (pd.DataFrame): A DataFrame with the ZipCode and State columns.
+
+        Returns:
+            An object Series of the IANA timezone name of each row, missing when it is not known to be within a single timezone.
+        """
+        names = df[constants.Columns.STATE].map(self.states).astype(object)
+        missing = names.isna()
+        if missing.any() and self.zip3s:
+            names[missing] = df.loc[missing, constants.Columns.ZIPCODE].astype("string").str[:3].map(self.zip3s).astype(object)
+        return names
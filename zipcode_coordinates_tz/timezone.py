@@ -2,46 +2,371 @@ from __future__ import annotations
 
 import contextlib
 import logging
+from concurrent.futures import ProcessPoolExecutor
 from functools import cache
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Final
 
+import numpy as np
 import pandas as pd
 import pytz
 from timezonefinder import TimezoneFinder
 
-from zipcode_coordinates_tz import constants
+from zipcode_coordinates_tz import constants, grid, regional, shortcuts
 from zipcode_coordinates_tz.models import FillMissing
 
 if TYPE_CHECKING:
-    import datetime
+    from collections.abc import Sequence
+    from pathlib import Path
+
+    import numpy.typing as npt
 
 
 logger = logging.getLogger(__name__)
 
 
+MIN_PARALLEL_COORDINATES: Final[int] = 10000
+PARALLEL_CHUNKS_PER_WORKER: Final[int] = 4
+# The keys rows are grouped by to fill in missing timezones, from the closest match to the broadest
+FILL_MISSING_KEYS: Final[list[list[str]]] = [
+    [constants.Columns.ZIPCODE, constants.Columns.CITY, constants.Columns.STATE],
+    [constants.Columns.CITY, constants.Columns.STATE],
+    [constants.Columns.STATE],
+]
+# The most pairwise distances computed at once by the nearest fill
+NEAREST_CHUNK_SIZE: Final[int] = 1 << 22
+
+
+def _open_timezone_finder(in_memory: bool) -> TimezoneFinder:  # noqa: FBT001
+    if constants.TIMEZONE_FINDER_US_ONLY:
+        try:
+            return regional.RegionalTimezoneFinder.load_or_build(constants.TIMEZONE_FINDER_BIN_FILE_LOCATION, in_memory=in_memory)
+        except ImportError:
+            logger.warning("This version of timezonefinder cannot build a regional dataset, using the full dataset.")
+
+    return TimezoneFinder(bin_file_location=constants.TIMEZONE_FINDER_BIN_FILE_LOCATION, in_memory=in_memory)
+
+
 @cache
 def _get_cached_timezone_finder() -> TimezoneFinder:
-    return TimezoneFinder(bin_file_location=constants.TIMEZONE_FINDER_BIN_FILE_LOCATION, in_memory=constants.TIMEZONE_FINDER_IN_MEMORY)
+    return _open_timezone_finder(constants.TIMEZONE_FINDER_IN_MEMORY)
+
+
+def get_timezone_grid(directory: Path | str | None = None) -> grid.TimezoneGrid:
+    """
+    Loads the default TimezoneGrid, building it from the TimezoneFinder and saving it the first time.
+
+    Args:
+        directory (Path | str | None): The directory that holds the grids (defaults to grid.DEFAULT_GRID_DIR).
+
+    Returns:
+        The TimezoneGrid.
+    """
+    return grid.TimezoneGrid.load_or_build(_get_cached_timezone_finder(), directory)
+
+
+@cache
+def _get_worker_timezone_finder() -> TimezoneFinder:
+    # Worker processes memory-map the timezone data so its pages are shared between them rather than copied into each.
+    return _open_timezone_finder(in_memory=False)
+
+
+def _get_timezone_names(coordinates: npt.NDArray[np.float64], timezone_finder: TimezoneFinder | None = None) -> list[str | None]:
+    """
+    Looks up the IANA timezone name of each latitude and longitude row of the coordinates.
+
+    Args:
+        coordinates (npt.NDArray[np.float64]): An array of shape (n, 2) of the latitudes and longitudes.
+        timezone_finder (TimezoneFinder | None): The TimezoneFinder instance to use (defaults to the one of the worker process).
+
+    Returns:
+        The timezone name, or None, of each row.
+    """
+    if timezone_finder is None:
+        timezone_finder = _get_worker_timezone_finder()
+
+    names: list[str | None] = []
+    for latitude, longitude in coordinates.tolist():
+        name = None
+        with contextlib.suppress(ValueError):
+            name = timezone_finder.timezone_at(lat=latitude, lng=longitude)
+        names.append(name)
+    return names
+
+
+def _get_timezone_names_parallel(coordinates: npt.NDArray[np.float64], workers: int) -> list[str | None]:
+    """Looks up the timezone names of the coordinates across a pool of worker processes, preserving their order."""
+    chunks = np.array_split(coordinates, workers * PARALLEL_CHUNKS_PER_WORKER)
+    logger.debug("Looking up %d coordinates in %d chunks across %d processes.", len(coordinates), len(chunks), workers)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return [name for names in executor.map(_get_timezone_names, chunks) for name in names]
+
+
+def _get_timezone_codes(
+    latitudes: npt.NDArray[np.float64],
+    longitudes: npt.NDArray[np.float64],
+    timezone_finder: TimezoneFinder,
+    timezone_grid: grid.TimezoneGrid | None = None,
+    workers: int = 1,
+) -> tuple[npt.NDArray[np.int16], list[str]]:
+    """
+    Looks up the timezone of every coordinate pair, querying the TimezoneFinder once per distinct pair.
+
+    Args:
+        latitudes (npt.NDArray[np.float64]): The latitudes, NaN when unknown.
+        longitudes (npt.NDArray[np.float64]): The longitudes, NaN when unknown.
+        timezone_finder (TimezoneFinder): The TimezoneFinder instance to use.
+        timezone_grid (grid.TimezoneGrid | None): The optional grid that answers the pairs in cells within a single timezone,
+            only the remaining pairs are looked up with the TimezoneFinder.
+        workers (int): The number of processes the distinct pairs are looked up in.
+
+    Returns:
+        The code of each pair into the list of IANA timezone names, or -1 when it has no timezone, and that list.
+    """
+    codes = np.full(len(latitudes), -1, dtype=np.int16)
+    names: list[str] = []
+    known = ~(np.isnan(latitudes) | np.isnan(longitudes))
+    if timezone_grid is not None:
+        grid_codes = timezone_grid.lookup(latitudes, longitudes)
+        gridded = grid_codes != grid.BOUNDARY
+        codes[gridded] = grid_codes[gridded]
+        names.extend(timezone_grid.names)
+        known &= ~gridded
+        logger.debug("Resolved %d coordinates from the timezone grid.", gridded.sum())
+
+    if not known.any():
+        return codes, names
+
+    # Many rows share the same coordinates (ie: every address of a building or a zip code centroid),
+    # so only look up the distinct pairs and scatter the results back with their inverse index.
+    unique_coordinates, inverse = np.unique(np.column_stack((latitudes[known], longitudes[known])), axis=0, return_inverse=True)
+    if workers > 1 and len(unique_coordinates) >= MIN_PARALLEL_COORDINATES:
+        unique_names = _get_timezone_names_parallel(unique_coordinates, workers)
+    else:
+        unique_names = _get_timezone_names(unique_coordinates, timezone_finder)
+    logger.debug("Looked up %d distinct coordinates out of %d.", len(unique_coordinates), known.sum())
+
+    name_codes = {name: code for code, name in enumerate(names)}
+    unique_codes = np.array([-1 if name is None else name_codes.setdefault(name, len(name_codes)) for name in unique_names], dtype=np.int16)
+    codes[known] = unique_codes[inverse.reshape(-1)]
+    return codes, list(name_codes)
+
+
+def _get_shortcut_timezone_codes(  # noqa: PLR0913
+    latitudes: npt.NDArray[np.float64],
+    longitudes: npt.NDArray[np.float64],
+    shortcut_names: npt.NDArray[np.object_],
+    timezone_finder: TimezoneFinder,
+    timezone_grid: grid.TimezoneGrid | None = None,
+    workers: int = 1,
+) -> tuple[npt.NDArray[np.int16], list[str]]:
+    """Like _get_timezone_codes, but the rows with a shortcut name get it rather than being looked up."""
+    shortcut = pd.notna(shortcut_names)
+    logger.debug("Resolved %d rows from the timezone shortcuts.", shortcut.sum())
+    codes, names = _get_timezone_codes(
+        np.where(shortcut, np.nan, latitudes),
+        np.where(shortcut, np.nan, longitudes),
+        timezone_finder,
+        timezone_grid,
+        workers,
+    )
+    name_codes = {name: code for code, name in enumerate(names)}
+    codes[shortcut] = [name_codes.setdefault(name, len(name_codes)) for name in shortcut_names[shortcut].tolist()]
+    return codes, list(name_codes)
+
+
+def lookup_many(
+    latitudes: npt.ArrayLike,
+    longitudes: npt.ArrayLike,
+    timezone_finder: TimezoneFinder | None = None,
+    timezone_grid: grid.TimezoneGrid | None = None,
+    workers: int = 1,
+) -> tuple[npt.NDArray[np.int16], list[str]]:
+    """
+    Looks up the timezone of every coordinate pair of two arrays, without a DataFrame.
+
+    Each distinct pair is only looked up once and no object is created per pair, so a name is found with names[code].
+
+    Args:
+        latitudes (npt.ArrayLike): The latitudes in decimal degrees, NaN when unknown.
+        longitudes (npt.ArrayLike): The longitudes in decimal degrees, NaN when unknown.
+        timezone_finder (TimezoneFinder | None): The optional TimezoneFinder instance to use.
+        timezone_grid (grid.TimezoneGrid | None): The optional precomputed grid that answers the coordinates far from any
+            timezone boundary without a polygon lookup.
+        workers (int): The number of processes the coordinates are looked up in (defaults to 1, in this process).
+
+    Returns:
+        The int16 code of each pair into the list of IANA timezone names, or -1 when it has no timezone, and that list.
+    """
+    if workers < 1:
+        msg = f"workers must be at least 1, got {workers}"
+        raise ValueError(msg)
+
+    latitudes = np.asarray(latitudes, dtype=np.float64)
+    longitudes = np.asarray(longitudes, dtype=np.float64)
+    if latitudes.ndim != 1 or latitudes.shape != longitudes.shape:
+        msg = f"latitudes and longitudes must be 1-dimensional arrays of the same length, got {latitudes.shape} and {longitudes.shape}"
+        raise ValueError(msg)
+
+    if timezone_finder is None:
+        timezone_finder = _get_cached_timezone_finder()
+
+    return _get_timezone_codes(latitudes, longitudes, timezone_finder, timezone_grid, workers)
+
+
+def _to_tzinfos(codes: npt.NDArray[np.integer], names: Sequence[str]) -> npt.NDArray[np.object_]:
+    """Materializes one tzinfo per name and broadcasts them to the codes, -1 becomes None."""
+    # The trailing None is what a code of -1 indexes.
+    tzinfos = np.empty(len(names) + 1, dtype=object)
+    tzinfos[:-1] = [pytz.timezone(name) for name in names]
+    return tzinfos[codes]
+
+
+def to_tzinfo(timezones: pd.Series) -> pd.Series:
+    """
+    Converts a column of IANA timezone names, such as the compact TZ column of fill_timezones, to datetime.tzinfo objects.
+
+    Only one tzinfo is created per distinct name.
+
+    Args:
+        timezones (pd.Series): The timezone names, categorical or not, missing values are kept as None.
+
+    Returns:
+        An object Series of the datetime.tzinfo, or None, of each row.
+    """
+    categorical = timezones if isinstance(timezones.dtype, pd.CategoricalDtype) else timezones.astype("category")
+    return pd.Series(
+        _to_tzinfos(categorical.cat.codes.to_numpy(), [str(name) for name in categorical.cat.categories]),
+        index=timezones.index,
+        name=timezones.name,
+        dtype=object,
+    )
+
+
+def _fill_missing_timezones(df: pd.DataFrame) -> pd.Series:
+    """
+    Fills every missing timezone from the rows that share its keys, trying each of FILL_MISSING_KEYS in turn.
+
+    Within a group a missing row takes the timezone of the closest row above it that has one, or else of the closest row
+    below it. Only the original timezones are ever copied, a broader level never propagates what a closer one filled in,
+    and each level only groups the rows of the groups that still have a missing row.
+
+    Args:
+        df (pd.DataFrame): The DataFrame with the key columns and the TZ column.
+
+    Returns:
+        The filled TZ column.
+    """
+    timezones = df[constants.Columns.TIMEZONE]
+    filled = timezones.copy()
+    missing = timezones.isna().to_numpy()
+    for keys in FILL_MISSING_KEYS:
+        if not missing.any():
+            break
+
+        # Rows with a missing key get a NaN group, which isin never matches, so they are never filled at this level
+        group_ids = df.groupby(keys, sort=False).ngroup().to_numpy()
+        candidates = np.isin(group_ids, group_ids[missing])
+        grouped = timezones[candidates].groupby(group_ids[candidates], sort=False)
+        level = grouped.ffill().fillna(grouped.bfill()).to_numpy()
+        targets = missing & candidates
+        filled.iloc[np.flatnonzero(targets)] = level[targets[candidates]]
+        missing = filled.isna().to_numpy()
+
+    return filled
 
 
-def _get_timezone(latitude: float | None, longitude: float | None, timezone_finder: TimezoneFinder) -> datetime.tzinfo | None:
-    if pd.isna(latitude) or pd.isna(longitude):
-        return None
+def _group_rows(group_ids: npt.NDArray[np.intp], mask: npt.NDArray[np.bool_]) -> dict[int, npt.NDArray[np.intp]]:
+    """Returns the positions of the masked rows of each group, rows without a group (-1) are left out."""
+    rows = np.flatnonzero(mask & (group_ids >= 0))
+    rows = rows[np.argsort(group_ids[rows], kind="stable")]
+    groups, starts = np.unique(group_ids[rows], return_index=True)
+    return dict(zip(groups.tolist(), np.split(rows, starts[1:])))
 
-    assert latitude is not None  # noqa: S101
-    assert longitude is not None  # noqa: S101
-    with contextlib.suppress(ValueError):
-        zone = timezone_finder.timezone_at(lat=latitude, lng=longitude)
-        if zone is not None:
-            return pytz.timezone(zone)
 
-    return None
+def _nearest_codes(
+    targets: npt.NDArray[np.float64],
+    anchors: npt.NDArray[np.float64],
+    anchor_codes: npt.NDArray[np.int16],
+) -> npt.NDArray[np.int16]:
+    """Returns the code of the nearest anchor of each target, both arrays of shape (n, 2) of latitudes and longitudes."""
+    # An equirectangular projection is precise enough to rank the neighbours of a point
+    scales = np.cos(np.radians(targets[:, 0]))
+    codes = np.empty(len(targets), dtype=np.int16)
+    step = max(1, NEAREST_CHUNK_SIZE // len(anchors))
+    for start in range(0, len(targets), step):
+        chunk = slice(start, start + step)
+        latitude_deltas = targets[chunk, 0, None] - anchors[None, :, 0]
+        longitude_deltas = (targets[chunk, 1, None] - anchors[None, :, 1]) * scales[chunk, None]
+        codes[chunk] = anchor_codes[np.argmin(latitude_deltas**2 + longitude_deltas**2, axis=1)]
+    return codes
 
 
-def fill_timezones(
+def _fill_nearest_codes(
+    df: pd.DataFrame,
+    latitudes: npt.NDArray[np.float64],
+    longitudes: npt.NDArray[np.float64],
+    codes: npt.NDArray[np.int16],
+) -> npt.NDArray[np.int16]:
+    """
+    Fills every missing timezone code with the code of the nearest row that has one, within the same ZIP3, then State.
+
+    Rows without coordinates are placed at the centroid of the rows with a timezone of their ZipCode, else of their ZIP3,
+    else of their State, so the result does not depend on the order of the rows.
+
+    Args:
+        df (pd.DataFrame): The DataFrame with the ZipCode and State columns.
+        latitudes (npt.NDArray[np.float64]): The latitudes, NaN when unknown.
+        longitudes (npt.NDArray[np.float64]): The longitudes, NaN when unknown.
+        codes (npt.NDArray[np.int16]): The timezone code of each row, -1 when missing.
+
+    Returns:
+        The filled codes.
+    """
+    codes = codes.copy()
+    positions = np.column_stack((latitudes, longitudes))
+    # Rows resolved without coordinates (ie: by TimezoneShortcuts) cannot be anchors
+    anchored = (codes >= 0) & ~np.isnan(positions).any(axis=1)
+    if not anchored.any() or (codes >= 0).all():
+        return codes
+
+    zip_codes = df[constants.Columns.ZIPCODE].astype("string")
+    group_ids = [
+        pd.factorize(zip_codes)[0],
+        pd.factorize(zip_codes.str[:3])[0],
+        pd.factorize(df[constants.Columns.STATE])[0],
+    ]
+    for ids in group_ids:
+        unplaced = ~anchored & np.isnan(positions).any(axis=1) & (ids >= 0)
+        if not unplaced.any():
+            continue
+
+        members = anchored & (ids >= 0)
+        counts = np.bincount(ids[members], minlength=ids.max() + 1)
+        sums = np.column_stack([np.bincount(ids[members], weights=positions[members, axis], minlength=len(counts)) for axis in (0, 1)])
+        placed = unplaced & (counts[ids] > 0)
+        positions[placed] = sums[ids[placed]] / counts[ids[placed], None]
+
+    for ids in group_ids[1:]:
+        anchor_rows = _group_rows(ids, anchored)
+        for group, rows in _group_rows(ids, (codes < 0) & ~np.isnan(positions).any(axis=1)).items():
+            if group not in anchor_rows:
+                continue
+
+            # Rows placed at the same centroid share their nearest neighbour
+            targets, inverse = np.unique(positions[rows], axis=0, return_inverse=True)
+            codes[rows] = _nearest_codes(targets, positions[anchor_rows[group]], codes[anchor_rows[group]])[inverse.reshape(-1)]
+
+    return codes
+
+
+def fill_timezones(  # noqa: PLR0913
     df: pd.DataFrame,
     fill_missing: FillMissing | bool = FillMissing.ENABLED,  # noqa: FBT001
     timezone_finder: TimezoneFinder | None = None,
+    timezone_grid: grid.TimezoneGrid | None = None,
+    workers: int = 1,
+    compact: bool = False,  # noqa: FBT001, FBT002
+    timezone_shortcuts: shortcuts.TimezoneShortcuts | None = None,
 ) -> pd.DataFrame:
     """
     Fills in the timezones for each coordinate in the specifeid DataFrame.
@@ -61,7 +386,17 @@ def fill_timezones(
             ZipCode, City, State
             City, State
             State.
+            Or, when FillMissing.NEAREST, by the nearest row with a timezone within the same ZIP3, then State.
         timezone_finder (TimezoneFinder | None): The optional TimezoneFinder instance to use.
+        timezone_grid (grid.TimezoneGrid | None): The optional precomputed grid (see grid.TimezoneGrid.load_or_build) that
+            answers the coordinates far from any timezone boundary without a polygon lookup.
+        workers (int): The number of processes the coordinates are looked up in (defaults to 1, in this process). Worker
+            processes open their own memory-mapped TimezoneFinder, so timezone_finder is only used in this process, and
+            fewer than MIN_PARALLEL_COORDINATES distinct coordinates are always looked up in this process.
+        compact (bool): Flag indicating whether the TZ column holds a pandas Categorical of the IANA timezone names rather
+            than a datetime.tzinfo object per row, see to_tzinfo to materialize them on demand.
+        timezone_shortcuts (shortcuts.TimezoneShortcuts | None): The optional index of the states and ZIP3 prefixes within a
+            single timezone, whose rows get that timezone without a lookup, whether or not they have coordinates.
 
     Returns:
         A DataFrame with the shape of
@@ -73,37 +408,44 @@ def fill_timezones(
             3   ZipCode     0 non-null      object
             4   Latitude    0 non-null      float64
             5   Longitude   0 non-null      float64
-            6   TZ          0 non-null      object
+            6   TZ          0 non-null      object (category when compact)
     """
+    if workers < 1:
+        msg = f"workers must be at least 1, got {workers}"
+        raise ValueError(msg)
+
     logger.debug("Filling in timezones into %d rows.", len(df))
 
     if timezone_finder is None:
         timezone_finder = _get_cached_timezone_finder()
 
-    df[constants.Columns.TIMEZONE] = df.apply(  # type: ignore[call-overload]
-        lambda row: _get_timezone(
-            float(row[constants.Columns.LATITUDE]) if not pd.isna(row[constants.Columns.LATITUDE]) else None,
-            float(row[constants.Columns.LONGITUDE]) if not pd.isna(row[constants.Columns.LONGITUDE]) else None,
-            timezone_finder,
-        ),
-        axis=1,
-    )
+    latitudes = df[constants.Columns.LATITUDE].to_numpy(dtype="float64", na_value=np.nan)
+    longitudes = df[constants.Columns.LONGITUDE].to_numpy(dtype="float64", na_value=np.nan)
+    shortcut_names = None if timezone_shortcuts is None else timezone_shortcuts.lookup(df).to_numpy(dtype=object)
+    if shortcut_names is None:
+        codes, names = _get_timezone_codes(latitudes, longitudes, timezone_finder, timezone_grid, workers)
+    else:
+        codes, names = _get_shortcut_timezone_codes(latitudes, longitudes, shortcut_names, timezone_finder, timezone_grid, workers)
+    if fill_missing == FillMissing.NEAREST:
+        missing_before = (codes < 0).sum()
+        codes = _fill_nearest_codes(df, latitudes, longitudes, codes)
+        logger.debug("Filled in %d rows with their nearest location.", missing_before - (codes < 0).sum())
+
+    timezone_dtype = pd.CategoricalDtype(pd.Index(names, dtype=object))
+    if compact:
+        df[constants.Columns.TIMEZONE] = pd.Categorical.from_codes(codes, dtype=timezone_dtype)
+    else:
+        df[constants.Columns.TIMEZONE] = _to_tzinfos(codes, names)
 
     if fill_missing is True or fill_missing == FillMissing.ENABLED:
         # This attempts to make a best effort at making sure that every row has a timezone.  It does this by filling based on the
         # closest match; ie: ZipCode, City, State, then by City, State and finally by State.
+        missing_before = df[constants.Columns.TIMEZONE].isna().sum()
+        df[constants.Columns.TIMEZONE] = _fill_missing_timezones(df)
+        logger.debug("Filled in %d rows with their closest location.", missing_before - df[constants.Columns.TIMEZONE].isna().sum())
 
-        df_before_no_tz = df[df.TZ.isna()]
-        df[constants.Columns.TIMEZONE] = (
-            df.groupby([constants.Columns.ZIPCODE, constants.Columns.CITY, constants.Columns.STATE])[constants.Columns.TIMEZONE]
-            .transform(lambda x: x.ffill().bfill())  # Fill using ZipCode first
-            .fillna(
-                df.groupby([constants.Columns.CITY, constants.Columns.STATE])[constants.Columns.TIMEZONE].transform(lambda x: x.ffill().bfill())
-            )  # Then City
-            .fillna(df.groupby([constants.Columns.STATE])[constants.Columns.TIMEZONE].transform(lambda x: x.ffill().bfill()))  # Then State
-        )
-
-        df_after_no_tz = df[df.TZ.isna()]
-        logger.debug("Filled in %d rows with their closest location.", len(df_before_no_tz) - len(df_after_no_tz))
+    if compact:
+        # The group transforms can rebuild the categories, or drop the dtype of an empty frame, so restore them
+        df[constants.Columns.TIMEZONE] = df[constants.Columns.TIMEZONE].astype(timezone_dtype)
 
     return df